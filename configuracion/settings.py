@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import dj_database_url
+from corsheaders.defaults import default_headers
 import os
 from decimal import Decimal
 from django.core.exceptions import ImproperlyConfigured
@@ -165,11 +166,51 @@ LOGOUT_REDIRECT_URL = '/login/'
 # Emails se envían a la consola durante el desarrollo
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'no-reply@example.com'
+# Intentos de envío de un correo del outbox antes de marcarlo como fallido.
+OUTBOX_MAX_INTENTOS = int(os.environ.get("OUTBOX_MAX_INTENTOS", "5"))
 
 # Valores por defecto para la importación de productos.
 IMPORT_DEFAULT_STOCK_MINIMO = Decimal(os.environ.get("IMPORT_DEFAULT_STOCK_MINIMO", "5"))
 IMPORT_DEFAULT_CATEGORY_NAME = os.environ.get("IMPORT_DEFAULT_CATEGORY_NAME", "Sin clasificar")
 
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Archivo de tablas históricas (movimientos, auditoría, precios).
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", BASE_DIR / "archivo"))
+ARCHIVE_HORIZON_DAYS = int(os.environ.get("ARCHIVE_HORIZON_DAYS", "365"))
+
+# Orden de consumo de lotes: "fefo" (vence primero) o "fifo" (entra primero).
+LOT_ALLOCATION_STRATEGY = os.environ.get("LOT_ALLOCATION_STRATEGY", "fefo")
+
+# Hilos para despachar órdenes de compra a la API de proveedores en paralelo.
+SUPPLIER_DISPATCH_WORKERS = int(os.environ.get("SUPPLIER_DISPATCH_WORKERS", "8"))
+# Intentos de despacho de una orden antes de dejarla como fallida.
+SUPPLIER_DISPATCH_MAX_INTENTOS = int(os.environ.get("SUPPLIER_DISPATCH_MAX_INTENTOS", "5"))
+
+# Horas que se guarda la respuesta de una solicitud con Idempotency-Key.
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# Contención en el inventario: espera máxima por el bloqueo de un producto
+# (Postgres) y reintentos en el servidor cuando aún así está ocupado.
+SALE_LOCK_TIMEOUT_MS = int(os.environ.get("SALE_LOCK_TIMEOUT_MS", "2000"))
+SALE_LOCK_RETRIES = int(os.environ.get("SALE_LOCK_RETRIES", "5"))
+SALE_LOCK_BACKOFF = float(os.environ.get("SALE_LOCK_BACKOFF", "0.05"))
+SALE_LOCK_BACKOFF_MAX = float(os.environ.get("SALE_LOCK_BACKOFF_MAX", "1.0"))
+# Milisegundos desde los que una toma de bloqueo cuenta como espera en las
+# métricas; por debajo es el costo normal de la consulta.
+SALE_LOCK_WAIT_MIN_MS = int(os.environ.get("SALE_LOCK_WAIT_MIN_MS", "10"))
+
+# Procesos para generar facturas faltantes al exportar un periodo.
+INVOICE_RENDER_PROCESSES = int(os.environ.get("INVOICE_RENDER_PROCESSES", "2"))
+
+# Segundos antes de que ``construir_cubo`` vuelva a calcular el mes en curso.
+TRENDS_CUBE_TTL = int(os.environ.get("TRENDS_CUBE_TTL", "300"))
+
 # Allow API requests from the Vite dev server during development
 # (both default 4173 and our custom 8080 port)
 def _env_list(env_var):
@@ -185,6 +226,8 @@ _DEFAULT_ORIGINS = [
 _EXTRA_ORIGINS = _env_list("DJANGO_EXTRA_ORIGINS")
 CORS_ALLOWED_ORIGINS = list(dict.fromkeys([*_DEFAULT_ORIGINS, *_EXTRA_ORIGINS]))
 CORS_ALLOW_CREDENTIALS = True
+# El POS envía Idempotency-Key al registrar ventas.
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 # Allow cross-site POSTs from the Vite dev server during development
 CSRF_TRUSTED_ORIGINS = list(dict.fromkeys([*_DEFAULT_ORIGINS, *_EXTRA_ORIGINS]))
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import CharField, Case, Exists, OuterRef, Q, Value, When
+
+from .allocation import lotes_finales_abiertos
+from .models import AlertaVencimiento, LoteMateriaPrima
+from .outbox import encolar_correo, procesar_outbox
+
+
+TIPO_MATERIA_PRIMA = "materia_prima"
+TIPO_PRODUCTO_FINAL = "producto_final"
+# Grupos que reciben, además de los superusuarios, cada tipo de alerta.
+GRUPOS_POR_TIPO = {
+    TIPO_MATERIA_PRIMA: "compras",
+    TIPO_PRODUCTO_FINAL: "produccion",
+}
+_CAMPOS = ("id", "codigo", "producto__nombre", "fecha_vencimiento", "tipo", "nivel")
+
+
+def _nivel(hoy: date):
+    return Case(
+        When(fecha_vencimiento__lte=hoy, then=Value(AlertaVencimiento.NIVEL_VENCIDO)),
+        default=Value(AlertaVencimiento.NIVEL_POR_VENCER),
+        output_field=CharField(),
+    )
+
+
+def lotes_a_alertar(dias: int = 7, hoy: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Lotes de materia prima y de producto final que requieren una alerta nueva.
+
+    Una sola consulta (``UNION``) devuelve los lotes abiertos que vencen en
+    ``dias`` y que aún no fueron alertados con su nivel actual, de modo que un
+    lote avisa una vez al acercarse y otra al vencer.
+    """
+    hoy = hoy or date.today()
+    limite = hoy + timedelta(days=dias)
+    materias = (
+        LoteMateriaPrima.objects.filter(fecha_vencimiento__lte=limite, fecha_agotado__isnull=True)
+        .annotate(tipo=Value(TIPO_MATERIA_PRIMA, output_field=CharField()), nivel=_nivel(hoy))
+        .filter(
+            ~Exists(
+                AlertaVencimiento.objects.filter(
+                    lote_materia_prima=OuterRef("pk"), nivel=OuterRef("nivel")
+                )
+            )
+        )
+        .values_list(*_CAMPOS)
+    )
+    finales = (
+        lotes_finales_abiertos()
+        .filter(fecha_vencimiento__lte=limite)
+        .annotate(tipo=Value(TIPO_PRODUCTO_FINAL, output_field=CharField()), nivel=_nivel(hoy))
+        .filter(
+            ~Exists(AlertaVencimiento.objects.filter(lote_final=OuterRef("pk"), nivel=OuterRef("nivel")))
+        )
+        .values_list(*_CAMPOS)
+    )
+    return [dict(zip(_CAMPOS, fila)) for fila in materias.union(finales, all=True)]
+
+
+def _destinatarios() -> Dict[str, Set[str]]:
+    """Correo de cada destinatario y los tipos de alerta que le corresponden."""
+    tipos_por_grupo = {grupo: tipo for tipo, grupo in GRUPOS_POR_TIPO.items()}
+    destinatarios: Dict[str, Set[str]] = {}
+    for email, superusuario, grupo in (
+        get_user_model()
+        .objects.filter(Q(is_superuser=True) | Q(groups__name__in=list(tipos_por_grupo)), is_active=True)
+        .exclude(email="")
+        .values_list("email", "is_superuser", "groups__name")
+    ):
+        tipos = destinatarios.setdefault(email, set())
+        if superusuario:
+            tipos.update(GRUPOS_POR_TIPO)
+        if grupo in tipos_por_grupo:
+            tipos.add(tipos_por_grupo[grupo])
+    return destinatarios
+
+
+def generar_alertas_vencimiento(dias: int = 7, hoy: Optional[date] = None) -> Dict[str, int]:
+    """Registra las alertas nuevas y encola un resumen por destinatario.
+
+    Sin lotes nuevos cuesta una sola consulta, por lo que puede ejecutarse
+    cada pocos minutos.
+    """
+    hoy = hoy or date.today()
+    lotes = lotes_a_alertar(dias, hoy)
+    if not lotes:
+        return {"alertas": 0, "correos": 0}
+
+    correos = 0
+    with transaction.atomic():
+        AlertaVencimiento.objects.bulk_create(
+            [
+                AlertaVencimiento(
+                    lote_materia_prima_id=l["id"] if l["tipo"] == TIPO_MATERIA_PRIMA else None,
+                    lote_final_id=l["id"] if l["tipo"] == TIPO_PRODUCTO_FINAL else None,
+                    nivel=l["nivel"],
+                    fecha_vencimiento=l["fecha_vencimiento"],
+                )
+                for l in lotes
+            ],
+            ignore_conflicts=True,
+        )
+        lotes.sort(key=lambda l: (l["fecha_vencimiento"], l["codigo"]))
+        for email, tipos in _destinatarios().items():
+            lineas = [
+                f"{l['codigo']} - {l['producto__nombre']} "
+                f"{'venció' if l['nivel'] == AlertaVencimiento.NIVEL_VENCIDO else 'vence'} "
+                f"{l['fecha_vencimiento']}"
+                for l in lotes
+                if l["tipo"] in tipos
+            ]
+            if not lineas:
+                continue
+            encolar_correo("Lotes próximos a vencer", "\n".join(lineas), [email])
+            correos += 1
+    return {"alertas": len(lotes), "correos": correos}
+
+
+def enviar_alertas_vencimiento(dias: int = 7) -> Dict[str, int]:
+    """Genera las alertas nuevas y procesa el outbox de correos."""
+    resultado = generar_alertas_vencimiento(dias)
+    resultado.update(procesar_outbox())
+    return resultado
+
+
+__all__ = [
+    "lotes_a_alertar",
+    "generar_alertas_vencimiento",
+    "enviar_alertas_vencimiento",
+]
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Value, When
+
+from .catalog import invalidar_catalogo
+from .models import LoteProductoFinal
+from .models.inventario import ESCALA_DESCUENTO
+
+
+@dataclass(frozen=True)
+class EstrategiaAsignacion:
+    """Orden en que se consumen los lotes de materia prima y de producto final."""
+
+    nombre: str
+    orden_materia_prima: Tuple
+    orden_producto_final: Tuple
+
+
+ESTRATEGIAS: Dict[str, EstrategiaAsignacion] = {}
+
+
+def registrar_estrategia(estrategia: EstrategiaAsignacion) -> None:
+    """Agrega (o reemplaza) una estrategia disponible por nombre."""
+    ESTRATEGIAS[estrategia.nombre] = estrategia
+
+
+registrar_estrategia(
+    EstrategiaAsignacion(
+        nombre="fifo",
+        orden_materia_prima=("fecha_recepcion", "id"),
+        orden_producto_final=("fecha_produccion", "id"),
+    )
+)
+registrar_estrategia(
+    EstrategiaAsignacion(
+        nombre="fefo",
+        orden_materia_prima=("fecha_vencimiento", "fecha_recepcion", "id"),
+        orden_producto_final=(
+            F("fecha_vencimiento").asc(nulls_last=True),
+            "fecha_produccion",
+            "id",
+        ),
+    )
+)
+
+
+def obtener_estrategia(nombre: Optional[str] = None) -> EstrategiaAsignacion:
+    """Estrategia ``nombre`` o la configurada en ``LOT_ALLOCATION_STRATEGY``."""
+    nombre = nombre or settings.LOT_ALLOCATION_STRATEGY
+    try:
+        return ESTRATEGIAS[nombre]
+    except KeyError:
+        raise ValueError(f"Estrategia de asignación desconocida: {nombre}") from None
+
+
+def _disponible():
+    return (
+        F("cantidad_producida")
+        - F("cantidad_vendida")
+        - F("cantidad_descartada")
+        + F("cantidad_devuelta")
+    )
+
+
+def lotes_finales_abiertos():
+    """Lotes de producto final con unidades disponibles."""
+    return LoteProductoFinal.objects.alias(disponible=_disponible()).filter(disponible__gt=0)
+
+
+def aplicar_descuentos(hoy: Optional[date] = None) -> int:
+    """Fija el ``descuento`` de todos los lotes finales abiertos en un UPDATE.
+
+    El descuento sale de ``ESCALA_DESCUENTO`` según los días que faltan para
+    ``fecha_vencimiento``; los lotes sin vencimiento o lejos de vencer quedan
+    en cero. Devuelve los lotes con descuento vigente.
+    """
+    hoy = hoy or date.today()
+    tramos = [
+        When(fecha_vencimiento__lte=hoy + timedelta(days=limite), then=Value(descuento))
+        for limite, descuento in ESCALA_DESCUENTO
+    ]
+    campo = DecimalField(max_digits=3, decimal_places=2)
+    lotes_finales_abiertos().update(
+        descuento=Case(*tramos, default=Value(Decimal("0")), output_field=campo)
+    )
+    LoteProductoFinal.objects.alias(disponible=_disponible()).filter(
+        disponible__lte=0, descuento__gt=0
+    ).update(descuento=0)
+    invalidar_catalogo()
+    return LoteProductoFinal.objects.filter(descuento__gt=0).count()
+
+
+def descuentos_vigentes(estrategia: Optional[str] = None) -> Dict[int, Decimal]:
+    """Descuento del próximo lote a vender de cada producto, si lo tiene.
+
+    Se resuelve con una consulta: por cada producto con algún lote rebajado
+    se toma el primer lote abierto según la estrategia de asignación.
+    """
+    orden = obtener_estrategia(estrategia).orden_producto_final
+    siguiente = lotes_finales_abiertos().filter(producto=OuterRef("producto")).order_by(*orden)
+    filas = (
+        lotes_finales_abiertos()
+        .filter(descuento__gt=0)
+        .annotate(primero=Subquery(siguiente.values("descuento")[:1]))
+        .values_list("producto", "primero")
+        .distinct()
+    )
+    return {pid: descuento for pid, descuento in filas if descuento}
+
+
+__all__ = [
+    "EstrategiaAsignacion",
+    "ESTRATEGIAS",
+    "registrar_estrategia",
+    "obtener_estrategia",
+    "lotes_finales_abiertos",
+    "aplicar_descuentos",
+    "descuentos_vigentes",
+]
@@ -1,17 +1,21 @@
-from django.db import models, transaction
-from django.db.models import F, Sum, Count, Case, When, Avg, Q, Prefetch
+from django.db import transaction
+from django.db.models import F, Sum, Count, Q, Prefetch
 from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
-from django.utils.timezone import now
+from django.utils.timezone import make_aware, now
 from datetime import timedelta, datetime, date
+from calendar import monthrange
 from decimal import Decimal
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError as DjangoValidationError
 import logging
 from django.contrib.auth import authenticate, get_user_model, login
 from django.contrib.auth.models import Group
 from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated, BasePermission
 from rest_framework.views import APIView
@@ -64,7 +68,6 @@ from .models import (
     FacturaVenta,
     MovimientoInventario,
     Compra,
-    DetalleCompra,
     Categoria,
     Cliente,
     Proveedor,
@@ -73,16 +76,17 @@ from .models import (
     DevolucionProducto,
     HistorialPrecio,
     RegistroTurno,
-    LoteMateriaPrima,
     LoteProductoFinal,
     UnidadMedida,
     AuditLog,
+    PeriodoArchivado,
 )
 from .serializers import (
     CriticalProductSerializer,
     ProductoSerializer,
     VentaSerializer,
     VentaCreateSerializer,
+    InventarioOcupado,
     CategoriaSerializer,
     ClienteSerializer,
     ClienteCreateSerializer,
@@ -114,6 +118,21 @@ from .analytics import (
     purchase_recommendations,
 )
 from .planning import generar_plan
+from .projection import obtener_proyeccion, serializar_proyeccion
+from .receiving import recibir_compra
+from .trends import hechos_del_anio
+from .archive import filas_periodo
+from .returns import obtener_tasas
+from .customers import obtener_resumen_cliente, segmentacion_rfm
+from .evolution import obtener_evolucion
+from .traceability import trazar_adelante, trazar_atras
+from .recall import estado_simulacion, filas_csv, lanzar_simulacion, simular_retiro
+from .invoices import zip_facturas
+from .contention import con_reintentos, metricas_contencion
+from .idempotency import IdempotenteMixin
+from .search import buscar_productos
+from .catalog import catalogo_compacto
+from .models.helpers import normalizar_texto
 from .profitability import monthly_profitability_ranking
 
 
@@ -195,7 +214,7 @@ class ProductoViewSet(viewsets.ModelViewSet):
 
 
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "search", "compact"]:
             return [IsAuthenticated()]
         return [IsAdminUser()]
 
@@ -212,9 +231,45 @@ class ProductoViewSet(viewsets.ModelViewSet):
         if codigo:
             qs = qs.filter(codigo__iexact=codigo)
         if search:
-            qs = qs.filter(nombre__icontains=search)
+            for termino in normalizar_texto(search).split():
+                qs = qs.filter(busqueda__contains=termino)
         return qs
 
+    @action(detail=False, methods=["get"])
+    def compact(self, request):
+        """Catálogo liviano (id, código, nombre, precio, stock, unidad) con ETag."""
+        productos, etag = catalogo_compacto()
+        if request.headers.get("If-None-Match") == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            tipo = request.query_params.get("tipo")
+            if tipo:
+                productos = [p for p in productos if p["tipo"] == tipo]
+            response = Response(productos)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """Búsqueda rankeada con prefijos y lookup exacto por código de barras."""
+        q = request.query_params.get("q", "")
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        resultados = buscar_productos(q, limit)
+        return Response(
+            [
+                {
+                    **r,
+                    "precio": float(r["precio"]),
+                    "stock_actual": float(r["stock_actual"]),
+                }
+                for r in resultados
+            ]
+        )
+
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
         errors = self._normalize_relations(data)
@@ -348,7 +403,14 @@ class VentaPagination(PageNumberPagination):
     page_size = 20
 
 
-class VentaListCreateView(ListCreateAPIView):
+class VentaListCreateView(IdempotenteMixin, ListCreateAPIView):
+    """Lista y registra ventas.
+
+    El POST acepta ``Idempotency-Key`` para que los reintentos del POS no
+    dupliquen la venta, y reintenta en el servidor si el inventario está
+    bloqueado por otra operación.
+    """
+
     queryset = Venta.objects.all().order_by("-fecha")
     serializer_class = VentaSerializer
     pagination_class = VentaPagination
@@ -374,7 +436,19 @@ class VentaListCreateView(ListCreateAPIView):
         if usuario:
             qs = qs.filter(usuario_id=usuario)
         return qs
-    
+
+    def perform_create(self, serializer):
+        con_reintentos(serializer.save, (InventarioOcupado,))
+
+
+class ContentionMetricsView(APIView):
+    """Esperas, timeouts y abortos por bloqueos del inventario en las ventas."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metricas_contencion())
+
 
 class VentaFacturaView(APIView):
     """Permite descargar la factura generada para una venta."""
@@ -387,18 +461,43 @@ class VentaFacturaView(APIView):
             pk=venta_id,
         )
         factura = crear_factura_para_venta(venta)
-        factura.pdf.open("rb")
+        return FileResponse(
+            factura.pdf.open("rb"),
+            as_attachment=True,
+            filename=factura.pdf.name.split("/")[-1],
+            content_type="application/pdf",
+        )
+
+
+class FacturaExportView(APIView):
+    """Descarga en un ZIP las facturas de las ventas entre ``desde`` y ``hasta``.
+
+    Las facturas que faltan se generan antes de responder; después el ZIP se
+    transmite a medida que se arma.
+    """
+
+    permission_classes = [IsFinanzasUser]
+
+    def get(self, request):
         try:
-            filename = factura.pdf.name.split("/")[-1]
-            response = HttpResponse(factura.pdf.read(), content_type="application/pdf")
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            return response
-        finally:
-            factura.pdf.close()
+            desde = date.fromisoformat(request.query_params["desde"])
+            hasta = date.fromisoformat(request.query_params.get("hasta") or request.query_params["desde"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Indique desde y hasta con formato YYYY-MM-DD"}, status=400
+            )
+        if hasta < desde:
+            return Response({"error": "hasta debe ser posterior a desde"}, status=400)
+        response = StreamingHttpResponse(
+            zip_facturas(desde, hasta, procesos=settings.INVOICE_RENDER_PROCESSES),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = f'attachment; filename="facturas_{desde}_{hasta}.zip"'
+        return response
 
 
 class VentaFacturaEmailView(APIView):
-    """Envía la factura al correo proporcionado o al del cliente."""
+    """Encola la factura para el correo proporcionado o el del cliente."""
 
     permission_classes = [IsVentasUser]
 
@@ -423,15 +522,11 @@ class VentaFacturaEmailView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         factura = crear_factura_para_venta(venta)
-        try:
-            enviar_factura_por_correo(factura, correo)
-        except Exception:
-            logger.exception("Error al enviar factura por correo", extra={"venta_id": venta.id, "correo": correo})
-            return Response(
-                {"detail": "No se pudo enviar la factura en este momento."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-        return Response({"detail": "Factura enviada correctamente.", "correo": correo})
+        envio = enviar_factura_por_correo(factura, correo)
+        return Response(
+            {"detail": "Factura en cola de envío.", "correo": correo, "envio": envio.id},
+            status=status.HTTP_202_ACCEPTED,
+        )
 
 
 class DashboardStatsView(APIView):
@@ -550,6 +645,16 @@ class DashboardStatsView(APIView):
             .values('nombre', 'stock_actual', 'stock_minimo')[:5]
         )
         reorder_suggestions_raw = detectar_faltantes()
+        projected_stockouts = [
+            {
+                "producto": p["producto"],
+                "nombre": p["nombre"],
+                "dia_quiebre": p["dia_quiebre"],
+                "en_camino": p["en_camino"],
+            }
+            for p in obtener_proyeccion(7)["productos"]
+            if p["dia_quiebre"]
+        ]
         provider_ids = [
             suggestion["proveedor"]
             for suggestion in reorder_suggestions_raw
@@ -591,6 +696,7 @@ class DashboardStatsView(APIView):
             'alerts': alerts,
             'reorder_suggestions': reorder_suggestions,
             'pending_purchases': len(reorder_suggestions),
+            'projected_stockouts': projected_stockouts,
             'last_updated': now().isoformat(),
         })
 
@@ -858,105 +964,11 @@ class BusinessEvolutionView(APIView):
 
     def get(self, request):
         period = request.query_params.get("period", "month")
+        if period != "quarter":
+            period = "month"
         category = request.query_params.get("category")
         canal = request.query_params.get("canal")
-        ventas = Venta.objects.all()
-        if category:
-            ventas = ventas.filter(detallesventa__producto__categoria_id=category)
-        ingresos = Transaccion.objects.filter(tipo="ingreso")
-        egresos = Transaccion.objects.filter(tipo="egreso")
-        if canal:
-            ingresos = ingresos.filter(canal=canal)
-        if period == "quarter":
-            trunc = TruncQuarter("fecha")
-        else:
-            trunc = TruncMonth("fecha")
-        sales_group = (
-            ventas.annotate(p=trunc)
-            .values("p")
-            .annotate(count=Count("id"), total=Sum("total"))
-            .order_by("p")
-        )
-        ing_group = (
-            ingresos.annotate(p=trunc)
-            .values("p")
-            .annotate(total=Sum("monto"))
-            .order_by("p")
-        )
-        eg_group = (
-            egresos.annotate(p=trunc)
-            .values("p")
-            .annotate(total=Sum("monto"))
-            .order_by("p")
-        )
-        ingresos_dict = {r["p"]: float(r["total"]) for r in ing_group}
-        egresos_dict = {r["p"]: float(r["total"]) for r in eg_group}
-
-        first_sales = {}
-        for item in ventas.filter(cliente__isnull=False).order_by("fecha").values("cliente_id", "fecha"):
-            cid = item["cliente_id"]
-            if cid not in first_sales:
-                first_sales[cid] = item["fecha"]
-        new_clients = {}
-        for d in first_sales.values():
-            if period == "quarter":
-                q_month = ((d.month - 1) // 3) * 3 + 1
-                key = d.replace(month=q_month, day=1)
-            else:
-                key = d.replace(day=1)
-            new_clients[key] = new_clients.get(key, 0) + 1
-
-        result = []
-        prev_income = None
-        for item in sales_group:
-            p = item["p"]
-            income = ingresos_dict.get(p, 0.0)
-            expense = egresos_dict.get(p, 0.0)
-            net_income = income - expense
-            margin = (net_income / income * 100) if income else 0.0
-            growth = ((income - prev_income) / prev_income * 100) if prev_income else 0.0
-            result.append({
-                "period": p.isoformat(),
-                "sales": item["count"],
-                "new_clients": new_clients.get(p, 0),
-                "net_income": net_income,
-                "profit_margin": margin,
-                "growth": growth,
-            })
-            prev_income = income
-
-        y = [r["net_income"] for r in result]
-        n = len(y)
-        if n >= 2:
-            x = list(range(n))
-            x_mean = sum(x) / n
-            y_mean = sum(y) / n
-            denom = sum((xi - x_mean) ** 2 for xi in x)
-            slope = sum((xi - x_mean) * (yi - y_mean) for xi, yi in zip(x, y)) / denom if denom else 0.0
-            intercept = y_mean - slope * x_mean
-            if slope > 0:
-                last_period = datetime.fromisoformat(result[-1]["period"])
-                for i in range(1, 4):
-                    if period == "quarter":
-                        month = ((last_period.month - 1) // 3) * 3 + 1 + 3 * i
-                    else:
-                        month = last_period.month + i
-                    year = last_period.year
-                    while month > 12:
-                        month -= 12
-                        year += 1
-                    next_date = last_period.replace(year=year, month=month, day=1)
-                    pred = intercept + slope * (n - 1 + i)
-                    result.append({
-                        "period": next_date.isoformat(),
-                        "sales": None,
-                        "new_clients": None,
-                        "net_income": pred,
-                        "profit_margin": None,
-                        "growth": None,
-                        "projected": True,
-                    })
-        return Response(result)
+        return Response(obtener_evolucion(period, category, canal))
 
 
 class DevolucionViewSet(viewsets.ModelViewSet):
@@ -975,80 +987,32 @@ class DevolucionViewSet(viewsets.ModelViewSet):
 
 
 class DevolucionRatesView(APIView):
-    """Calcula tasas de devolución por producto, proveedor y responsable."""
+    """Calcula tasas de devolución por producto, lote, proveedor y responsable.
+
+    Acepta ``start``/``end`` (ISO) o ``month``/``year``; ``producto`` limita
+    el detalle por lote.
+    """
 
     permission_classes = [IsAdminUser]
 
     def get(self, request):
         today = now().date()
-        month = int(request.query_params.get("month", today.month))
-        year = int(request.query_params.get("year", today.year))
-
-        devs = DevolucionProducto.objects.filter(fecha__year=year, fecha__month=month)
-        sales = DetallesVenta.objects.filter(venta__fecha__year=year, venta__fecha__month=month)
-
-        sales_by_product = {
-            d["producto"]: d["total"] for d in sales.values("producto").annotate(total=Sum("cantidad"))
-        }
-
-        result_prod = []
-        for item in devs.values(
-            "producto",
-            "producto__nombre",
-            "lote_final__codigo",
-        ).annotate(total=Sum("cantidad")):
-            sold = sales_by_product.get(item["producto"], 0)
-            rate = float(item["total"]) / float(sold) * 100 if sold else 0.0
-            result_prod.append(
-                {
-                    "producto": item["producto"],
-                    "nombre": item["producto__nombre"],
-                    "lote_final": item["lote_final__codigo"],
-                    "tasa": rate,
-                    "alerta": rate > 5,
-                }
-            )
-
-        sales_by_provider = {
-            d["producto__proveedor"]: d["total"]
-            for d in sales.values("producto__proveedor").annotate(total=Sum("cantidad"))
-        }
-
-        result_prov = []
-        for item in devs.values("producto__proveedor", "producto__proveedor__nombre").annotate(total=Sum("cantidad")):
-            prov = item["producto__proveedor"]
-            sold = sales_by_provider.get(prov, 0)
-            rate = float(item["total"]) / float(sold) * 100 if sold else 0.0
-            result_prov.append(
-                {
-                    "proveedor": prov,
-                    "nombre": item["producto__proveedor__nombre"],
-                    "tasa": rate,
-                }
-            )
-
-        products_by_responsable: dict[int, set[int]] = {}
-        for row in devs.values("responsable", "producto"):
-            products_by_responsable.setdefault(row["responsable"], set()).add(row["producto"])
-
-        result_resp = []
-        for item in devs.values("responsable", "responsable__username").annotate(total=Sum("cantidad")):
-            prods = products_by_responsable.get(item["responsable"], set())
-            total_sales = sum(sales_by_product.get(pid, 0) for pid in prods)
-            rate = float(item["total"]) / float(total_sales) * 100 if total_sales else 0.0
-            result_resp.append(
-                {
-                    "responsable": item["responsable"],
-                    "nombre": item["responsable__username"],
-                    "tasa": rate,
-                }
-            )
-
-        return Response({
-            "por_producto": result_prod,
-            "por_proveedor": result_prov,
-            "por_responsable": result_resp,
-        })
+        try:
+            if request.query_params.get("start") or request.query_params.get("end"):
+                start = date.fromisoformat(request.query_params.get("start") or today.replace(day=1).isoformat())
+                end = date.fromisoformat(request.query_params.get("end") or today.isoformat())
+            else:
+                month = int(request.query_params.get("month", today.month))
+                year = int(request.query_params.get("year", today.year))
+                start = date(year, month, 1)
+                end = date(year, month, monthrange(year, month)[1])
+            producto = request.query_params.get("producto")
+            producto = int(producto) if producto else None
+        except ValueError:
+            return Response({"error": "Parámetros inválidos"}, status=400)
+        if start > end:
+            return Response({"error": "Rango de fechas inválido"}, status=400)
+        return Response(obtener_tasas(start, end, producto))
 
 
 class DevolucionLossReportView(APIView):
@@ -1072,7 +1036,7 @@ class DevolucionLossReportView(APIView):
 
 
 class PriceHistoryView(APIView):
-    """Lista el historial de precios para un producto."""
+    """Lista el historial de precios para un producto, incluidos los meses archivados."""
 
     permission_classes = [IsAdminUser]
 
@@ -1080,51 +1044,74 @@ class PriceHistoryView(APIView):
         producto = request.query_params.get("producto")
         if not producto:
             return Response([], status=status.HTTP_400_BAD_REQUEST)
-        qs = HistorialPrecio.objects.filter(producto_id=producto).order_by("fecha")
+        try:
+            producto = int(producto)
+        except ValueError:
+            return Response([], status=status.HTTP_400_BAD_REQUEST)
         data = [
             {
-                "fecha": h.fecha.isoformat(),
-                "precio": float(h.precio),
-                "costo": float(h.costo),
+                "fecha": h["fecha"].isoformat(),
+                "precio": float(h["precio"]),
+                "costo": float(h["costo"]),
             }
-            for h in qs
+            for h in filas_periodo(PeriodoArchivado.TABLA_PRECIOS, producto_id=producto)
         ]
         return Response(data)
     
 
+class ClienteHistoryPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
 class ClienteHistoryView(APIView):
-    """Devuelve historial y resumen de un cliente."""
+    """Devuelve historial paginado y resumen de un cliente.
+
+    Los totales salen de ``ResumenCliente``; solo la página de ventas pedida
+    se lee de ``Venta``.
+    """
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
         cliente = get_object_or_404(Cliente, pk=pk)
-        ventas = (
+        resumen = obtener_resumen_cliente(cliente.pk)
+        paginator = ClienteHistoryPagination()
+        ventas = paginator.paginate_queryset(
             Venta.objects.filter(cliente=cliente)
-            .order_by("-fecha")
-            .values("id", "fecha", "total")
-        )
-        total = sum(float(v["total"]) for v in ventas)
-        productos_qs = (
-            DetallesVenta.objects.filter(venta__cliente=cliente)
-            .values("producto__nombre")
-            .annotate(total=Sum("cantidad"))
-            .order_by("-total")[:5]
+            .order_by("-fecha", "-id")
+            .values("id", "fecha", "total"),
+            request,
+            view=self,
         )
-        productos = [
-            {"producto": p["producto__nombre"], "cantidad": p["total"]}
-            for p in productos_qs
-        ]
-        ultima_compra = ventas[0]["fecha"].isoformat() if ventas else None
         data = {
-            "ventas": list(ventas),
-            "total_gastado": total,
-            "productos_frecuentes": productos,
-            "ultima_compra": ultima_compra,
+            "ventas": ventas,
+            "count": paginator.page.paginator.count,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "total_gastado": float(resumen.total_gastado),
+            "cantidad_ventas": resumen.ventas,
+            "productos_frecuentes": resumen.productos_frecuentes,
+            "primera_compra": resumen.primera_compra.isoformat() if resumen.primera_compra else None,
+            "ultima_compra": resumen.ultima_compra.isoformat() if resumen.ultima_compra else None,
         }
         return Response(data)
 
 
+class ClienteRFMView(APIView):
+    """Segmentación RFM (recencia, frecuencia, monto) de todos los clientes."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        segmento = request.query_params.get("segmento")
+        data = segmentacion_rfm()
+        if segmento:
+            data = [c for c in data if c["segmento"] == segmento]
+        return Response(data)
+
+
 class MarginImpactView(APIView):
     """Muestra cómo los cambios de precios afectan al margen operativo."""
 
@@ -1228,100 +1215,57 @@ class InventoryAnalysisView(APIView):
 
 
 class MonthlyTrendsView(APIView):
-    """Estadísticas mensuales para análisis de tendencias."""
+    """Estadísticas mensuales para análisis de tendencias.
+
+    Se leen del cubo ``HechoMensual``, que mantiene el comando
+    ``construir_cubo``; la petición no recalcula nada.
+    """
 
     permission_classes = [IsAdminUser]
 
     def get(self, request):
         year = int(request.query_params.get("year", now().year))
-        start = date(year, 1, 1)
-        end = date(year + 1, 1, 1)
 
-        movs = (
-            MovimientoInventario.objects.filter(fecha__date__gte=start, fecha__date__lt=end)
-            .annotate(m=TruncMonth("fecha"))
-            .values("m", "producto__nombre", "producto__tipo")
-            .annotate(
-                entradas=Sum(
-                    Case(
-                        When(tipo="entrada", then=F("cantidad")),
-                        default=0,
-                        output_field=models.DecimalField(max_digits=12, decimal_places=2),
-                    )
-                ),
-                salidas=Sum(
-                    Case(
-                        When(tipo="salida", then=F("cantidad")),
-                        default=0,
-                        output_field=models.DecimalField(max_digits=12, decimal_places=2),
-                    )
-                ),
-            )
-            .order_by("m")
-        )
-        stock = [
-            {
-                "period": m["m"].isoformat(),
-                "producto": m["producto__nombre"],
-                "ingrediente": m["producto__tipo"].startswith("ingred"),
-                "neto": float(m["entradas"] or 0) - float(m["salidas"] or 0),
-            }
-            for m in movs
-        ]
-
-        ventas = (
-            DetallesVenta.objects.filter(venta__fecha__gte=start, venta__fecha__lt=end)
-            .annotate(m=TruncMonth("venta__fecha"))
-            .values("m", "producto__categoria__nombre_categoria")
-            .annotate(
-                total=Sum(
-                    models.ExpressionWrapper(
-                        F("cantidad") * F("precio_unitario"),
-                        output_field=models.DecimalField(max_digits=12, decimal_places=2),
-                    )
+        stock = []
+        ventas = {}
+        perdidas = {}
+        precios = {}
+        for h in hechos_del_anio(year):
+            periodo = h["periodo"]
+            inicio = make_aware(datetime.combine(periodo, datetime.min.time())).isoformat()
+            if h["entradas"] or h["salidas"] or h["saldo"] is not None:
+                stock.append(
+                    {
+                        "period": inicio,
+                        "producto": h["producto__nombre"],
+                        "ingrediente": (h["producto__tipo"] or "").startswith("ingred"),
+                        "neto": float(h["entradas"]) - float(h["salidas"]),
+                        "saldo": float(h["saldo"]) if h["saldo"] is not None else None,
+                    }
                 )
-            )
-            .order_by("m")
-        )
-        sales = [
-            {
-                "period": v["m"].isoformat(),
-                "categoria": v["producto__categoria__nombre_categoria"],
-                "total": float(v["total"] or 0),
-            }
-            for v in ventas
-        ]
-
-        losses_dict = calcular_perdidas_devolucion(start, end).get("by_month", {})
-        losses = [
-            {"period": k, "loss": v}
-            for k, v in sorted(losses_dict.items())
-        ]
-
-        precios = (
-            HistorialPrecio.objects.filter(
-                fecha__date__gte=start,
-                fecha__date__lt=end,
-                producto__tipo__startswith="ingred",
-            )
-            .annotate(m=TruncMonth("fecha"))
-            .values("m")
-            .annotate(avg=Avg("costo"))
-            .order_by("m")
-        )
-        prices = [
-            {
-                "period": p["m"].isoformat(),
-                "precio_promedio": float(p["avg"] or 0),
-            }
-            for p in precios
-        ]
+            if h["ingresos"]:
+                clave = (periodo, h["categoria__nombre_categoria"])
+                ventas[clave] = ventas.get(clave, 0) + h["ingresos"]
+            if h["perdida"]:
+                perdidas[periodo] = perdidas.get(periodo, 0) + h["perdida"]
+            if h["registros_costo"]:
+                total, n = precios.get(inicio, (0, 0))
+                precios[inicio] = (total + h["costo_total"], n + h["registros_costo"])
 
         return Response({
             "stock": stock,
-            "sales": sales,
-            "losses": losses,
-            "prices": prices,
+            "sales": [
+                {"period": periodo.isoformat(), "categoria": categoria, "total": float(total)}
+                for (periodo, categoria), total in ventas.items()
+            ],
+            "losses": [
+                {"period": periodo.isoformat(), "loss": float(total)}
+                for periodo, total in sorted(perdidas.items())
+            ],
+            "prices": [
+                {"period": periodo, "precio_promedio": float(total / n)}
+                for periodo, (total, n) in sorted(precios.items())
+            ],
         })
 
 
@@ -1356,46 +1300,84 @@ class RegistroTurnoViewSet(viewsets.ModelViewSet):
 
 
 class TraceabilityView(APIView):
-    """Devuelve el historial de uso de un lote de materia prima."""
+    """Devuelve el historial de uso de un lote de materia prima y sus clientes."""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request, codigo):
-        try:
-            lote = LoteMateriaPrima.objects.get(codigo=codigo)
-        except LoteMateriaPrima.DoesNotExist:
+        data = trazar_adelante([codigo]).get(codigo)
+        if data is None:
             return Response({"detail": "Not found."}, status=404)
+        return Response(data)
 
-        usos_data = []
-        for uso in lote.usos.select_related("lote_producto_final", "lote_producto_final__producto"):
-            lpf = uso.lote_producto_final
-            vendidos = (
-                lpf.detallesventa_set.aggregate(total=Sum("cantidad"))["total"] or 0
-            )
-            devueltos = lpf.cantidad_descartada or 0
-            recuperados = lpf.cantidad_devuelta or 0
-            en_stock = lpf.cantidad_producida - vendidos - devueltos + recuperados
-            usos_data.append(
-                {
-                    "lote_final": lpf.codigo,
-                    "producto_final": lpf.producto.nombre,
-                    "fecha_produccion": lpf.fecha_produccion,
-                    "fecha_uso": uso.fecha,
-                    "cantidad_utilizada": uso.cantidad,
-                    "vendidos": vendidos,
-                    "devueltos": devueltos,
-                    "recuperados": recuperados,
-                    "en_stock": en_stock,
-                }
-            )
 
-        data = {
-            "lote": lote.codigo,
-            "producto": lote.producto.nombre,
-            "fecha_recepcion": lote.fecha_recepcion,
-            "usos": usos_data,
-        }
-        return Response(data)
+class VentaTraceabilityView(APIView):
+    """Lotes de materia prima y proveedores detrás de cada línea de una venta."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        if not Venta.objects.filter(pk=pk).exists():
+            return Response({"detail": "Not found."}, status=404)
+        return Response({"venta": pk, "lineas": trazar_atras(pk)})
+
+
+def _respuesta_retiro(request, resultado):
+    if request.query_params.get("formato") == "csv":
+        response = StreamingHttpResponse(filas_csv(resultado), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="retiro.csv"'
+        return response
+    return Response(resultado)
+
+
+class RecallSimulationView(APIView):
+    """Simula el retiro de lotes de materia prima (lotes afectados, clientes y costo).
+
+    Recibe ``lotes`` (códigos) o ``proveedor`` con ``desde``/``hasta``. Con
+    ``async`` la simulación corre en segundo plano y se consulta en
+    ``/api/retiros/<id>/``; ``?formato=csv`` descarga el reporte.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        if hasattr(request.data, "getlist"):
+            lotes = request.data.getlist("lotes")
+        else:
+            lotes = request.data.get("lotes")
+        proveedor = request.data.get("proveedor")
+        if not lotes and not proveedor:
+            return Response({"error": "Indique lotes o proveedor"}, status=400)
+        if lotes and not (isinstance(lotes, list) and all(isinstance(c, str) for c in lotes)):
+            return Response({"error": "lotes debe ser una lista de códigos"}, status=400)
+        try:
+            parametros = {
+                "lotes": lotes or None,
+                "proveedor": int(proveedor) if proveedor else None,
+                "desde": date.fromisoformat(request.data["desde"]) if request.data.get("desde") else None,
+                "hasta": date.fromisoformat(request.data["hasta"]) if request.data.get("hasta") else None,
+            }
+        except (TypeError, ValueError):
+            return Response({"error": "Parámetros inválidos"}, status=400)
+        asincrono = request.data.get("async", request.query_params.get("async"))
+        if str(asincrono).lower() in ("1", "true", "yes"):
+            job_id = lanzar_simulacion(**parametros)
+            return Response({"id": job_id, "estado": "pendiente"}, status=status.HTTP_202_ACCEPTED)
+        return _respuesta_retiro(request, simular_retiro(**parametros))
+
+
+class RecallStatusView(APIView):
+    """Estado o resultado de una simulación de retiro en segundo plano."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, job_id):
+        estado = estado_simulacion(job_id)
+        if estado is None:
+            return Response({"detail": "Not found."}, status=404)
+        if estado["estado"] != "listo":
+            return Response(estado, status=status.HTTP_202_ACCEPTED if estado["estado"] == "pendiente" else 200)
+        return _respuesta_retiro(request, estado["resultado"])
 
 
 class ReorderSuggestionView(APIView):
@@ -1414,6 +1396,29 @@ class ReorderSuggestionView(APIView):
         return Response({"compras": ids})
 
 
+class ProjectedInventoryView(APIView):
+    """Proyección diaria de inventario con compras pendientes (open-to-buy)."""
+
+    permission_classes = [IsComprasUser]
+    # El cálculo recorre producto por día, así que el horizonte se acota.
+    max_horizon = 90
+
+    def get(self, request):
+        producto = request.query_params.get("producto")
+        try:
+            horizon = int(request.query_params.get("horizon", 14))
+            producto = int(producto) if producto else None
+        except ValueError:
+            return Response(
+                {"detail": "horizon y producto deben ser enteros"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        horizon = min(max(horizon, 1), self.max_horizon)
+        refrescar = request.query_params.get("refresh") in ("1", "true")
+        data = obtener_proyeccion(horizon, refrescar=refrescar)
+        return Response(serializar_proyeccion(data, producto))
+
+
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     """API de solo lectura para revisar entradas de auditoría."""
 
@@ -1481,7 +1486,12 @@ class ClienteDetailView(RetrieveUpdateDestroyAPIView):
 
 
 class CompraReceptionView(APIView):
-    """Confirm receipt of a purchase order and update stock."""
+    """Confirm total or partial receipt of a purchase order and update stock.
+
+    The body may include ``lineas``: ``[{"detalle": id, "cantidad": x,
+    "lote": "...", "fecha_vencimiento": "YYYY-MM-DD"}]``. Without it every
+    pending quantity is received.
+    """
 
     permission_classes = [IsAuthenticated]
 
@@ -1490,25 +1500,12 @@ class CompraReceptionView(APIView):
         if compra.estado == Compra.ESTADO_RECIBIDO:
             return Response({"detail": "Esta compra ya fue recibida."}, status=status.HTTP_400_BAD_REQUEST)
 
-        with transaction.atomic():
-            detalles = DetalleCompra.objects.filter(compra=compra).select_related("producto")
-            for det in detalles:
-                Producto.objects.filter(id=det.producto_id).update(
-                    stock_actual=F("stock_actual") + det.cantidad
-                )
-                MovimientoInventario.objects.create(
-                    producto=det.producto,
-                    tipo="entrada",
-                    cantidad=det.cantidad,
-                    motivo="Recepción de compra",
-                    usuario=request.user,
-                    operacion_tipo=MovimientoInventario.OPERACION_COMPRA,
-                    compra=compra,
-                )
-            compra.estado = Compra.ESTADO_RECIBIDO
-            compra.save(update_fields=["estado"])
-
-        return Response({"id": compra.id, "estado": compra.estado}, status=status.HTTP_200_OK)
+        lineas = request.data.get("lineas") or None
+        try:
+            data = recibir_compra(compra, lineas, usuario=request.user)
+        except (ValueError, KeyError, TypeError, ArithmeticError, DjangoValidationError) as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class VentaDetailView(APIView):
@@ -1579,9 +1576,7 @@ class VentaReturnView(APIView):
                     reembolso=reembolso,
                     clasificacion=DevolucionProducto.CLASIFICACION_REINTEGRO,
                 )
-                Producto.objects.filter(id=producto.id).update(
-                    stock_actual=F("stock_actual") + cantidad
-                )
+                Producto.objects.ajustar_stock({producto.id: cantidad})
                 MovimientoInventario.objects.create(
                     producto=producto,
                     tipo="entrada",
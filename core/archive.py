@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_datetime
+
+from .ledger import cerrar_dia
+from .models import (
+    AuditLog,
+    HistorialPrecio,
+    MovimientoInventario,
+    PeriodoArchivado,
+    ResumenMovimientoMensual,
+    ResumenPrecioMensual,
+)
+
+
+TABLAS = {
+    PeriodoArchivado.TABLA_MOVIMIENTOS: MovimientoInventario,
+    PeriodoArchivado.TABLA_AUDITORIA: AuditLog,
+    PeriodoArchivado.TABLA_PRECIOS: HistorialPrecio,
+}
+# Resúmenes por producto y mes; indican en qué archivos aparece cada producto.
+_RESUMENES = {
+    PeriodoArchivado.TABLA_MOVIMIENTOS: ResumenMovimientoMensual,
+    PeriodoArchivado.TABLA_PRECIOS: ResumenPrecioMensual,
+}
+_LOTE_BORRADO = 5000
+_DEC = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _siguiente_mes(periodo: date) -> date:
+    return (periodo.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _ruta(tabla: str, periodo: date) -> Path:
+    return Path(settings.ARCHIVE_DIR) / tabla / f"{periodo:%Y-%m}.jsonl.gz"
+
+
+def _filas_del_mes(tabla: str, periodo: date):
+    qs = TABLAS[tabla].objects.filter(
+        fecha__date__gte=periodo, fecha__date__lt=_siguiente_mes(periodo)
+    )
+    if tabla == PeriodoArchivado.TABLA_PRECIOS:
+        # El último precio de cada producto queda en línea: de él salen el
+        # costo vigente y el de los lotes.
+        ultimo = HistorialPrecio.objects.filter(producto=OuterRef("producto")).order_by("-fecha", "-pk")
+        qs = qs.exclude(pk=Subquery(ultimo.values("pk")[:1]))
+    return qs.order_by("pk")
+
+
+def _guardar_resumen(tabla: str, periodo: date, qs) -> None:
+    if tabla == PeriodoArchivado.TABLA_MOVIMIENTOS:
+        filas = qs.order_by().values("producto_id").annotate(
+            entradas=Sum(Case(When(tipo="entrada", then=F("cantidad")), default=0, output_field=_DEC)),
+            salidas=Sum(Case(When(tipo="salida", then=F("cantidad")), default=0, output_field=_DEC)),
+            n=Count("id"),
+        )
+        ResumenMovimientoMensual.objects.bulk_create(
+            [
+                ResumenMovimientoMensual(
+                    producto_id=f["producto_id"],
+                    periodo=periodo,
+                    entradas=f["entradas"] or 0,
+                    salidas=f["salidas"] or 0,
+                    movimientos=f["n"],
+                )
+                for f in filas
+            ]
+        )
+    elif tabla == PeriodoArchivado.TABLA_PRECIOS:
+        filas = qs.order_by().values("producto_id").annotate(
+            costo_total=Sum("costo"), precio_total=Sum("precio"), n=Count("id")
+        )
+        ResumenPrecioMensual.objects.bulk_create(
+            [
+                ResumenPrecioMensual(
+                    producto_id=f["producto_id"],
+                    periodo=periodo,
+                    costo_total=f["costo_total"] or 0,
+                    precio_total=f["precio_total"] or 0,
+                    registros=f["n"],
+                )
+                for f in filas
+            ]
+        )
+
+
+def archivar_mes(tabla: str, periodo: date) -> int:
+    """Mueve las filas de ``tabla`` del mes ``periodo`` a un JSONL comprimido.
+
+    El archivo se escribe primero en un temporal y se renombra; luego, en una
+    transacción, se guardan los resúmenes mensuales, se borran las filas en
+    lotes y se registra el ``PeriodoArchivado``. Si el borrado falla las
+    filas quedan en el archivo y en la base; al reintentar se descartan del
+    archivo previo las que se vuelven a escribir, así no se duplican.
+    Devuelve las filas movidas.
+    """
+    periodo = periodo.replace(day=1)
+    qs = _filas_del_mes(tabla, periodo)
+    # Sólo se mueven las filas vistas al empezar; las que lleguen mientras
+    # tanto quedan para la próxima ejecución.
+    ids = list(qs.values_list("pk", flat=True))
+    if not ids:
+        return 0
+    qs = qs.filter(pk__lte=ids[-1])
+    pendientes = set(ids)
+    ruta = _ruta(tabla, periodo)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(".tmp")
+    filas = 0
+    with gzip.open(temporal, "wt", encoding="utf-8") as fh:
+        if ruta.exists():
+            with gzip.open(ruta, "rt", encoding="utf-8") as previo:
+                for linea in previo:
+                    if json.loads(linea)["id"] not in pendientes:
+                        fh.write(linea)
+        for fila in qs.values().iterator(chunk_size=2000):
+            if fila["id"] in pendientes:
+                fh.write(json.dumps(fila, cls=DjangoJSONEncoder) + "\n")
+                filas += 1
+    os.replace(temporal, ruta)
+
+    with transaction.atomic():
+        _guardar_resumen(tabla, periodo, qs)
+        for i in range(0, len(ids), _LOTE_BORRADO):
+            TABLAS[tabla].objects.filter(pk__in=ids[i : i + _LOTE_BORRADO]).delete()
+        registro, _ = PeriodoArchivado.objects.get_or_create(
+            tabla=tabla, periodo=periodo, defaults={"archivo": str(ruta)}
+        )
+        registro.filas += filas
+        registro.save(update_fields=["filas"])
+    return filas
+
+
+def archivar(horizon_days: Optional[int] = None, hoy: Optional[date] = None) -> Dict[str, int]:
+    """Archiva los meses completos anteriores al horizonte configurado.
+
+    Antes de archivar movimientos se guarda un saldo de cierre en el corte
+    para que ``stock_a_fecha`` no necesite las filas archivadas.
+    """
+    if horizon_days is None:
+        horizon_days = settings.ARCHIVE_HORIZON_DAYS
+    hoy = hoy or date.today()
+    corte = (hoy - timedelta(days=horizon_days)).replace(day=1)
+    resultado: Dict[str, int] = {}
+    for tabla, modelo in TABLAS.items():
+        meses = (
+            modelo.objects.filter(fecha__date__lt=corte)
+            .annotate(m=TruncMonth("fecha"))
+            .values_list("m", flat=True)
+            .distinct()
+            .order_by("m")
+        )
+        meses = [m.date() if hasattr(m, "date") else m for m in meses]
+        if meses and tabla == PeriodoArchivado.TABLA_MOVIMIENTOS:
+            cerrar_dia(corte - timedelta(days=1))
+        resultado[tabla] = sum(archivar_mes(tabla, m) for m in meses)
+    return resultado
+
+
+def leer_archivo(tabla: str, periodo: date) -> Iterator[Dict[str, Any]]:
+    """Itera las filas archivadas de ``tabla`` para el mes ``periodo``.
+
+    ``fecha`` se devuelve como ``datetime``, igual que en las filas en línea.
+    """
+    ruta = _ruta(tabla, periodo.replace(day=1))
+    if not ruta.exists():
+        return
+    with gzip.open(ruta, "rt", encoding="utf-8") as fh:
+        for linea in fh:
+            fila = json.loads(linea)
+            fila["fecha"] = parse_datetime(fila["fecha"])
+            yield fila
+
+
+def filas_periodo(
+    tabla: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    **filtros: Any,
+) -> Iterator[Dict[str, Any]]:
+    """Filas de ``tabla`` con fecha en ``[start, end)``, archivadas o no.
+
+    Lee primero los meses archivados desde disco y luego las filas en línea,
+    de modo que los reportes no necesitan saber dónde están los datos.
+    ``filtros`` son igualdades sobre columnas; con ``producto_id`` sólo se
+    abren los archivos de los meses en que el producto tiene resumen.
+    """
+    meses = meses_archivados(tabla, start, end, producto_id=filtros.get("producto_id"))
+    for periodo in sorted(meses):
+        for fila in leer_archivo(tabla, periodo):
+            dia = fila["fecha"].date()
+            if (start and dia < start) or (end and dia >= end):
+                continue
+            if all(fila.get(campo) == valor for campo, valor in filtros.items()):
+                yield fila
+    qs = TABLAS[tabla].objects.filter(**filtros)
+    if start:
+        qs = qs.filter(fecha__date__gte=start)
+    if end:
+        qs = qs.filter(fecha__date__lt=end)
+    for fila in qs.order_by("fecha").values().iterator(chunk_size=2000):
+        yield fila
+
+
+def meses_archivados(
+    tabla: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    producto_id: Optional[int] = None,
+) -> List[date]:
+    """Meses de ``tabla`` archivados dentro de ``[start, end)``.
+
+    Con ``producto_id`` se limitan a los meses con filas de ese producto.
+    """
+    qs = PeriodoArchivado.objects.filter(tabla=tabla)
+    if producto_id is not None and tabla in _RESUMENES:
+        qs = qs.filter(
+            periodo__in=_RESUMENES[tabla].objects.filter(producto_id=producto_id).values("periodo")
+        )
+    if start:
+        qs = qs.filter(periodo__gte=start.replace(day=1))
+    if end:
+        qs = qs.filter(periodo__lt=end)
+    return list(qs.values_list("periodo", flat=True))
+
+
+__all__ = [
+    "TABLAS",
+    "archivar_mes",
+    "archivar",
+    "leer_archivo",
+    "filas_periodo",
+    "meses_archivados",
+]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+_CACHE_VERSION_KEY = "catalogo_compacto:version"
+_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key() -> str:
+    version = cache.get_or_set(_CACHE_VERSION_KEY, 1, None)
+    return f"catalogo_compacto:{version}"
+
+
+def catalogo_compacto() -> Tuple[List[Dict[str, Any]], str]:
+    """Catálogo mínimo de productos activos y su ETag.
+
+    Usa ``values()`` sin instanciar modelos ni serializadores anidados y se
+    guarda en caché hasta que cambie algún producto o su stock. Los productos
+    cuyo próximo lote está rebajado incluyen ``descuento`` y ``precio_oferta``.
+    """
+    key = _cache_key()
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    from .allocation import descuentos_vigentes
+    from .models import Producto
+
+    descuentos = descuentos_vigentes()
+    filas = (
+        Producto.objects.filter(activo=True)
+        .order_by("nombre")
+        .values_list("id", "codigo", "nombre", "precio", "stock_actual", "unidad_media__abreviatura", "tipo")
+    )
+    productos = [
+        {
+            "id": pid,
+            "codigo": codigo,
+            "nombre": nombre,
+            "precio": float(precio),
+            "stock_actual": float(stock),
+            "unidad": unidad,
+            "tipo": tipo,
+        }
+        for pid, codigo, nombre, precio, stock, unidad, tipo in filas
+    ]
+    for producto in productos:
+        descuento = descuentos.get(producto["id"])
+        if descuento:
+            producto["descuento"] = float(descuento)
+            producto["precio_oferta"] = round(producto["precio"] * (1 - float(descuento)), 2)
+    etag = hashlib.sha1(
+        json.dumps(productos, separators=(",", ":")).encode()
+    ).hexdigest()
+    data = (productos, f'"{etag}"')
+    cache.set(key, data, _CACHE_TIMEOUT)
+    return data
+
+
+def _nueva_version() -> None:
+    try:
+        cache.incr(_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(_CACHE_VERSION_KEY, 1, None)
+
+
+def invalidar_catalogo() -> None:
+    """Descarta el catálogo compacto en caché al confirmar la transacción.
+
+    Si se invalidara antes, una lectura concurrente podría volver a guardar
+    el stock previo al commit durante todo el TTL.
+    """
+    transaction.on_commit(_nueva_version)
+
+
+__all__ = ["catalogo_compacto", "invalidar_catalogo"]
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Type, TypeVar
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import ContadorContencion, Producto
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+METRICAS = ("bloqueos", "espera_ms", "timeouts", "abortos")
+
+_INTENTOS_VOLCADO = 5
+_pendientes = threading.local()
+
+
+def _incrementar(producto_id: Optional[int], valores: Dict[str, int]) -> None:
+    clave = f"producto:{producto_id}" if producto_id is not None else "general"
+    cambios = {m: F(m) + v for m, v in valores.items()}
+    if ContadorContencion.objects.filter(clave=clave).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            ContadorContencion.objects.create(clave=clave, producto_id=producto_id, **valores)
+    except IntegrityError:
+        ContadorContencion.objects.filter(clave=clave).update(**cambios)
+
+
+def volcar_metricas() -> None:
+    """Guarda las métricas acumuladas por el hilo con incrementos ``F()``.
+
+    Debe llamarse fuera de la transacción de la venta: si esta se revierte
+    (o queda abortada por un ``lock_timeout``) las métricas no se pierden.
+    """
+    acumuladas: Dict[Optional[int], Dict[str, int]] = getattr(_pendientes, "valores", None) or {}
+    _pendientes.valores = {}
+    for producto_id, valores in acumuladas.items():
+        for intento in range(_INTENTOS_VOLCADO):
+            try:
+                _incrementar(producto_id, valores)
+                break
+            except DatabaseError:
+                # Las métricas nunca deben hacer fallar la operación medida.
+                if intento == _INTENTOS_VOLCADO - 1:
+                    logger.warning("No se pudieron guardar las métricas de contención", exc_info=True)
+                else:
+                    time.sleep(0.01 * 2**intento)
+
+
+def registrar(metrica: str, producto_id: Optional[int] = None, valor: int = 1) -> None:
+    """Suma ``valor`` a una métrica de contención, por producto o general.
+
+    Dentro de una transacción sólo se acumula en memoria y se escribe al
+    confirmarla o, si se revierte, cuando ``con_reintentos`` termina el
+    intento.
+    """
+    if not hasattr(_pendientes, "valores"):
+        _pendientes.valores = {}
+    valores = _pendientes.valores.setdefault(producto_id, {})
+    valores[metrica] = valores.get(metrica, 0) + valor
+    if connection.in_atomic_block:
+        transaction.on_commit(volcar_metricas)
+    else:
+        volcar_metricas()
+
+
+def metricas_contencion() -> Dict[str, Any]:
+    """Totales y métricas por producto, los más disputados primero."""
+    filas = list(ContadorContencion.objects.values("producto_id", "producto__nombre", *METRICAS))
+    por_producto = [
+        {"producto": f["producto_id"], "nombre": f["producto__nombre"], **{m: f[m] for m in METRICAS}}
+        for f in filas
+        if f["producto_id"] is not None
+    ]
+    por_producto.sort(key=lambda fila: (fila["espera_ms"], fila["timeouts"]), reverse=True)
+    return {
+        "total": {m: sum(f[m] for f in filas) for m in METRICAS},
+        "productos": por_producto,
+    }
+
+
+def _acotar_espera() -> None:
+    """Limita la espera por bloqueos a ``SALE_LOCK_TIMEOUT_MS``.
+
+    En Postgres fija ``lock_timeout`` sólo para la transacción en curso
+    (``set_config(..., true)``), así que no hace falta restaurarlo: si el
+    tiempo se agota la transacción queda abortada y cualquier otra consulta
+    fallaría. SQLite no tiene bloqueos por fila: la espera la acota su
+    ``timeout`` y los conflictos se resuelven reintentando.
+    """
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('lock_timeout', %s, true)",
+            [f"{settings.SALE_LOCK_TIMEOUT_MS}ms"],
+        )
+
+
+def bloquear_productos(ids: Iterable[int]) -> Dict[int, Producto]:
+    """Bloquea (``SELECT ... FOR UPDATE``) los productos de una operación.
+
+    Las filas se piden en una consulta y en orden de id, de modo que dos
+    ventas con los mismos productos esperan en lugar de bloquearse entre sí.
+    La espera está acotada; si se agota se registra un ``timeout`` y se
+    relanza el ``OperationalError``. Sólo se registran las tomas que tardaron
+    al menos ``SALE_LOCK_WAIT_MIN_MS``.
+    Debe llamarse dentro de una transacción.
+    """
+    ids = sorted(set(ids))
+    inicio = time.perf_counter()
+    try:
+        _acotar_espera()
+        productos = {
+            p.id: p for p in Producto.objects.select_for_update().filter(id__in=ids).order_by("id")
+        }
+    except Exception:
+        for pid in ids:
+            registrar("timeouts", pid)
+        raise
+    espera_ms = int((time.perf_counter() - inicio) * 1000)
+    if espera_ms >= settings.SALE_LOCK_WAIT_MIN_MS:
+        for pid in productos:
+            registrar("bloqueos", pid)
+            registrar("espera_ms", pid, espera_ms)
+    return productos
+
+
+def con_reintentos(
+    funcion: Callable[[], T],
+    excepciones: Tuple[Type[BaseException], ...],
+    intentos: Optional[int] = None,
+    espera_base: Optional[float] = None,
+) -> T:
+    """Ejecuta ``funcion`` reintentando ante contención de bloqueos.
+
+    Entre intentos espera un tiempo aleatorio entre cero y
+    ``espera_base * 2**n`` (backoff exponencial con jitter completo, con tope
+    ``SALE_LOCK_BACKOFF_MAX``) para que las solicitudes en conflicto no
+    vuelvan a chocar a la vez. Tras ``intentos`` fallos se relanza la última
+    excepción.
+    """
+    intentos = settings.SALE_LOCK_RETRIES if intentos is None else intentos
+    espera_base = settings.SALE_LOCK_BACKOFF if espera_base is None else espera_base
+    for intento in range(intentos):
+        try:
+            return funcion()
+        except excepciones:
+            if intento == intentos - 1:
+                registrar("abortos")
+                raise
+        finally:
+            volcar_metricas()
+        espera = random.uniform(0, min(espera_base * 2**intento, settings.SALE_LOCK_BACKOFF_MAX))
+        logger.info("Inventario bloqueado, reintento %s en %.3fs", intento + 1, espera)
+        time.sleep(espera)
+    raise ValueError("intentos debe ser mayor que cero")
+
+
+__all__ = [
+    "METRICAS",
+    "registrar",
+    "volcar_metricas",
+    "metricas_contencion",
+    "bloquear_productos",
+    "con_reintentos",
+]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from django.db.models import Count, Max, Min, Sum
+
+from .models import DetallesVenta, ResumenCliente, Venta
+
+
+_TOP_PRODUCTOS = 5
+
+
+def actualizar_resumen_cliente(cliente_id: int) -> Optional[ResumenCliente]:
+    """Recalcula el ``ResumenCliente`` de un cliente a partir de sus ventas.
+
+    Solo lee las ventas de ese cliente (dos consultas agrupadas), por lo que
+    se ejecuta al confirmar cada venta sin recorrer el resto del historial.
+    """
+    if cliente_id is None:
+        return None
+    totales = Venta.objects.filter(cliente_id=cliente_id).aggregate(
+        total=Sum("total"),
+        n=Count("id"),
+        primera=Min("fecha"),
+        ultima=Max("fecha"),
+    )
+    frecuentes = [
+        {"producto": p["producto__nombre"], "cantidad": float(p["total"])}
+        for p in DetallesVenta.objects.filter(venta__cliente_id=cliente_id)
+        .values("producto__nombre")
+        .annotate(total=Sum("cantidad"))
+        .order_by("-total")[:_TOP_PRODUCTOS]
+    ]
+    resumen, _ = ResumenCliente.objects.update_or_create(
+        cliente_id=cliente_id,
+        defaults={
+            "total_gastado": totales["total"] or 0,
+            "ventas": totales["n"],
+            "primera_compra": totales["primera"],
+            "ultima_compra": totales["ultima"],
+            "productos_frecuentes": frecuentes,
+        },
+    )
+    return resumen
+
+
+def obtener_resumen_cliente(cliente_id: int) -> ResumenCliente:
+    """Devuelve el resumen guardado, construyéndolo si aún no existe."""
+    resumen = ResumenCliente.objects.filter(cliente_id=cliente_id).first()
+    return resumen or actualizar_resumen_cliente(cliente_id)
+
+
+def _puntajes(valores: List[Any]) -> Dict[Any, int]:
+    """Quintil (1 a 5) de cada valor; los empates comparten puntaje."""
+    orden = sorted(set(valores))
+    n = len(orden)
+    if n == 1:
+        return {orden[0]: 3}
+    return {v: 1 + (i * 5) // n for i, v in enumerate(orden)}
+
+
+def _segmento(r: int, f: int, m: int) -> str:
+    if r >= 4 and f >= 4:
+        return "campeones"
+    if f >= 4:
+        return "leales"
+    if r >= 4 and f <= 2:
+        return "nuevos"
+    if r <= 2 and (f >= 3 or m >= 4):
+        return "en_riesgo"
+    if r <= 2:
+        return "perdidos"
+    return "regulares"
+
+
+def segmentacion_rfm(hoy: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Segmentación RFM de todos los clientes con compras.
+
+    Recencia, frecuencia y monto salen de una sola consulta agrupada sobre
+    ``Venta``; cada dimensión se puntúa por quintiles de 1 a 5.
+    """
+    hoy = hoy or date.today()
+    filas = list(
+        Venta.objects.filter(cliente__isnull=False)
+        .values("cliente_id", "cliente__nombre")
+        .annotate(ultima=Max("fecha"), frecuencia=Count("id"), monto=Sum("total"))
+        .order_by("cliente_id")
+    )
+    if not filas:
+        return []
+    for f in filas:
+        f["recencia"] = (hoy - f["ultima"]).days
+    r_score = _puntajes([-f["recencia"] for f in filas])
+    f_score = _puntajes([f["frecuencia"] for f in filas])
+    m_score = _puntajes([f["monto"] or 0 for f in filas])
+
+    resultado = []
+    for f in filas:
+        r = r_score[-f["recencia"]]
+        fr = f_score[f["frecuencia"]]
+        m = m_score[f["monto"] or 0]
+        resultado.append(
+            {
+                "cliente": f["cliente_id"],
+                "nombre": f["cliente__nombre"],
+                "ultima_compra": f["ultima"].isoformat(),
+                "recencia": f["recencia"],
+                "frecuencia": f["frecuencia"],
+                "monto": float(f["monto"] or 0),
+                "r": r,
+                "f": fr,
+                "m": m,
+                "segmento": _segmento(r, fr, m),
+            }
+        )
+    return resultado
+
+
+__all__ = [
+    "actualizar_resumen_cliente",
+    "obtener_resumen_cliente",
+    "segmentacion_rfm",
+]
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .models import Compra, DetalleCompra, EnvioOrdenCompra
+from .outbox import encolar_correo
+
+
+_TIMEOUT = 10
+_sesion: Optional[requests.Session] = None
+_sesion_lock = threading.Lock()
+
+
+def sesion() -> requests.Session:
+    """Sesión HTTP compartida con keep-alive y reintentos.
+
+    Reintenta errores de conexión y respuestas 429/5xx con backoff; los POST
+    se pueden reintentar porque cada orden lleva su ``Idempotency-Key``.
+    """
+    global _sesion
+    with _sesion_lock:
+        if _sesion is None:
+            reintentos = Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False,
+            )
+            adaptador = HTTPAdapter(
+                pool_maxsize=settings.SUPPLIER_DISPATCH_WORKERS, max_retries=reintentos
+            )
+            _sesion = requests.Session()
+            _sesion.mount("http://", adaptador)
+            _sesion.mount("https://", adaptador)
+        return _sesion
+
+
+def destino_configurado() -> bool:
+    """Indica si hay una API o un correo de proveedor al que despachar."""
+    return bool(os.getenv("SUPPLIER_API_URL") or os.getenv("SUPPLIER_EMAIL"))
+
+
+def _datos_compras(compra_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Payload de cada compra, con dos consultas para cualquier cantidad."""
+    datos = {
+        c.id: {
+            "id": c.id,
+            "fecha": c.fecha.isoformat(),
+            "proveedor": c.proveedor.nombre,
+            "items": [],
+            "total": float(c.total),
+        }
+        for c in Compra.objects.filter(id__in=list(compra_ids)).select_related("proveedor")
+    }
+    for compra_id, producto, cantidad, precio in DetalleCompra.objects.filter(
+        compra_id__in=list(datos)
+    ).values_list("compra_id", "producto__nombre", "cantidad", "precio_unitario"):
+        datos[compra_id]["items"].append(
+            {"producto": producto, "cantidad": float(cantidad), "precio_unitario": float(precio)}
+        )
+    return datos
+
+
+def _post(url: str, token: Optional[str], data: Dict[str, Any], clave: str) -> Tuple[bool, Any]:
+    """Envía una orden a la API del proveedor; no toca la base de datos."""
+    headers = {"Idempotency-Key": clave}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        resp = sesion().post(url, json=data, headers=headers, timeout=_TIMEOUT)
+        resp.raise_for_status()
+        return True, resp.json()
+    except (requests.RequestException, ValueError) as exc:
+        return False, str(exc)
+
+
+def encolar_ordenes(compra_ids: Iterable[int]) -> None:
+    """Deja las compras pendientes de despacho para ``procesar_envios``.
+
+    Con ``ignore_conflicts`` encolar dos veces la misma compra, incluso desde
+    procesos distintos, no falla.
+    """
+    EnvioOrdenCompra.objects.bulk_create(
+        [EnvioOrdenCompra(compra_id=cid) for cid in compra_ids], ignore_conflicts=True
+    )
+
+
+def despachar_ordenes(compra_ids: Iterable[int]) -> Dict[int, Any]:
+    """Despacha varias órdenes de compra a su proveedor.
+
+    Con ``SUPPLIER_API_URL`` los POST se hacen en paralelo desde un pool de
+    hilos que comparte la sesión HTTP; si no, cada orden se encola por correo
+    a ``SUPPLIER_EMAIL``. Las consultas y escrituras se hacen en el hilo que
+    llama, los hilos sólo hacen red. Las órdenes ya enviadas no se reenvían:
+    se devuelve la respuesta guardada. Devuelve la respuesta por compra.
+    """
+    api_url = os.getenv("SUPPLIER_API_URL")
+    email = os.getenv("SUPPLIER_EMAIL")
+    if not api_url and not email:
+        raise ValueError("No supplier endpoint configured")
+
+    datos = _datos_compras(compra_ids)
+    encolar_ordenes(datos)
+    envios = {e.compra_id: e for e in EnvioOrdenCompra.objects.filter(compra_id__in=list(datos))}
+    resultado = {
+        cid: e.respuesta for cid, e in envios.items() if e.estado == EnvioOrdenCompra.ESTADO_ENVIADO
+    }
+    pendientes = [envios[cid] for cid in datos if cid not in resultado]
+    if not pendientes:
+        return resultado
+
+    ahora = timezone.now()
+    for envio in pendientes:
+        envio.intentos += 1
+        envio.actualizado = ahora
+
+    if api_url:
+        token = os.getenv("SUPPLIER_API_TOKEN")
+        trabajadores = min(settings.SUPPLIER_DISPATCH_WORKERS, len(pendientes))
+        with ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="proveedor") as pool:
+            respuestas = list(
+                pool.map(lambda e: _post(api_url, token, datos[e.compra_id], e.clave), pendientes)
+            )
+        for envio, (ok, respuesta) in zip(pendientes, respuestas):
+            envio.canal = EnvioOrdenCompra.CANAL_API
+            if ok:
+                envio.estado = EnvioOrdenCompra.ESTADO_ENVIADO
+                envio.respuesta = respuesta
+                envio.ultimo_error = ""
+            else:
+                envio.estado = EnvioOrdenCompra.ESTADO_FALLIDO
+                envio.ultimo_error = respuesta
+            resultado[envio.compra_id] = respuesta
+    else:
+        for envio in pendientes:
+            data = datos[envio.compra_id]
+            lines = [f"{i['producto']}: {i['cantidad']} x {i['precio_unitario']}" for i in data["items"]]
+            correo = encolar_correo(
+                f"Orden de compra {data['id']}",
+                "\n".join(lines) + f"\nTotal: {data['total']}",
+                [email],
+                clave=f"orden-compra:{envio.clave}",
+            )
+            envio.canal = EnvioOrdenCompra.CANAL_CORREO
+            envio.estado = EnvioOrdenCompra.ESTADO_ENVIADO
+            envio.respuesta = {"status": "queued", "correo": correo.id}
+            resultado[envio.compra_id] = envio.respuesta
+
+    EnvioOrdenCompra.objects.bulk_update(
+        pendientes, ["canal", "estado", "intentos", "respuesta", "ultimo_error", "actualizado"]
+    )
+    return resultado
+
+
+def procesar_envios(limite: int = 50) -> dict:
+    """Despacha las órdenes encoladas o fallidas con intentos disponibles.
+
+    Pensado para el comando ``despachar_ordenes``, fuera del ciclo de la
+    petición. Devuelve cuántas órdenes quedaron enviadas y cuántas fallaron.
+    """
+    ids = list(
+        EnvioOrdenCompra.objects.filter(
+            estado__in=[EnvioOrdenCompra.ESTADO_PENDIENTE, EnvioOrdenCompra.ESTADO_FALLIDO],
+            intentos__lt=settings.SUPPLIER_DISPATCH_MAX_INTENTOS,
+        )
+        .order_by("actualizado")
+        .values_list("compra_id", flat=True)[:limite]
+    )
+    resultado = {"enviados": 0, "fallidos": 0}
+    if not ids:
+        return resultado
+    despachar_ordenes(ids)
+    for estado in EnvioOrdenCompra.objects.filter(compra_id__in=ids).values_list("estado", flat=True):
+        if estado == EnvioOrdenCompra.ESTADO_ENVIADO:
+            resultado["enviados"] += 1
+        else:
+            resultado["fallidos"] += 1
+    return resultado
+
+
+__all__ = ["sesion", "destino_configurado", "encolar_ordenes", "despachar_ordenes", "procesar_envios"]
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import math
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import ResumenCliente, Transaccion, Venta
+
+
+_CACHE_VERSION_KEY = "evolucion_negocio:version"
+_CACHE_TIMEOUT = 60 * 15
+_PERIODOS_PROYECTADOS = 3
+# Cuantiles t de Student al 97,5 % (intervalo del 95 %) por grados de libertad.
+_T_975 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def _t_critico(gl: int) -> float:
+    return _T_975[gl - 1] if gl <= len(_T_975) else 1.96
+
+
+def _inicio(d: date, period: str) -> date:
+    if period == "quarter":
+        return d.replace(month=((d.month - 1) // 3) * 3 + 1, day=1)
+    return d.replace(day=1)
+
+
+def _sumar_mes(filas, campo: str, period: str) -> Dict[date, float]:
+    """Pliega un rollup mensual en meses o trimestres."""
+    resultado: Dict[date, float] = {}
+    for f in filas:
+        clave = _inicio(f["p"], period)
+        resultado[clave] = resultado.get(clave, 0.0) + float(f[campo] or 0)
+    return resultado
+
+
+def _mas_meses(d: date, meses: int) -> date:
+    total = d.year * 12 + d.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def regresion_lineal(y: List[float]) -> Optional[Dict[str, float]]:
+    """Ajuste por mínimos cuadrados de ``y`` sobre 0..n-1 en una pasada.
+
+    Devuelve pendiente, intercepto, error estándar residual y ``sxx``; con
+    menos de dos puntos no hay ajuste.
+    """
+    n = len(y)
+    if n < 2:
+        return None
+    sx = n * (n - 1) / 2
+    sxx_total = (n - 1) * n * (2 * n - 1) / 6
+    sy = sum(y)
+    sxy = sum(i * v for i, v in enumerate(y))
+    syy = sum(v * v for v in y)
+    x_mean = sx / n
+    y_mean = sy / n
+    sxx = sxx_total - n * x_mean * x_mean
+    slope = (sxy - n * x_mean * y_mean) / sxx if sxx else 0.0
+    intercept = y_mean - slope * x_mean
+    sse = max(syy - n * y_mean * y_mean - slope * slope * sxx, 0.0)
+    se = math.sqrt(sse / (n - 2)) if n > 2 else 0.0
+    return {"slope": slope, "intercept": intercept, "se": se, "sxx": sxx, "n": n, "x_mean": x_mean}
+
+
+def _proyectar(ajuste: Dict[str, float], x: float) -> Dict[str, float]:
+    """Predicción en ``x`` con su intervalo de predicción del 95 %."""
+    n = ajuste["n"]
+    pred = ajuste["intercept"] + ajuste["slope"] * x
+    if n > 2 and ajuste["sxx"]:
+        margen = _t_critico(n - 2) * ajuste["se"] * math.sqrt(
+            1 + 1 / n + (x - ajuste["x_mean"]) ** 2 / ajuste["sxx"]
+        )
+    else:
+        margen = 0.0
+    return {"net_income": pred, "lower": pred - margen, "upper": pred + margen}
+
+
+def calcular_evolucion(
+    period: str = "month",
+    category: Optional[str] = None,
+    canal: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Serie histórica de ventas, resultado, clientes nuevos y proyección.
+
+    Ventas e ingresos/egresos se agrupan por mes en SQL y los trimestres se
+    pliegan desde esos rollups. Con categoría, las ventas se cuentan con
+    ``distinct`` para no inflarlas por el join con los detalles.
+    """
+    ventas = Venta.objects.all()
+    if category:
+        ventas = ventas.filter(detallesventa__producto__categoria_id=category)
+    ingresos = Transaccion.objects.filter(tipo="ingreso")
+    if canal:
+        ingresos = ingresos.filter(canal=canal)
+    egresos = Transaccion.objects.filter(tipo="egreso")
+
+    def _mensual(qs, **agregados):
+        return qs.annotate(p=TruncMonth("fecha")).values("p").annotate(**agregados).order_by("p")
+
+    conteo = _sumar_mes(_mensual(ventas, n=Count("id", distinct=True)), "n", period)
+    ingresos_dict = _sumar_mes(_mensual(ingresos, total=Sum("monto")), "total", period)
+    egresos_dict = _sumar_mes(_mensual(egresos, total=Sum("monto")), "total", period)
+
+    if category:
+        primeras = (
+            {"p": f["primera"], "n": 1}
+            for f in ventas.filter(cliente__isnull=False)
+            .values("cliente_id")
+            .annotate(primera=Min("fecha"))
+            .order_by()
+        )
+    else:
+        primeras = (
+            ResumenCliente.objects.filter(primera_compra__isnull=False)
+            .annotate(p=TruncMonth("primera_compra"))
+            .values("p")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+    new_clients = _sumar_mes(primeras, "n", period)
+
+    result: List[Dict[str, Any]] = []
+    prev_income = None
+    for p in sorted(conteo):
+        income = ingresos_dict.get(p, 0.0)
+        expense = egresos_dict.get(p, 0.0)
+        net_income = income - expense
+        result.append({
+            "period": p.isoformat(),
+            "sales": int(conteo[p]),
+            "new_clients": int(new_clients.get(p, 0)),
+            "net_income": net_income,
+            "profit_margin": (net_income / income * 100) if income else 0.0,
+            "growth": ((income - prev_income) / prev_income * 100) if prev_income else 0.0,
+        })
+        prev_income = income
+
+    ajuste = regresion_lineal([r["net_income"] for r in result])
+    if ajuste and ajuste["slope"] > 0:
+        paso = 3 if period == "quarter" else 1
+        ultimo = date.fromisoformat(result[-1]["period"])
+        n = ajuste["n"]
+        for i in range(1, _PERIODOS_PROYECTADOS + 1):
+            result.append({
+                "period": _mas_meses(ultimo, paso * i).isoformat(),
+                "sales": None,
+                "new_clients": None,
+                **_proyectar(ajuste, n - 1 + i),
+                "profit_margin": None,
+                "growth": None,
+                "projected": True,
+            })
+    return result
+
+
+def obtener_evolucion(
+    period: str = "month",
+    category: Optional[str] = None,
+    canal: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """``calcular_evolucion`` en caché por periodo, categoría y canal.
+
+    La clave incluye el periodo en curso, así que al empezar uno nuevo la
+    serie se recalcula; cerrar un ``Balance`` también la invalida.
+    """
+    version = cache.get_or_set(_CACHE_VERSION_KEY, 1, None)
+    actual = _inicio(date.today(), period)
+    key = f"evolucion_negocio:{version}:{period}:{category or ''}:{canal or ''}:{actual.isoformat()}"
+    data = cache.get(key)
+    if data is None:
+        data = calcular_evolucion(period, category, canal)
+        cache.set(key, data, _CACHE_TIMEOUT)
+    return data
+
+
+def invalidar_evolucion() -> None:
+    """Descarta las series en caché (p. ej. al cerrar un periodo)."""
+    try:
+        cache.incr(_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(_CACHE_VERSION_KEY, 1, None)
+
+
+__all__ = [
+    "regresion_lineal",
+    "calcular_evolucion",
+    "obtener_evolucion",
+    "invalidar_evolucion",
+]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ClaveIdempotencia
+
+
+HEADER = "Idempotency-Key"
+
+
+def huella(request) -> str:
+    """SHA-256 de la ruta y el cuerpo de la solicitud, con claves ordenadas."""
+    cuerpo = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f"{request.method} {request.path}\n{cuerpo}".encode()).hexdigest()
+
+
+def reservar_clave(request, clave: str) -> Tuple[Optional[ClaveIdempotencia], Optional[Response]]:
+    """Registra ``clave`` como en curso o devuelve la respuesta que corresponde.
+
+    Devuelve ``(registro, None)`` si la solicitud debe procesarse y
+    ``(None, respuesta)`` si ya se conoce el resultado: la respuesta guardada,
+    409 si la original sigue en curso o 422 si la clave se usó con otro cuerpo.
+    Las claves vencidas (``IDEMPOTENCY_KEY_TTL_HOURS``) se descartan.
+    """
+    limite = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    actual = huella(request)
+    with transaction.atomic():
+        ClaveIdempotencia.objects.filter(usuario=request.user, clave=clave, creada__lt=limite).delete()
+        registro, creada = ClaveIdempotencia.objects.get_or_create(
+            usuario=request.user,
+            clave=clave,
+            defaults={"ruta": request.path, "huella": actual},
+        )
+    if creada:
+        return registro, None
+    if registro.huella != actual:
+        return None, Response(
+            {"detail": "La clave de idempotencia ya se usó con otra solicitud."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if registro.estado == ClaveIdempotencia.ESTADO_EN_CURSO:
+        return None, Response(
+            {"detail": "La solicitud original todavía se está procesando."},
+            status=status.HTTP_409_CONFLICT,
+            headers={"Retry-After": "1"},
+        )
+    return None, Response(
+        registro.respuesta,
+        status=registro.codigo_respuesta,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def completar_clave(registro: ClaveIdempotencia, response: Response) -> None:
+    """Guarda una respuesta exitosa; ante un error libera la clave para reintentar."""
+    if not status.is_success(response.status_code):
+        registro.delete()
+        return
+    registro.estado = ClaveIdempotencia.ESTADO_COMPLETADA
+    registro.codigo_respuesta = response.status_code
+    registro.respuesta = response.data
+    registro.save(update_fields=["estado", "codigo_respuesta", "respuesta"])
+
+
+class IdempotenteMixin:
+    """Hace idempotente el ``create`` de una vista DRF con ``Idempotency-Key``.
+
+    Sin la cabecera la vista se comporta igual que antes. Con ella, repetir
+    la solicitud devuelve la respuesta original sin volver a ejecutarla.
+    """
+
+    def create(self, request, *args, **kwargs):
+        clave = request.headers.get(HEADER)
+        if not clave:
+            return super().create(request, *args, **kwargs)
+        registro, previa = reservar_clave(request, clave)
+        if previa is not None:
+            return previa
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            registro.delete()
+            raise
+        completar_clave(registro, response)
+        return response
+
+
+def purgar_claves() -> int:
+    """Elimina las claves vencidas y devuelve cuántas se borraron."""
+    limite = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    return ClaveIdempotencia.objects.filter(creada__lt=limite).delete()[0]
+
+
+__all__ = ["HEADER", "IdempotenteMixin", "reservar_clave", "completar_clave", "purgar_claves"]
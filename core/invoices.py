@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import django
+from django.core.files.base import ContentFile
+from django.db import transaction
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from .models import DetallesVenta, FacturaVenta, Venta
+
+
+_FORM_TITULO = "titulo"
+_FORM_TABLA = "encabezado_tabla"
+
+_POOL_EXPORTES: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class _Plantilla:
+    """Medidas y textos fijos de la factura, calculados una vez por proceso."""
+
+    ancho: float
+    alto: float
+    titulo_x: float
+    columnas: Tuple[Tuple[str, float], ...]
+    alto_tabla: float
+
+
+@lru_cache(maxsize=1)
+def _plantilla() -> _Plantilla:
+    ancho, alto = A4
+    return _Plantilla(
+        ancho=ancho,
+        alto=alto,
+        titulo_x=200,
+        columnas=(("Producto", 50), ("Cantidad", 260), ("Precio", 340), ("Subtotal", 430)),
+        alto_tabla=50,
+    )
+
+
+def _preparar_formularios(p: canvas.Canvas, t: _Plantilla) -> None:
+    """Dibuja una vez por documento los bloques fijos como XObjects.
+
+    Cada página sólo los referencia con ``doForm``, sin volver a emitir sus
+    operaciones de dibujo.
+    """
+    p.beginForm(_FORM_TITULO)
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(t.titulo_x, 0, "Factura de venta")
+    p.endForm()
+
+    p.beginForm(_FORM_TABLA)
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(50, 0, "Detalle")
+    p.setFont("Helvetica", 11)
+    for titulo, x in t.columnas:
+        p.drawString(x, -20, titulo)
+    p.line(50, -35, t.ancho - 50, -35)
+    p.endForm()
+
+
+def _form_en(p: canvas.Canvas, nombre: str, y: float) -> None:
+    p.saveState()
+    p.translate(0, y)
+    p.doForm(nombre)
+    p.restoreState()
+
+
+def datos_facturas(venta_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Datos para renderizar varias facturas, en dos consultas ``values()``.
+
+    El resultado sólo contiene tipos simples, así que puede enviarse a otros
+    procesos.
+    """
+    ventas = {
+        v["id"]: {**v, "lineas": []}
+        for v in Venta.objects.filter(id__in=list(venta_ids)).values(
+            "id", "fecha", "total", "cliente__nombre", "cliente__email", "usuario__username"
+        )
+    }
+    for venta_id, producto, cantidad, precio in (
+        DetallesVenta.objects.filter(venta_id__in=list(ventas))
+        .order_by("venta_id", "id")
+        .values_list("venta_id", "producto__nombre", "cantidad", "precio_unitario")
+    ):
+        ventas[venta_id]["lineas"].append((producto, cantidad, precio))
+    return ventas
+
+
+def _encabezado(p: canvas.Canvas, datos: Dict[str, Any], y: float) -> float:
+    _form_en(p, _FORM_TITULO, y)
+    y -= 25
+    p.setFont("Helvetica", 12)
+    p.drawString(50, y, f"Factura: F-{datos['id']:06d}")
+    y -= 18
+    p.drawString(50, y, f"Fecha: {datos['fecha']}")
+    y -= 18
+    p.drawString(50, y, f"Cliente: {datos['cliente__nombre'] or 'Consumidor final'}")
+    y -= 18
+    if datos["cliente__email"]:
+        p.drawString(50, y, f"Email: {datos['cliente__email']}")
+        y -= 18
+    p.drawString(50, y, f"Vendedor: {datos['usuario__username']}")
+    y -= 30
+    return y
+
+
+def renderizar_factura(datos: Dict[str, Any]) -> bytes:
+    """PDF de una factura a partir de ``datos_facturas``; no consulta la base."""
+    t = _plantilla()
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    _preparar_formularios(p, t)
+
+    y = _encabezado(p, datos, t.alto - 50)
+    _form_en(p, _FORM_TABLA, y)
+    y -= t.alto_tabla
+    p.setFont("Helvetica", 11)
+    for producto, cantidad, precio in datos["lineas"]:
+        p.drawString(50, y, producto[:30])
+        p.drawRightString(310, y, f"{cantidad}")
+        p.drawRightString(400, y, f"${precio}")
+        p.drawRightString(500, y, f"${cantidad * precio}")
+        y -= 15
+        if y < 80:
+            p.showPage()
+            y = _encabezado(p, datos, t.alto - 80)
+            p.setFont("Helvetica", 11)
+
+    y -= 10
+    p.line(350, y, t.ancho - 50, y)
+    y -= 20
+    p.setFont("Helvetica-Bold", 12)
+    p.drawRightString(500, y, f"Total: ${datos['total']}")
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def _pool(procesos: int) -> ProcessPoolExecutor:
+    # ``django.setup`` permite importar este módulo si los hijos se crean con spawn.
+    return ProcessPoolExecutor(max_workers=procesos, initializer=django.setup)
+
+
+def _renderizar_lote(datos: List[Dict[str, Any]], procesos: int) -> List[bytes]:
+    if procesos <= 1 or len(datos) <= 1:
+        return [renderizar_factura(d) for d in datos]
+    with _pool(procesos) as pool:
+        return list(pool.map(renderizar_factura, datos, chunksize=max(1, len(datos) // (procesos * 4))))
+
+
+def _guardar_pdf(factura: FacturaVenta, pdf: bytes) -> None:
+    if factura.pdf:
+        factura.pdf.delete(save=False)
+    factura.pdf.save(f"{factura.numero}.pdf", ContentFile(pdf), save=True)
+
+
+def renderizar_facturas(
+    desde: date,
+    hasta: Optional[date] = None,
+    procesos: int = 1,
+    reescribir: bool = False,
+) -> int:
+    """Genera y guarda las facturas de las ventas entre ``desde`` y ``hasta``.
+
+    Las ventas que ya tienen factura se omiten salvo con ``reescribir``, que
+    reemplaza el PDF conservando el número (reimpresiones de fin de mes,
+    exportes para el contador). El renderizado se reparte en ``procesos``.
+    Devuelve la cantidad de facturas escritas.
+    """
+    ventas = Venta.objects.filter(fecha__gte=desde, fecha__lte=hasta or desde)
+    if not reescribir:
+        ventas = ventas.filter(factura__isnull=True)
+    datos = list(datos_facturas(ventas.values_list("id", flat=True)).values())
+    if not datos:
+        return 0
+    pdfs = _renderizar_lote(datos, procesos)
+
+    facturas = {f.venta_id: f for f in FacturaVenta.objects.filter(venta_id__in=[d["id"] for d in datos])}
+    with transaction.atomic():
+        for d, pdf in zip(datos, pdfs):
+            factura = facturas.get(d["id"]) or FacturaVenta(venta_id=d["id"], numero=f"F-{d['id']:06d}")
+            _guardar_pdf(factura, pdf)
+    return len(datos)
+
+
+class _Salida:
+    """Archivo de sólo escritura que acumula lo que ``zipfile`` va emitiendo."""
+
+    def __init__(self) -> None:
+        self._partes: List[bytes] = []
+        self._posicion = 0
+
+    def write(self, datos: bytes) -> int:
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def flush(self) -> None:
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _pool_compartido(procesos: int) -> ProcessPoolExecutor:
+    """Pool único para las descargas, creado en la primera que lo necesita.
+
+    Así las peticiones no crean procesos cada vez y, entre todas, no renderizan
+    con más de ``procesos`` trabajadores.
+    """
+    global _POOL_EXPORTES
+    with _POOL_LOCK:
+        if _POOL_EXPORTES is None:
+            _POOL_EXPORTES = _pool(procesos)
+        return _POOL_EXPORTES
+
+
+def _tiene_pdf(factura: FacturaVenta) -> bool:
+    return bool(factura.pdf) and factura.pdf.storage.exists(factura.pdf.name)
+
+
+def _completar_facturas(datos: List[Dict[str, Any]], procesos: int) -> List[FacturaVenta]:
+    """Renderiza y guarda las facturas que faltan.
+
+    La fila se toma con ``get_or_create``: si otra petición la creó mientras
+    se renderizaba, se conserva su PDF.
+    """
+    if procesos > 1 and len(datos) > 1:
+        chunk = max(1, len(datos) // (procesos * 4))
+        pdfs = list(_pool_compartido(procesos).map(renderizar_factura, datos, chunksize=chunk))
+    else:
+        pdfs = [renderizar_factura(d) for d in datos]
+    facturas = []
+    for d, pdf in zip(datos, pdfs):
+        with transaction.atomic():
+            factura, _ = FacturaVenta.objects.get_or_create(
+                venta_id=d["id"], defaults={"numero": f"F-{d['id']:06d}"}
+            )
+            if not _tiene_pdf(factura):
+                _guardar_pdf(factura, pdf)
+        facturas.append(factura)
+    return facturas
+
+
+def _emitir_zip(facturas: List[FacturaVenta], tamano_bloque: int) -> Iterator[bytes]:
+    salida = _Salida()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as archivo:
+        for factura in sorted(facturas, key=lambda f: f.numero):
+            with factura.pdf.open("rb"), archivo.open(f"{factura.numero}.pdf", "w") as destino:
+                for bloque in factura.pdf.chunks(tamano_bloque):
+                    destino.write(bloque)
+                    datos = salida.vaciar()
+                    if datos:
+                        yield datos
+    yield salida.vaciar()
+
+
+def zip_facturas(
+    desde: date, hasta: date, procesos: int = 1, tamano_bloque: int = 64 * 1024
+) -> Iterator[bytes]:
+    """ZIP con los PDF de las facturas de ``desde`` a ``hasta``, por partes.
+
+    Las ventas sin factura (o cuyo archivo falta) se renderizan y guardan
+    antes de devolver el iterador, de modo que el ZIP sólo copia archivos
+    del storage, por bloques y sin cargarlos enteros en memoria.
+    """
+    guardadas = [
+        f
+        for f in FacturaVenta.objects.filter(venta__fecha__gte=desde, venta__fecha__lte=hasta)
+        if _tiene_pdf(f)
+    ]
+    faltantes = list(
+        datos_facturas(
+            Venta.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+            .exclude(id__in=[f.venta_id for f in guardadas])
+            .values_list("id", flat=True)
+        ).values()
+    )
+    if faltantes:
+        guardadas += _completar_facturas(faltantes, procesos)
+    return _emitir_zip(guardadas, tamano_bloque)
+
+
+__all__ = ["datos_facturas", "renderizar_factura", "renderizar_facturas", "zip_facturas"]
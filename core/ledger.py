@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, When
+
+from .models import MovimientoInventario, Producto, SaldoInventario
+
+
+_DEC = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _con_signo():
+    """Expresión de la cantidad con signo: positiva para entradas."""
+    return Case(
+        When(tipo="entrada", then=F("cantidad")),
+        default=-F("cantidad"),
+        output_field=_DEC,
+    )
+
+
+def _neto_por_producto(movimientos) -> Dict[int, Decimal]:
+    filas = movimientos.values("producto_id").annotate(neto=Sum(_con_signo()))
+    return {
+        f["producto_id"]: Decimal(str(f["neto"] or 0))
+        for f in filas
+        if f["producto_id"] is not None
+    }
+
+
+def cerrar_dia(fecha: Optional[date] = None) -> int:
+    """Guarda el saldo de cierre de ``fecha`` para todos los productos.
+
+    El saldo es el cierre del día anterior más los movimientos de ``fecha``;
+    ``stock_actual`` sólo se usa para el primer saldo de cada producto. Así
+    un cambio de stock sin movimiento no se copia al libro y
+    ``verificar_consistencia`` lo sigue reportando. Es idempotente: volver a
+    cerrar un día reemplaza sus filas.
+    """
+    fecha = fecha or date.today()
+    previo = stock_a_fecha(fecha - timedelta(days=1))
+    movimientos = MovimientoInventario.objects.filter(fecha__date=fecha)
+    neto = _neto_por_producto(movimientos)
+    del_dia = movimientos.values("producto_id").annotate(
+        entradas=Sum(Case(When(tipo="entrada", then=F("cantidad")), default=0, output_field=_DEC)),
+        salidas=Sum(Case(When(tipo="salida", then=F("cantidad")), default=0, output_field=_DEC)),
+    )
+    flujo = {f["producto_id"]: f for f in del_dia}
+
+    saldos: List[SaldoInventario] = []
+    for pid, cantidad in previo.items():
+        dia = flujo.get(pid, {})
+        saldos.append(
+            SaldoInventario(
+                producto_id=pid,
+                fecha=fecha,
+                cantidad=cantidad + neto.get(pid, Decimal("0")),
+                entradas=dia.get("entradas") or 0,
+                salidas=dia.get("salidas") or 0,
+            )
+        )
+    SaldoInventario.objects.bulk_create(
+        saldos,
+        update_conflicts=True,
+        unique_fields=["producto", "fecha"],
+        update_fields=["cantidad", "entradas", "salidas"],
+    )
+    return len(saldos)
+
+
+def cerrar_periodo(desde: date, hasta: Optional[date] = None) -> int:
+    """Cierra cada día entre ``desde`` y ``hasta`` (inclusive)."""
+    hasta = hasta or date.today()
+    total = 0
+    dia = desde
+    while dia <= hasta:
+        total += cerrar_dia(dia)
+        dia += timedelta(days=1)
+    return total
+
+
+def stock_a_fecha(
+    fecha: date,
+    productos: Optional[Iterable[int]] = None,
+) -> Dict[int, Decimal]:
+    """Stock de cada producto al cierre de ``fecha``.
+
+    Parte del último saldo guardado en o antes de ``fecha`` y suma los
+    movimientos posteriores hasta ``fecha``. Los productos sin saldos previos
+    se reconstruyen hacia atrás desde ``stock_actual``. Son cuatro consultas
+    sin importar cuántos productos o movimientos existan.
+    """
+    qs = Producto.objects.all()
+    if productos is not None:
+        qs = qs.filter(id__in=list(productos))
+
+    ultimo = SaldoInventario.objects.filter(
+        producto=OuterRef("producto"), fecha__lte=fecha
+    ).order_by("-fecha")
+    base = {
+        s["producto_id"]: (s["fecha"], Decimal(str(s["cantidad"])))
+        for s in SaldoInventario.objects.filter(
+            producto__in=qs,
+            fecha__lte=fecha,
+            fecha=Subquery(ultimo.values("fecha")[:1]),
+        ).values("producto_id", "fecha", "cantidad")
+    }
+
+    desde_saldo = _neto_por_producto(
+        MovimientoInventario.objects.filter(producto__in=qs, fecha__date__lte=fecha)
+        .annotate(corte=Subquery(ultimo.values("fecha")[:1]))
+        .filter(corte__isnull=False, fecha__date__gt=F("corte"))
+    )
+    posteriores = _neto_por_producto(
+        MovimientoInventario.objects.filter(producto__in=qs, fecha__date__gt=fecha)
+    )
+
+    resultado: Dict[int, Decimal] = {}
+    for pid, stock in qs.values_list("id", "stock_actual"):
+        if pid in base:
+            resultado[pid] = base[pid][1] + desde_saldo.get(pid, Decimal("0"))
+        else:
+            resultado[pid] = Decimal(str(stock or 0)) - posteriores.get(pid, Decimal("0"))
+    return resultado
+
+
+def verificar_consistencia(tolerancia: Decimal = Decimal("0.01")) -> List[Dict[str, float]]:
+    """Compara ``stock_actual`` con el último saldo más los movimientos posteriores.
+
+    Devuelve los productos cuya diferencia supera ``tolerancia``; suelen ser
+    cambios de stock que no registraron un ``MovimientoInventario``.
+    """
+    hoy = date.today()
+    esperado = stock_a_fecha(hoy)
+    con_saldo = set(
+        SaldoInventario.objects.values_list("producto_id", flat=True).distinct()
+    )
+    diferencias: List[Dict[str, float]] = []
+    for pid, nombre, stock in Producto.objects.filter(id__in=con_saldo).values_list(
+        "id", "nombre", "stock_actual"
+    ):
+        actual = Decimal(str(stock or 0))
+        libro = esperado.get(pid, actual)
+        if abs(actual - libro) > tolerancia:
+            diferencias.append(
+                {
+                    "producto": pid,
+                    "nombre": nombre,
+                    "stock_actual": float(actual),
+                    "stock_libro": float(libro),
+                    "diferencia": float(actual - libro),
+                }
+            )
+    return diferencias
+
+
+__all__ = [
+    "cerrar_dia",
+    "cerrar_periodo",
+    "stock_a_fecha",
+    "verificar_consistencia",
+]
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.allocation import aplicar_descuentos
+
+
+class Command(BaseCommand):
+    help = "Calcula el descuento por vencimiento de todos los lotes finales abiertos"
+
+    def handle(self, *args, **options):
+        rebajados = aplicar_descuentos()
+        self.stdout.write(self.style.SUCCESS(f"{rebajados} lotes con descuento vigente"))
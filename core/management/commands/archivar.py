@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.archive import archivar
+
+
+class Command(BaseCommand):
+    help = "Archiva movimientos, auditoría y precios anteriores al horizonte configurado"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None, help="Horizonte en días (ARCHIVE_HORIZON_DAYS)")
+
+    def handle(self, *args, **options):
+        resultado = archivar(options["dias"])
+        for tabla, filas in resultado.items():
+            self.stdout.write(f"{tabla}: {filas} filas archivadas")
+        self.stdout.write(self.style.SUCCESS("Archivo completado"))
@@ -0,0 +1,44 @@
+import os
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from core.invoices import _renderizar_lote
+
+
+def _facturas(cantidad: int, lineas: int) -> list:
+    """Datos con la forma de ``datos_facturas`` sin tocar la base."""
+    return [
+        {
+            "id": i + 1,
+            "fecha": date(2024, 1, 1),
+            "total": Decimal("125.50"),
+            "cliente__nombre": f"Cliente {i}",
+            "cliente__email": "cliente@example.com",
+            "usuario__username": "ventas",
+            "lineas": [(f"Producto {l}", Decimal("2"), Decimal("3.25")) for l in range(lineas)],
+        }
+        for i in range(cantidad)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Mide cuántas facturas por segundo genera el motor de facturas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--facturas", type=int, default=200)
+        parser.add_argument("--lineas", type=int, default=8)
+        parser.add_argument("--procesos", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+
+    def handle(self, *args, **options):
+        datos = _facturas(options["facturas"], options["lineas"])
+        for procesos in options["procesos"]:
+            inicio = time.perf_counter()
+            pdfs = _renderizar_lote(datos, procesos)
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(
+                f"{procesos} proceso(s): {len(pdfs) / segundos:.1f} facturas/s "
+                f"({sum(map(len, pdfs)) // len(pdfs)} bytes promedio)"
+            )
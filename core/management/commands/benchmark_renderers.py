@@ -0,0 +1,58 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer
+
+
+def _tendencias_anuales(productos: int, anio: int = 2024) -> dict:
+    """Datos con la forma de ``MonthlyTrendsView`` para un año completo."""
+    meses = [date(anio, m, 1) for m in range(1, 13)]
+    return {
+        "stock": [
+            {
+                "period": mes,
+                "producto": f"Producto {p}",
+                "ingrediente": p % 2 == 0,
+                "neto": Decimal(p % 50) + Decimal("0.25"),
+                "saldo": float(p),
+            }
+            for mes in meses
+            for p in range(productos)
+        ],
+        "sales": [
+            {"period": mes, "categoria": f"Categoría {c}", "total": Decimal("1234.56") * c}
+            for mes in meses
+            for c in range(10)
+        ],
+        "losses": [{"period": f"{mes:%Y-%m}", "loss": 12.5} for mes in meses],
+        "prices": [{"period": mes, "precio_promedio": Decimal("3.75")} for mes in meses],
+    }
+
+
+class Command(BaseCommand):
+    help = "Compara el tiempo de serialización JSON de DRF y FastJSONRenderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=500)
+        parser.add_argument("--repeticiones", type=int, default=20)
+
+    def handle(self, *args, **options):
+        data = _tendencias_anuales(options["productos"])
+        repeticiones = options["repeticiones"]
+        resultados = {}
+        for nombre, renderer in (("drf", JSONRenderer()), ("rapido", FastJSONRenderer())):
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                salida = renderer.render(data, "application/json")
+            resultados[nombre] = (time.perf_counter() - inicio) / repeticiones
+            self.stdout.write(
+                f"{nombre}: {resultados[nombre] * 1000:.2f} ms por respuesta ({len(salida)} bytes)"
+            )
+        if resultados["rapido"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Aceleración: {resultados['drf'] / resultados['rapido']:.1f}x")
+            )
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.ledger import cerrar_dia, cerrar_periodo
+
+
+class Command(BaseCommand):
+    help = "Guarda los saldos de inventario de cierre diario"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fecha", type=str, default=None, help="Día a cerrar (por defecto ayer)")
+        parser.add_argument("--desde", type=str, default=None, help="Cierra todos los días desde esta fecha")
+
+    def handle(self, *args, **options):
+        ayer = timezone.now().date() - timedelta(days=1)
+        fecha = parse_date(options["fecha"]) if options["fecha"] else ayer
+        if options["desde"]:
+            total = cerrar_periodo(parse_date(options["desde"]), fecha)
+        else:
+            total = cerrar_dia(fecha)
+        self.stdout.write(self.style.SUCCESS(f"{total} saldos guardados"))
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from core.utils import enviar_alertas_vencimiento
+from core.alerts import enviar_alertas_vencimiento
 
 class Command(BaseCommand):
     help = "Envía alertas de lotes próximos a vencer"
@@ -9,5 +9,10 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         dias = options["dias"]
-        enviar_alertas_vencimiento(dias)
-        self.stdout.write(self.style.SUCCESS("Alertas procesadas"))
\ No newline at end of file
+        resultado = enviar_alertas_vencimiento(dias)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Alertas procesadas: {resultado['alertas']} lotes, "
+                f"{resultado['correos']} resúmenes, {resultado.get('enviados', 0)} enviados"
+            )
+        )
\ No newline at end of file
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from core.trends import actualizar_cubo
+
+
+class Command(BaseCommand):
+    help = "Construye el cubo mensual de tendencias del año indicado"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--anio", type=int, default=None, help="Año a construir (actual por defecto)")
+        parser.add_argument("--refrescar", action="store_true", help="Reconstruye también los meses cerrados")
+
+    def handle(self, *args, **options):
+        anio = options["anio"] or now().year
+        meses = actualizar_cubo(anio, refrescar=options["refrescar"])
+        self.stdout.write(self.style.SUCCESS(f"{len(meses)} meses reconstruidos para {anio}"))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.dispatch import destino_configurado, procesar_envios
+
+
+class Command(BaseCommand):
+    help = "Despacha al proveedor las órdenes de compra encoladas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=50, help="Órdenes por lote")
+        parser.add_argument(
+            "--continuo",
+            action="store_true",
+            help="Sigue esperando órdenes nuevas en lugar de terminar",
+        )
+        parser.add_argument("--intervalo", type=int, default=30, help="Segundos entre lotes")
+
+    def handle(self, *args, **options):
+        if not destino_configurado():
+            self.stderr.write("No hay SUPPLIER_API_URL ni SUPPLIER_EMAIL configurado")
+            return
+        totales = {"enviados": 0, "fallidos": 0}
+        while True:
+            resultado = procesar_envios(options["limite"])
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+            # Los fallidos se reintentan en el próximo lote, no en el mismo.
+            if not resultado["enviados"]:
+                if not options["continuo"]:
+                    break
+                time.sleep(options["intervalo"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Órdenes despachadas: {totales['enviados']} enviadas, {totales['fallidos']} fallidas"
+            )
+        )
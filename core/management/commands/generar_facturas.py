@@ -0,0 +1,27 @@
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.invoices import renderizar_facturas
+
+
+class Command(BaseCommand):
+    help = "Genera en lote las facturas PDF de un día o un rango de fechas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("desde", type=date.fromisoformat, nargs="?", default=None)
+        parser.add_argument("hasta", type=date.fromisoformat, nargs="?", default=None)
+        parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--reescribir",
+            action="store_true",
+            help="Vuelve a generar también las facturas existentes",
+        )
+
+    def handle(self, *args, **options):
+        desde = options["desde"] or date.today()
+        total = renderizar_facturas(
+            desde, options["hasta"], procesos=options["procesos"], reescribir=options["reescribir"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Facturas generadas: {total}"))
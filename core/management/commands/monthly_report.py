@@ -18,4 +18,4 @@ class Command(BaseCommand):
             year = today.year if today.month > 1 else today.year - 1
             month = today.month - 1 if today.month > 1 else 12
         send_monthly_report(year, month)
-        self.stdout.write(self.style.SUCCESS("Reporte enviado"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS("Reporte encolado para envío"))
\ No newline at end of file
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import procesar_outbox
+
+
+class Command(BaseCommand):
+    help = "Envía los correos pendientes del outbox con reintentos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=50, help="Correos por lote")
+        parser.add_argument(
+            "--continuo",
+            action="store_true",
+            help="Sigue esperando correos nuevos en lugar de terminar",
+        )
+        parser.add_argument("--intervalo", type=int, default=30, help="Segundos entre lotes")
+
+    def handle(self, *args, **options):
+        totales = {"enviados": 0, "reintentos": 0, "fallidos": 0}
+        while True:
+            resultado = procesar_outbox(options["limite"])
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+            if not any(resultado.values()):
+                if not options["continuo"]:
+                    break
+                time.sleep(options["intervalo"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox procesado: {totales['enviados']} enviados, "
+                f"{totales['reintentos']} reintentos, {totales['fallidos']} fallidos"
+            )
+        )
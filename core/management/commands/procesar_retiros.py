@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.recall import procesar_simulaciones
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las simulaciones de retiro pendientes o abandonadas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=10, help="Simulaciones por ejecución")
+
+    def handle(self, *args, **options):
+        total = procesar_simulaciones(options["limite"])
+        self.stdout.write(self.style.SUCCESS(f"Simulaciones ejecutadas: {total}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.idempotency import purgar_claves
+
+
+class Command(BaseCommand):
+    help = "Elimina las claves de idempotencia vencidas"
+
+    def handle(self, *args, **options):
+        total = purgar_claves()
+        self.stdout.write(self.style.SUCCESS(f"Claves eliminadas: {total}"))
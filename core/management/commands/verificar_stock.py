@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ledger import verificar_consistencia
+
+
+class Command(BaseCommand):
+    help = "Verifica que el stock actual coincida con el libro de movimientos"
+
+    def handle(self, *args, **options):
+        diferencias = verificar_consistencia()
+        for d in diferencias:
+            self.stdout.write(
+                f"{d['nombre']} (#{d['producto']}): stock {d['stock_actual']} "
+                f"vs libro {d['stock_libro']} ({d['diferencia']:+})"
+            )
+        if diferencias:
+            raise CommandError(f"{len(diferencias)} productos con diferencias")
+        self.stdout.write(self.style.SUCCESS("Stock consistente"))
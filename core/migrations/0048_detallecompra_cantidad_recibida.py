@@ -0,0 +1,30 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+def marcar_recibidas(apps, schema_editor):
+    DetalleCompra = apps.get_model("core", "DetalleCompra")
+    DetalleCompra.objects.filter(compra__estado="recibido").update(
+        cantidad_recibida=models.F("cantidad")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_compra_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallecompra',
+            name='cantidad_recibida',
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=10,
+                validators=[django.core.validators.MinValueValidator(0)],
+            ),
+        ),
+        migrations.RunPython(marcar_recibidas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_detallecompra_cantidad_recibida'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('entradas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('salidas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', 'fecha'], name='movimiento_producto_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='saldoinventario',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='core.producto'),
+        ),
+        migrations.AddIndex(
+            model_name='saldoinventario',
+            index=models.Index(fields=['fecha'], name='saldo_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='saldoinventario',
+            constraint=models.UniqueConstraint(fields=('producto', 'fecha'), name='saldo_producto_fecha_unique'),
+        ),
+    ]
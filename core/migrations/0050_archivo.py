@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0049_saldoinventario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodoArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(choices=[('movimientos', 'Movimientos de inventario'), ('auditoria', 'Auditoría'), ('precios', 'Historial de precios')], max_length=20)),
+                ('periodo', models.DateField(help_text='Primer día del mes archivado')),
+                ('archivo', models.CharField(max_length=255)),
+                ('filas', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['tabla', 'periodo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenMovimientoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField()),
+                ('entradas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('salidas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('movimientos', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenPrecioMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField()),
+                ('costo_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('precio_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('registros', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['fecha'], name='auditlog_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialprecio',
+            index=models.Index(fields=['fecha'], name='historialprecio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha'], name='movimiento_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='periodoarchivado',
+            constraint=models.UniqueConstraint(fields=('tabla', 'periodo'), name='periodo_archivado_unique'),
+        ),
+        migrations.AddField(
+            model_name='resumenmovimientomensual',
+            name='producto',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumenes_movimiento', to='core.producto'),
+        ),
+        migrations.AddField(
+            model_name='resumenpreciomensual',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_precio', to='core.producto'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenmovimientomensual',
+            index=models.Index(fields=['periodo'], name='resumen_mov_periodo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenpreciomensual',
+            index=models.Index(fields=['periodo'], name='resumen_precio_periodo_idx'),
+        ),
+    ]
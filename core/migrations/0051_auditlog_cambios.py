@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0050_archivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='cambios',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
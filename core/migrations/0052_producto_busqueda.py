@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+from core.models.helpers import normalizar_texto
+
+
+def poblar_busqueda(apps, schema_editor):
+    Producto = apps.get_model("core", "Producto")
+    pendientes = []
+    for prod in Producto.objects.only("id", "nombre", "codigo", "codigo_barras", "descripcion").iterator():
+        partes = [prod.nombre, prod.codigo, prod.codigo_barras, prod.descripcion]
+        prod.busqueda = normalizar_texto(" ".join(p for p in partes if p))[:255]
+        pendientes.append(prod)
+        if len(pendientes) >= 1000:
+            Producto.objects.bulk_update(pendientes, ["busqueda"])
+            pendientes = []
+    if pendientes:
+        Producto.objects.bulk_update(pendientes, ["busqueda"])
+
+
+def indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS producto_busqueda_trgm_idx "
+        "ON core_producto USING gin (busqueda gin_trgm_ops)"
+    )
+
+
+def quitar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS producto_busqueda_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0051_auditlog_cambios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='busqueda',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='codigo_barras',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['busqueda'], name='producto_busqueda_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(poblar_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(indice_trigramas, quitar_indice_trigramas),
+    ]
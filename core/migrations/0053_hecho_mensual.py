@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0052_producto_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodoCubo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(help_text='Primer día del mes', unique=True)),
+                ('cerrado', models.BooleanField(default=False)),
+                ('actualizado', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['periodo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HechoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField()),
+                ('entradas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('salidas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('saldo', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('perdida', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('registros_costo', models.PositiveIntegerField(default=0)),
+                ('categoria', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hechos_mensuales', to='core.categoria')),
+                ('producto', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hechos_mensuales', to='core.producto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'producto'], name='hecho_mensual_periodo_idx')],
+            },
+        ),
+    ]
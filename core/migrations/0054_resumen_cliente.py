@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def poblar_resumenes(apps, schema_editor):
+    Venta = apps.get_model("core", "Venta")
+    DetallesVenta = apps.get_model("core", "DetallesVenta")
+    ResumenCliente = apps.get_model("core", "ResumenCliente")
+
+    frecuentes = {}
+    for fila in (
+        DetallesVenta.objects.filter(venta__cliente__isnull=False)
+        .values("venta__cliente_id", "producto__nombre")
+        .annotate(total=Sum("cantidad"))
+        .order_by("venta__cliente_id", "-total")
+    ):
+        top = frecuentes.setdefault(fila["venta__cliente_id"], [])
+        if len(top) < 5:
+            top.append({"producto": fila["producto__nombre"], "cantidad": float(fila["total"])})
+
+    ResumenCliente.objects.bulk_create(
+        [
+            ResumenCliente(
+                cliente_id=f["cliente_id"],
+                total_gastado=f["total"] or 0,
+                ventas=f["n"],
+                primera_compra=f["primera"],
+                ultima_compra=f["ultima"],
+                productos_frecuentes=frecuentes.get(f["cliente_id"], []),
+            )
+            for f in Venta.objects.filter(cliente__isnull=False)
+            .values("cliente_id")
+            .annotate(total=Sum("total"), n=Count("id"), primera=Min("fecha"), ultima=Max("fecha"))
+            .order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0053_hecho_mensual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_gastado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ventas', models.PositiveIntegerField(default=0)),
+                ('primera_compra', models.DateField(blank=True, db_index=True, null=True)),
+                ('ultima_compra', models.DateField(blank=True, null=True)),
+                ('productos_frecuentes', models.JSONField(blank=True, default=list)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to='core.cliente')),
+            ],
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
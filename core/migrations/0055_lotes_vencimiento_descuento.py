@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0054_resumen_cliente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loteproductofinal',
+            name='descuento',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Descuento vigente (0 a 1) fijado por el proceso de rebajas', max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='loteproductofinal',
+            name='fecha_vencimiento',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lotemateriaprima',
+            index=models.Index(condition=models.Q(('fecha_agotado__isnull', True)), fields=['producto', 'fecha_vencimiento'], name='lote_mp_vencimiento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loteproductofinal',
+            index=models.Index(fields=['producto', 'fecha_vencimiento'], name='lote_pf_vencimiento_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0055_lotes_vencimiento_descuento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asunto', models.CharField(max_length=200)),
+                ('cuerpo', models.TextField()),
+                ('destinatarios', models.JSONField(default=list)),
+                ('clave', models.CharField(blank=True, help_text='Evita encolar dos veces el mismo mensaje', max_length=100, null=True, unique=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField()),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('enviado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='correo_pendiente_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AlertaVencimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nivel', models.CharField(choices=[('por_vencer', 'Por vencer'), ('vencido', 'Vencido')], max_length=20)),
+                ('fecha_vencimiento', models.DateField()),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('lote_final', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='core.loteproductofinal')),
+                ('lote_materia_prima', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='core.lotemateriaprima')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('lote_materia_prima', 'nivel'), name='alerta_lote_mp_nivel_unique'), models.UniqueConstraint(fields=('lote_final', 'nivel'), name='alerta_lote_pf_nivel_unique')],
+            },
+        ),
+    ]
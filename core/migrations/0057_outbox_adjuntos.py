@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0056_alertas_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='correosaliente',
+            name='factura',
+            field=models.ForeignKey(blank=True, help_text='Factura que se marca como enviada al salir el correo', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='correos', to='core.facturaventa'),
+        ),
+        migrations.CreateModel(
+            name='AdjuntoCorreo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200)),
+                ('tipo', models.CharField(default='application/octet-stream', max_length=100)),
+                ('ruta', models.CharField(blank=True, max_length=255)),
+                ('contenido', models.BinaryField(blank=True, null=True)),
+                ('correo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adjuntos', to='core.correosaliente')),
+            ],
+        ),
+    ]
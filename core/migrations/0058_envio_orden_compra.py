@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:32
+
+import core.models.notificaciones
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0057_outbox_adjuntos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioOrdenCompra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(default=core.models.notificaciones._clave_idempotencia, max_length=64, unique=True)),
+                ('canal', models.CharField(blank=True, choices=[('api', 'API'), ('correo', 'Correo')], max_length=10)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('respuesta', models.JSONField(blank=True, null=True)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('compra', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='envio', to='core.compra')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:00
+
+import django.core.serializers.json
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0059_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimulacionRetiro',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('parametros', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('actualizada', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'actualizada'], name='retiro_estado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.db import migrations
+
+
+def completar_vencimientos(apps, schema_editor):
+    """Fecha de vencimiento de los lotes previos a FEFO según la vida útil.
+
+    Sin ella los lotes antiguos quedarían al final del orden FEFO
+    (``nulls_last``) y se venderían después de los nuevos.
+    """
+    LoteProductoFinal = apps.get_model("core", "LoteProductoFinal")
+    pendientes = []
+    for lote in (
+        LoteProductoFinal.objects.filter(fecha_vencimiento__isnull=True, producto__vida_util_dias__gt=0)
+        .select_related("producto")
+        .only("id", "fecha_produccion", "producto__vida_util_dias")
+        .iterator()
+    ):
+        lote.fecha_vencimiento = lote.fecha_produccion + timedelta(days=lote.producto.vida_util_dias)
+        pendientes.append(lote)
+        if len(pendientes) >= 1000:
+            LoteProductoFinal.objects.bulk_update(pendientes, ["fecha_vencimiento"])
+            pendientes = []
+    if pendientes:
+        LoteProductoFinal.objects.bulk_update(pendientes, ["fecha_vencimiento"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0060_simulacion_retiro'),
+    ]
+
+    operations = [
+        migrations.RunPython(completar_vencimientos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0061_backfill_vencimiento_lotes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorContencion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=40, unique=True)),
+                ('bloqueos', models.PositiveBigIntegerField(default=0)),
+                ('espera_ms', models.PositiveBigIntegerField(default=0)),
+                ('timeouts', models.PositiveBigIntegerField(default=0)),
+                ('reintentos', models.PositiveBigIntegerField(default=0)),
+                ('abortos', models.PositiveBigIntegerField(default=0)),
+                ('producto', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.producto')),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def descartar_meses_duplicados(apps, schema_editor):
+    """Borra los meses del cubo con filas repetidas por producto.
+
+    Sus totales quedaron sumados dos veces; sin su ``PeriodoCubo`` el
+    comando ``construir_cubo`` los vuelve a construir.
+    """
+    HechoMensual = apps.get_model("core", "HechoMensual")
+    PeriodoCubo = apps.get_model("core", "PeriodoCubo")
+    periodos = set(
+        HechoMensual.objects.filter(producto__isnull=False)
+        .values("periodo", "producto")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("periodo", flat=True)
+    )
+    if periodos:
+        HechoMensual.objects.filter(periodo__in=periodos).delete()
+        PeriodoCubo.objects.filter(periodo__in=periodos).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0062_contador_contencion'),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_meses_duplicados, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='hechomensual',
+            name='hecho_mensual_periodo_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='hechomensual',
+            constraint=models.UniqueConstraint(fields=('periodo', 'producto'), name='hecho_mensual_periodo_unique'),
+        ),
+    ]
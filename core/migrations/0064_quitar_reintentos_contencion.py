@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0063_hecho_mensual_unico'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='contadorcontencion',
+            name='reintentos',
+        ),
+    ]
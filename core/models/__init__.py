@@ -8,11 +8,13 @@ from .inventario import (
     DetalleCompra,
     ComposicionProducto,
     MovimientoInventario,
+    SaldoInventario,
     AjusteInventario,
     LoteMateriaPrima,
     LoteProductoFinal,
     UsoLoteMateriaPrima,
     FamiliaProducto,
+    StockInsuficiente,
 )
 from .ventas import (
     Cliente,
@@ -20,6 +22,7 @@ from .ventas import (
     DetallesVenta,
     FacturaVenta,
     DevolucionProducto,
+    ResumenCliente,
 )
 from .produccion import (
     MonthlyReport,
@@ -30,6 +33,11 @@ from .produccion import (
 )
 from .finanzas import Balance, Transaccion, GastoRecurrente
 from .audit import AuditLog
+from .archivo import PeriodoArchivado, ResumenMovimientoMensual, ResumenPrecioMensual
+from .analitica import ContadorContencion, HechoMensual, PeriodoCubo
+from .notificaciones import AdjuntoCorreo, AlertaVencimiento, CorreoSaliente, EnvioOrdenCompra
+from .idempotencia import ClaveIdempotencia
+from .retiros import SimulacionRetiro
 
 __all__ = [
     "Categoria",
@@ -43,10 +51,12 @@ __all__ = [
     "Venta",
     "DetallesVenta",
     "FacturaVenta",
+    "ResumenCliente",
     "ComposicionProducto",
     "FamiliaProducto",
     "Balance",
     "MovimientoInventario",
+    "SaldoInventario",
     "AjusteInventario",
     "Transaccion",
     "GastoRecurrente",
@@ -60,4 +70,17 @@ __all__ = [
     "RegistroTurno",
     "PlanProduccion",
     "AuditLog",
+    "StockInsuficiente",
+    "PeriodoArchivado",
+    "ResumenMovimientoMensual",
+    "ResumenPrecioMensual",
+    "HechoMensual",
+    "PeriodoCubo",
+    "ContadorContencion",
+    "AdjuntoCorreo",
+    "AlertaVencimiento",
+    "CorreoSaliente",
+    "EnvioOrdenCompra",
+    "ClaveIdempotencia",
+    "SimulacionRetiro",
 ]
\ No newline at end of file
@@ -0,0 +1,68 @@
+from django.db import models
+
+
+class PeriodoCubo(models.Model):
+    """Estado de construcción del cubo de tendencias para un mes."""
+
+    periodo = models.DateField(unique=True, help_text="Primer día del mes")
+    cerrado = models.BooleanField(default=False)
+    actualizado = models.DateTimeField()
+
+    class Meta:
+        ordering = ["periodo"]
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return f"Cubo {self.periodo:%Y-%m}"
+
+
+class HechoMensual(models.Model):
+    """Totales de un producto en un mes para el análisis de tendencias."""
+
+    periodo = models.DateField()
+    producto = models.ForeignKey(
+        "core.Producto", null=True, on_delete=models.SET_NULL, related_name="hechos_mensuales"
+    )
+    categoria = models.ForeignKey(
+        "core.Categoria", null=True, on_delete=models.SET_NULL, related_name="hechos_mensuales"
+    )
+    entradas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    salidas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    perdida = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    registros_costo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["periodo", "producto"], name="hecho_mensual_periodo_unique"),
+        ]
+
+
+class ContadorContencion(models.Model):
+    """Contadores de contención de bloqueos de un producto.
+
+    Sólo se escriben cuando hubo contención (esperas, timeouts o abortos),
+    para no agregar una fila disputada a cada venta. La fila ``general``
+    (sin producto) acumula los abortos de ventas completas; los totales son
+    la suma de todas las filas.
+    """
+
+    clave = models.CharField(max_length=40, unique=True)
+    # Sin restricción en la base: los contadores se escriben fuera de la
+    # transacción de la venta y el producto podría no existir ya.
+    producto = models.ForeignKey(
+        "core.Producto",
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    bloqueos = models.PositiveBigIntegerField(default=0)
+    espera_ms = models.PositiveBigIntegerField(default=0)
+    timeouts = models.PositiveBigIntegerField(default=0)
+    abortos = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return self.clave
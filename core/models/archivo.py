@@ -0,0 +1,59 @@
+from django.db import models
+
+
+class PeriodoArchivado(models.Model):
+    """Mes de una tabla histórica movido a un archivo comprimido."""
+
+    TABLA_MOVIMIENTOS = "movimientos"
+    TABLA_AUDITORIA = "auditoria"
+    TABLA_PRECIOS = "precios"
+    TABLA_CHOICES = [
+        (TABLA_MOVIMIENTOS, "Movimientos de inventario"),
+        (TABLA_AUDITORIA, "Auditoría"),
+        (TABLA_PRECIOS, "Historial de precios"),
+    ]
+
+    tabla = models.CharField(max_length=20, choices=TABLA_CHOICES)
+    periodo = models.DateField(help_text="Primer día del mes archivado")
+    archivo = models.CharField(max_length=255)
+    filas = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tabla", "periodo"], name="periodo_archivado_unique"),
+        ]
+        ordering = ["tabla", "periodo"]
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return f"{self.tabla} {self.periodo:%Y-%m}"
+
+
+class ResumenMovimientoMensual(models.Model):
+    """Totales mensuales de movimientos que siguen en línea tras archivar."""
+
+    producto = models.ForeignKey(
+        "core.Producto", null=True, on_delete=models.SET_NULL, related_name="resumenes_movimiento"
+    )
+    periodo = models.DateField()
+    entradas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    salidas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    movimientos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["periodo"], name="resumen_mov_periodo_idx")]
+
+
+class ResumenPrecioMensual(models.Model):
+    """Suma y cantidad de registros de precio por producto y mes archivado."""
+
+    producto = models.ForeignKey(
+        "core.Producto", on_delete=models.CASCADE, related_name="resumenes_precio"
+    )
+    periodo = models.DateField()
+    costo_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    precio_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    registros = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["periodo"], name="resumen_precio_periodo_idx")]
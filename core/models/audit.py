@@ -15,9 +15,11 @@ class AuditLog(models.Model):
     tipo_contenido = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     objeto_id = models.PositiveIntegerField()
     objeto = GenericForeignKey("tipo_contenido", "objeto_id")
+    cambios = models.JSONField(null=True, blank=True)
 
     class Meta:
         ordering = ["-fecha"]
+        indexes = [models.Index(fields=["fecha"], name="auditlog_fecha_idx")]
 
     def __str__(self) -> str:  # pragma: no cover - simple repr
         return f"{self.fecha:%Y-%m-%d %H:%M} {self.accion} {self.objeto}"
\ No newline at end of file
@@ -1,3 +1,4 @@
+import unicodedata
 from datetime import date
 from typing import Optional, Union
 
@@ -18,4 +19,64 @@ def normalize_date(
         if parsed:
             return parsed
 
-    raise ValidationError({field_name: "Fecha inválida"})
\ No newline at end of file
+    raise ValidationError({field_name: "Fecha inválida"})
+
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    """Minúsculas sin acentos y con espacios simples, para búsquedas."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.lower().split())
+
+
+class SeguimientoCambiosMixin:
+    """Detecta cambios de campo sin volver a leer la fila.
+
+    Al cargar desde la base de datos guarda los valores de
+    ``campos_seguidos`` (nombres de atributo, p. ej. ``categoria_id``). Los
+    campos diferidos o las instancias no cargadas se consideran desconocidos.
+    """
+
+    campos_seguidos: tuple = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_originales()
+        return instance
+
+    def _guardar_originales(self) -> None:
+        self._originales = {
+            campo: getattr(self, campo)
+            for campo in self.campos_seguidos
+            if campo in self.__dict__
+        }
+
+    def conoce_original(self, *campos: str) -> bool:
+        originales = getattr(self, "_originales", {})
+        return all(campo in originales for campo in campos)
+
+    def has_changed(self, campo: str) -> bool:
+        """``True`` si ``campo`` cambió desde la carga (o si no se conoce)."""
+        originales = getattr(self, "_originales", {})
+        if campo not in originales:
+            return True
+        return originales[campo] != getattr(self, campo)
+
+    def cambios(self) -> dict:
+        """Campos seguidos modificados como ``{campo: [antes, después]}`` serializable."""
+        originales = getattr(self, "_originales", {})
+        resultado = {}
+        for campo, antes in originales.items():
+            despues = getattr(self, campo)
+            if antes != despues:
+                resultado[campo] = [_a_json(antes), _a_json(despues)]
+        return resultado
+
+
+def _a_json(valor):
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    return str(valor)
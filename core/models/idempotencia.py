@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class ClaveIdempotencia(models.Model):
+    """Solicitud recibida con ``Idempotency-Key`` y la respuesta que produjo."""
+
+    ESTADO_EN_CURSO = "en_curso"
+    ESTADO_COMPLETADA = "completada"
+    ESTADO_CHOICES = [
+        (ESTADO_EN_CURSO, "En curso"),
+        (ESTADO_COMPLETADA, "Completada"),
+    ]
+
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    clave = models.CharField(max_length=255)
+    ruta = models.CharField(max_length=200)
+    huella = models.CharField(max_length=64, help_text="SHA-256 del cuerpo de la solicitud")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ESTADO_EN_CURSO)
+    codigo_respuesta = models.PositiveSmallIntegerField(null=True, blank=True)
+    respuesta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    creada = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["usuario", "clave"], name="idempotencia_usuario_clave_unique"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return f"{self.clave} ({self.estado})"
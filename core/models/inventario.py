@@ -1,11 +1,20 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db.models.functions import Lower
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import date
-from .helpers import normalize_date
+from datetime import date, timedelta
+from ..catalog import invalidar_catalogo
+from .helpers import SeguimientoCambiosMixin, normalize_date, normalizar_texto
+
+
+# Descuento sugerido según días para vencer: (hasta N días, descuento).
+ESCALA_DESCUENTO = (
+    (0, Decimal("0.50")),
+    (3, Decimal("0.30")),
+    (7, Decimal("0.10")),
+)
 
 
 class FamiliaProducto(models.Model):
@@ -58,7 +67,75 @@ class UnidadMedida(models.Model):
         return self.abreviatura
 
 
-class Producto(models.Model):
+class StockInsuficiente(ValueError):
+    """Un ajuste de stock dejaría algún producto en negativo."""
+
+
+class ProductoQuerySet(models.QuerySet):
+    """Operaciones masivas sobre productos sin pasar por ``Producto.save()``."""
+
+    def ajustar_stock(self, deltas, exigir_disponible=False):
+        """Suma ``deltas`` (``{producto_id: cantidad}``) al ``stock_actual``.
+
+        Ejecuta un único ``UPDATE`` con ``CASE`` y ``F()``, sin validaciones
+        ni historial de precios. Con ``exigir_disponible`` las salidas solo se
+        aplican si hay existencias suficientes; si alguna falla se revierte
+        todo y se lanza :class:`StockInsuficiente`.
+        """
+        quant = Decimal("0.01")
+        deltas = {
+            int(pid): Decimal(str(delta)).quantize(quant, ROUND_HALF_UP)
+            for pid, delta in deltas.items()
+        }
+        deltas = {pid: delta for pid, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+        qs = self.filter(id__in=deltas)
+        if exigir_disponible:
+            condicion = models.Q()
+            for pid, delta in deltas.items():
+                if delta < 0:
+                    condicion |= models.Q(id=pid, stock_actual__gte=-delta)
+                else:
+                    condicion |= models.Q(id=pid)
+            qs = qs.filter(condicion)
+        with transaction.atomic():
+            actualizados = qs.update(
+                stock_actual=models.Case(
+                    *[
+                        models.When(id=pid, then=models.F("stock_actual") + models.Value(delta))
+                        for pid, delta in deltas.items()
+                    ],
+                    output_field=models.DecimalField(max_digits=10, decimal_places=2),
+                )
+            )
+            if exigir_disponible and actualizados != len(deltas):
+                raise StockInsuficiente("Stock insuficiente para completar la operación")
+        invalidar_catalogo()
+        return actualizados
+
+    def fijar_stock(self, valores):
+        """Fija ``stock_actual`` a los valores absolutos de ``{producto_id: cantidad}``."""
+        quant = Decimal("0.01")
+        if not valores:
+            return 0
+        actualizados = self.filter(id__in=valores).update(
+            stock_actual=models.Case(
+                *[
+                    models.When(
+                        id=pid,
+                        then=models.Value(Decimal(str(valor)).quantize(quant, ROUND_HALF_UP)),
+                    )
+                    for pid, valor in valores.items()
+                ],
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+        invalidar_catalogo()
+        return actualizados
+
+
+class Producto(SeguimientoCambiosMixin, models.Model):
     """Artículo o insumo gestionado en el inventario.
 
     Destaca campos como ``codigo`` y ``tipo`` para identificarlo, además
@@ -92,7 +169,7 @@ class Producto(models.Model):
     activo = models.BooleanField(default=True)
     control_por_lote = models.BooleanField(default=False)
     control_por_serie = models.BooleanField(default=False)
-    codigo_barras = models.CharField(max_length=64, blank=True, default="")
+    codigo_barras = models.CharField(max_length=64, blank=True, default="", db_index=True)
     stock_seguridad = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     nivel_reorden = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     lead_time_dias = models.PositiveIntegerField(default=0)
@@ -103,17 +180,46 @@ class Producto(models.Model):
     fecha_costo = models.DateField(null=True, blank=True)
     almacen_origen = models.CharField(max_length=100, blank=True, default="")
     imagen_url = models.URLField(blank=True, default="")
+    busqueda = models.CharField(max_length=255, blank=True, default="", editable=False)
+
+    objects = ProductoQuerySet.as_manager()
+
+    campos_seguidos = (
+        "nombre",
+        "precio",
+        "costo",
+        "stock_minimo",
+        "activo",
+        "categoria_id",
+        "proveedor_id",
+    )
 
     class Meta:
         constraints = [
             models.UniqueConstraint(Lower("nombre"), name="producto_nombre_ci_unique"),
         ]
+        indexes = [
+            models.Index(
+                fields=["busqueda"],
+                name="producto_busqueda_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
 
     def __str__(self):
         return self.nombre
 
+    def texto_busqueda(self) -> str:
+        """Texto normalizado para ``busqueda``: nombre, códigos y descripción."""
+        partes = [self.nombre, self.codigo, self.codigo_barras, self.descripcion]
+        return normalizar_texto(" ".join(p for p in partes if p))[:255]
+
     def save(self, *args, **kwargs):
-        """Guardar el producto y registrar cambios de precio o costo."""
+        """Guardar el producto y registrar cambios de precio o costo.
+
+        Pensado para ediciones de catálogo; los cambios de existencias usan
+        ``Producto.objects.ajustar_stock``.
+        """
         if self.categoria_id and not self.familia_id:
             self.familia = self.categoria.familia
 
@@ -136,24 +242,32 @@ class Producto(models.Model):
             value = getattr(self, field, None)
             if value is not None:
                 setattr(self, field, Decimal(str(value)).quantize(quant, ROUND_HALF_UP))
+        self.busqueda = self.texto_busqueda()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "busqueda" not in update_fields:
+            if {"nombre", "codigo", "codigo_barras", "descripcion"} & set(update_fields):
+                kwargs["update_fields"] = [*update_fields, "busqueda"]
 
         self.full_clean()
 
-        old_precio = None
-        old_costo = None
-        if self.pk:
-            prev = Producto.objects.filter(pk=self.pk).first()
-            if prev:
-                old_precio = prev.precio
-                old_costo = prev.costo
+        if self._state.adding or not self.pk:
+            registrar_precio = True
+        elif self.conoce_original("precio", "costo"):
+            registrar_precio = self.has_changed("precio") or self.has_changed("costo")
+        else:
+            prev = Producto.objects.filter(pk=self.pk).values("precio", "costo").first()
+            registrar_precio = (
+                prev is None or prev["precio"] != self.precio or prev["costo"] != self.costo
+            )
         super().save(*args, **kwargs)
 
-        if old_precio is None or old_precio != self.precio or old_costo != self.costo:
+        if registrar_precio:
             HistorialPrecio.objects.create(
                 producto=self,
                 precio=self.precio,
                 costo=self.costo,
             )
+        self._guardar_originales()
 
     def clean(self):
         errors = {}
@@ -228,6 +342,7 @@ class HistorialPrecio(models.Model):
 
     class Meta:
         ordering = ["-fecha"]
+        indexes = [models.Index(fields=["fecha"], name="historialprecio_fecha_idx")]
 
     def __str__(self) -> str:
         return f"{self.producto.nombre} - {self.fecha:%Y-%m-%d}"
@@ -245,7 +360,7 @@ class Proveedor(models.Model):
         return self.nombre
 
 
-class Compra(models.Model):
+class Compra(SeguimientoCambiosMixin, models.Model):
     """Orden de compra generada a un proveedor."""
     ESTADO_PENDIENTE = "pendiente"
     ESTADO_RECIBIDO = "recibido"
@@ -261,6 +376,8 @@ class Compra(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ESTADO_RECIBIDO)
 
+    campos_seguidos = ("proveedor_id", "fecha", "total", "estado")
+
     def __str__(self):
         return f"Compra {self.id} - {self.fecha}"
 
@@ -272,6 +389,7 @@ class Compra(models.Model):
             self.fecha = normalize_date(self.fecha, "fecha")
         self.full_clean()
         super().save(*args, **kwargs)
+        self._guardar_originales()
 
 
 class DetalleCompra(models.Model):
@@ -280,6 +398,13 @@ class DetalleCompra(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     cantidad = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    cantidad_recibida = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)]
+    )
+
+    @property
+    def cantidad_pendiente(self):
+        return max(self.cantidad - self.cantidad_recibida, Decimal("0"))
 
     def save(self, *args, **kwargs):
         quant = Decimal("0.01")
@@ -389,10 +514,38 @@ class MovimientoInventario(models.Model):
         related_name="movimientos",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["producto", "fecha"], name="movimiento_producto_fecha_idx"),
+            models.Index(fields=["fecha"], name="movimiento_fecha_idx"),
+        ]
+
     def __str__(self):
         return f"{self.tipo.title()} - {self.producto.nombre} ({self.cantidad})"
 
 
+class SaldoInventario(models.Model):
+    """Saldo de cierre diario de un ``Producto`` según el libro de movimientos."""
+
+    producto = models.ForeignKey(Producto, related_name="saldos", on_delete=models.CASCADE)
+    fecha = models.DateField()
+    cantidad = models.DecimalField(max_digits=12, decimal_places=2)
+    entradas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    salidas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["producto", "fecha"], name="saldo_producto_fecha_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["fecha"], name="saldo_fecha_idx"),
+        ]
+        ordering = ["-fecha"]
+
+    def __str__(self) -> str:
+        return f"{self.producto.nombre} - {self.fecha:%Y-%m-%d}: {self.cantidad}"
+
+
 class LoteMateriaPrima(models.Model):
     """Lotes de ingredientes o materia prima."""
 
@@ -408,6 +561,15 @@ class LoteMateriaPrima(models.Model):
     cantidad_usada = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     fecha_agotado = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["producto", "fecha_vencimiento"],
+                name="lote_mp_vencimiento_idx",
+                condition=models.Q(fecha_agotado__isnull=True),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.codigo} - {self.producto.nombre}"
     
@@ -452,12 +614,9 @@ class LoteMateriaPrima(models.Model):
     @property
     def descuento_sugerido(self):
         dias = self.dias_para_vencer
-        if dias <= 0:
-            return 0.5
-        if dias <= 3:
-            return 0.3
-        if dias <= 7:
-            return 0.1
+        for limite, descuento in ESCALA_DESCUENTO:
+            if dias <= limite:
+                return float(descuento)
         return 0.0
 
     @property
@@ -492,12 +651,24 @@ class LoteProductoFinal(models.Model):
     costo_unitario = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)]
     )
+    fecha_vencimiento = models.DateField(null=True, blank=True)
+    descuento = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        default=0,
+        help_text="Descuento vigente (0 a 1) fijado por el proceso de rebajas",
+    )
     ingredientes = models.ManyToManyField(
         LoteMateriaPrima,
         through="UsoLoteMateriaPrima",
         related_name="lotes_finales",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["producto", "fecha_vencimiento"], name="lote_pf_vencimiento_idx"),
+        ]
+
     def __str__(self):
         return f"{self.codigo} - {self.producto.nombre}"
     
@@ -505,6 +676,10 @@ class LoteProductoFinal(models.Model):
         quant = Decimal("0.01")
         if self.fecha_produccion:
             self.fecha_produccion = normalize_date(self.fecha_produccion, "fecha_produccion")
+            if self.fecha_vencimiento is None and self.producto.vida_util_dias:
+                self.fecha_vencimiento = self.fecha_produccion + timedelta(days=self.producto.vida_util_dias)
+        if self.fecha_vencimiento:
+            self.fecha_vencimiento = normalize_date(self.fecha_vencimiento, "fecha_vencimiento")
         base_cost = self.producto.costo if self.producto and self.producto.costo is not None else self.costo_unitario
         if base_cost is None:
             base_cost = 0
@@ -0,0 +1,139 @@
+import uuid
+
+from django.core.files.storage import default_storage
+from django.db import models
+
+
+class CorreoSaliente(models.Model):
+    """Correo encolado para envío en segundo plano con reintentos."""
+
+    ESTADO_PENDIENTE = "pendiente"
+    ESTADO_ENVIADO = "enviado"
+    ESTADO_FALLIDO = "fallido"
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, "Pendiente"),
+        (ESTADO_ENVIADO, "Enviado"),
+        (ESTADO_FALLIDO, "Fallido"),
+    ]
+
+    asunto = models.CharField(max_length=200)
+    cuerpo = models.TextField()
+    destinatarios = models.JSONField(default=list)
+    clave = models.CharField(
+        max_length=100,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Evita encolar dos veces el mismo mensaje",
+    )
+    factura = models.ForeignKey(
+        "core.FacturaVenta",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="correos",
+        help_text="Factura que se marca como enviada al salir el correo",
+    )
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField()
+    ultimo_error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["estado", "proximo_intento"], name="correo_pendiente_idx"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return f"{self.asunto} ({self.estado})"
+
+
+class AdjuntoCorreo(models.Model):
+    """Adjunto de un correo del outbox.
+
+    Los archivos ya guardados (p. ej. el PDF de una factura) se referencian
+    por ``ruta`` en el storage; los generados al vuelo se guardan en
+    ``contenido``.
+    """
+
+    correo = models.ForeignKey(CorreoSaliente, on_delete=models.CASCADE, related_name="adjuntos")
+    nombre = models.CharField(max_length=200)
+    tipo = models.CharField(max_length=100, default="application/octet-stream")
+    ruta = models.CharField(max_length=255, blank=True)
+    contenido = models.BinaryField(null=True, blank=True)
+
+    def leer(self) -> bytes:
+        if self.contenido is not None:
+            return bytes(self.contenido)
+        with default_storage.open(self.ruta, "rb") as archivo:
+            return archivo.read()
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return self.nombre
+
+
+class AlertaVencimiento(models.Model):
+    """Alerta ya emitida para un lote, para no volver a avisar del mismo nivel."""
+
+    NIVEL_POR_VENCER = "por_vencer"
+    NIVEL_VENCIDO = "vencido"
+    NIVEL_CHOICES = [
+        (NIVEL_POR_VENCER, "Por vencer"),
+        (NIVEL_VENCIDO, "Vencido"),
+    ]
+
+    lote_materia_prima = models.ForeignKey(
+        "core.LoteMateriaPrima", null=True, blank=True, on_delete=models.CASCADE, related_name="alertas"
+    )
+    lote_final = models.ForeignKey(
+        "core.LoteProductoFinal", null=True, blank=True, on_delete=models.CASCADE, related_name="alertas"
+    )
+    nivel = models.CharField(max_length=20, choices=NIVEL_CHOICES)
+    fecha_vencimiento = models.DateField()
+    creada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["lote_materia_prima", "nivel"], name="alerta_lote_mp_nivel_unique"
+            ),
+            models.UniqueConstraint(fields=["lote_final", "nivel"], name="alerta_lote_pf_nivel_unique"),
+        ]
+
+
+def _clave_idempotencia() -> str:
+    return uuid.uuid4().hex
+
+
+class EnvioOrdenCompra(models.Model):
+    """Estado del despacho de una ``Compra`` al proveedor.
+
+    La ``clave`` viaja como ``Idempotency-Key`` para que los reintentos no
+    dupliquen la orden en el sistema del proveedor.
+    """
+
+    CANAL_API = "api"
+    CANAL_CORREO = "correo"
+    CANAL_CHOICES = [(CANAL_API, "API"), (CANAL_CORREO, "Correo")]
+    ESTADO_PENDIENTE = "pendiente"
+    ESTADO_ENVIADO = "enviado"
+    ESTADO_FALLIDO = "fallido"
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, "Pendiente"),
+        (ESTADO_ENVIADO, "Enviado"),
+        (ESTADO_FALLIDO, "Fallido"),
+    ]
+
+    compra = models.OneToOneField("core.Compra", on_delete=models.CASCADE, related_name="envio")
+    clave = models.CharField(max_length=64, unique=True, default=_clave_idempotencia)
+    canal = models.CharField(max_length=10, choices=CANAL_CHOICES, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    respuesta = models.JSONField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return f"Envío compra {self.compra_id} ({self.estado})"
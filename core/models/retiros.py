@@ -0,0 +1,38 @@
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class SimulacionRetiro(models.Model):
+    """Simulación de retiro lanzada en segundo plano y su resultado.
+
+    El estado vive en la base para que cualquier proceso web pueda
+    consultarlo y para que ``procesar_retiros`` retome las pendientes si el
+    proceso que las lanzó se reinicia.
+    """
+
+    ESTADO_PENDIENTE = "pendiente"
+    ESTADO_EN_CURSO = "en_curso"
+    ESTADO_LISTO = "listo"
+    ESTADO_ERROR = "error"
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, "Pendiente"),
+        (ESTADO_EN_CURSO, "En curso"),
+        (ESTADO_LISTO, "Listo"),
+        (ESTADO_ERROR, "Error"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    parametros = models.JSONField(encoder=DjangoJSONEncoder)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE)
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    actualizada = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["estado", "actualizada"], name="retiro_estado_idx")]
+
+    def __str__(self) -> str:  # pragma: no cover - representational
+        return f"Retiro {self.id} ({self.estado})"
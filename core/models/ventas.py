@@ -57,6 +57,21 @@ class DetallesVenta(models.Model):
         super().save(*args, **kwargs)
 
 
+class ResumenCliente(models.Model):
+    """Totales acumulados de un cliente, actualizados al confirmar ventas."""
+
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, related_name="resumen")
+    total_gastado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ventas = models.PositiveIntegerField(default=0)
+    primera_compra = models.DateField(null=True, blank=True, db_index=True)
+    ultima_compra = models.DateField(null=True, blank=True)
+    productos_frecuentes = models.JSONField(default=list, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):  # pragma: no cover - representational
+        return f"Resumen {self.cliente_id}"
+
+
 class FacturaVenta(models.Model):
     """Factura generada automáticamente al confirmar una venta."""
 
@@ -193,8 +208,7 @@ class DevolucionProducto(models.Model):
                 if lote:
                     lote.cantidad_devuelta = (lote.cantidad_devuelta or 0) + cantidad
                     lote.save()
-                producto.stock_actual = (producto.stock_actual or 0) + cantidad
-                producto.save()
+                Producto.objects.ajustar_stock({producto.pk: cantidad})
                 MovimientoInventario.objects.create(
                     producto=producto,
                     tipo="entrada",
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AdjuntoCorreo, CorreoSaliente, FacturaVenta
+
+
+logger = logging.getLogger(__name__)
+
+_BACKOFF_BASE_SEGUNDOS = 60
+_BACKOFF_MAX_SEGUNDOS = 60 * 60 * 6
+
+
+def encolar_correo(
+    asunto: str,
+    cuerpo: str,
+    destinatarios: Iterable[str],
+    clave: Optional[str] = None,
+    adjuntos: Optional[Iterable[Dict[str, Any]]] = None,
+    factura: Optional[FacturaVenta] = None,
+) -> CorreoSaliente:
+    """Guarda un correo para enviarlo desde el outbox.
+
+    Con ``clave`` el encolado es idempotente: si ya existe un correo con esa
+    clave se devuelve el existente. Cada adjunto es un dict con ``nombre``,
+    ``tipo`` y ``ruta`` (archivo en el storage) o ``contenido`` (bytes).
+    """
+    datos = {
+        "asunto": asunto,
+        "cuerpo": cuerpo,
+        "destinatarios": list(destinatarios),
+        "factura": factura,
+        "proximo_intento": timezone.now(),
+    }
+    with transaction.atomic():
+        if clave:
+            correo, creado = CorreoSaliente.objects.get_or_create(clave=clave, defaults=datos)
+            if not creado:
+                return correo
+        else:
+            correo = CorreoSaliente.objects.create(**datos)
+        AdjuntoCorreo.objects.bulk_create(
+            [AdjuntoCorreo(correo=correo, **adjunto) for adjunto in adjuntos or []]
+        )
+    return correo
+
+
+def _espera(intentos: int) -> timedelta:
+    """Backoff exponencial: 1, 2, 4... minutos, con tope."""
+    return timedelta(seconds=min(_BACKOFF_BASE_SEGUNDOS * 2 ** (intentos - 1), _BACKOFF_MAX_SEGUNDOS))
+
+
+def _tomar_pendientes(limite: int, ahora: datetime) -> List[CorreoSaliente]:
+    qs = CorreoSaliente.objects.filter(
+        estado=CorreoSaliente.ESTADO_PENDIENTE, proximo_intento__lte=ahora
+    ).order_by("proximo_intento")
+    if connection.features.has_select_for_update_skip_locked:
+        qs = qs.select_for_update(skip_locked=True, of=("self",))
+    return list(qs.prefetch_related("adjuntos")[:limite])
+
+
+def _mensaje(correo: CorreoSaliente, conexion) -> EmailMessage:
+    mensaje = EmailMessage(
+        subject=correo.asunto,
+        body=correo.cuerpo,
+        to=correo.destinatarios,
+        connection=conexion,
+    )
+    for adjunto in correo.adjuntos.all():
+        mensaje.attach(adjunto.nombre, adjunto.leer(), adjunto.tipo)
+    return mensaje
+
+
+def _fallo(correo: CorreoSaliente, error: str, ahora: datetime, resultado: dict) -> None:
+    correo.intentos += 1
+    correo.ultimo_error = error
+    if correo.intentos >= settings.OUTBOX_MAX_INTENTOS:
+        correo.estado = CorreoSaliente.ESTADO_FALLIDO
+        resultado["fallidos"] += 1
+    else:
+        correo.proximo_intento = ahora + _espera(correo.intentos)
+        resultado["reintentos"] += 1
+
+
+def _enviar(correos: List[CorreoSaliente], ahora: datetime, resultado: dict) -> None:
+    conexion = get_connection()
+    try:
+        conexion.open()
+    except Exception as exc:
+        # Sin servidor de correo todo el lote se reprograma con backoff.
+        logger.warning("No se pudo conectar al servidor de correo: %s", exc)
+        for correo in correos:
+            _fallo(correo, str(exc), ahora, resultado)
+        return
+    try:
+        for correo in correos:
+            try:
+                _mensaje(correo, conexion).send()
+            except Exception as exc:
+                logger.warning("Fallo al enviar correo %s: %s", correo.pk, exc)
+                _fallo(correo, str(exc), ahora, resultado)
+            else:
+                correo.intentos += 1
+                correo.estado = CorreoSaliente.ESTADO_ENVIADO
+                correo.enviado = ahora
+                resultado["enviados"] += 1
+    finally:
+        try:
+            conexion.close()
+        except Exception as exc:
+            logger.warning("Error al cerrar la conexión de correo: %s", exc)
+
+
+def procesar_outbox(limite: int = 50, ahora: Optional[datetime] = None) -> dict:
+    """Envía los correos pendientes cuyo ``proximo_intento`` ya llegó.
+
+    Reutiliza una sola conexión SMTP para el lote. Los fallos, incluido no
+    poder conectarse al servidor, se reintentan con backoff exponencial
+    hasta ``OUTBOX_MAX_INTENTOS``; después el correo queda ``fallido``. Las
+    facturas asociadas se marcan como enviadas. En Postgres las filas se
+    toman con ``SKIP LOCKED`` para que varios procesos puedan trabajar a la
+    vez.
+    """
+    ahora = ahora or timezone.now()
+    resultado = {"enviados": 0, "reintentos": 0, "fallidos": 0}
+    with transaction.atomic():
+        correos = _tomar_pendientes(limite, ahora)
+        if not correos:
+            return resultado
+        _enviar(correos, ahora, resultado)
+        CorreoSaliente.objects.bulk_update(
+            correos, ["estado", "intentos", "proximo_intento", "ultimo_error", "enviado"]
+        )
+        for correo in correos:
+            if correo.factura_id and correo.estado == CorreoSaliente.ESTADO_ENVIADO:
+                FacturaVenta.objects.filter(pk=correo.factura_id).update(
+                    enviado=True, enviado_a=correo.destinatarios[0], fecha_envio=ahora
+                )
+    return resultado
+
+
+__all__ = ["encolar_correo", "procesar_outbox"]
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+
+from .models import ComposicionProducto, Compra, DetalleCompra, DetallesVenta, Producto
+
+
+_VENTANA_DEMANDA_DIAS = 30
+_QUANT = Decimal("0.01")
+_CACHE_VERSION_KEY = "proyeccion_inventario:version"
+_CACHE_TIMEOUT = 60 * 60 * 24
+
+_Bases = Tuple[Dict[int, Decimal], Dict[int, List[tuple[date, Decimal]]]]
+
+
+def _ventana(start: Optional[date], end: Optional[date]) -> tuple[date, date, Decimal]:
+    if end is None:
+        end = date.today()
+    if start is None:
+        start = end - timedelta(days=_VENTANA_DEMANDA_DIAS)
+    return start, end, Decimal(max((end - start).days + 1, 1))
+
+
+def demanda_diaria_insumos(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Dict[int, Decimal]:
+    """Demanda diaria promedio de cada insumo según las ventas de productos finales.
+
+    Las ventas del periodo se explotan a través de la receta base activa
+    (``ComposicionProducto`` sin lote) aplicando merma y rendimiento, todo en
+    una sola consulta agrupada por ingrediente.
+    """
+    start, end, dias = _ventana(start, end)
+    consumo = ExpressionWrapper(
+        F("cantidad_requerida")
+        * F("producto_final__detallesventa__cantidad")
+        * (Value(Decimal("100")) + F("producto_final__merma_porcentaje"))
+        / (Value(Decimal("100")) * F("producto_final__rendimiento_receta")),
+        output_field=DecimalField(max_digits=20, decimal_places=6),
+    )
+    filas = (
+        ComposicionProducto.objects.filter(
+            activo=True,
+            lote__isnull=True,
+            producto_final__detallesventa__venta__fecha__range=[start, end],
+        )
+        .values("ingrediente")
+        .annotate(total=Sum(consumo))
+    )
+    return {
+        f["ingrediente"]: Decimal(str(f["total"] or 0)) / dias
+        for f in filas
+    }
+
+
+def demanda_diaria_ventas(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Dict[int, Decimal]:
+    """Venta diaria promedio por producto en la ventana indicada."""
+    start, end, dias = _ventana(start, end)
+    filas = (
+        DetallesVenta.objects.filter(venta__fecha__range=[start, end])
+        .values("producto")
+        .annotate(total=Sum("cantidad"))
+    )
+    return {f["producto"]: Decimal(str(f["total"] or 0)) / dias for f in filas}
+
+
+def entradas_pendientes(hoy: Optional[date] = None) -> Dict[int, List[tuple[date, Decimal]]]:
+    """Cantidades aún no recibidas de compras pendientes o parciales.
+
+    La llegada estimada es la fecha de la compra más el ``lead_time_dias`` del
+    producto; las entregas atrasadas se consideran para hoy.
+    """
+    hoy = hoy or date.today()
+    filas = DetalleCompra.objects.filter(
+        compra__estado__in=[Compra.ESTADO_PENDIENTE, Compra.ESTADO_PARCIAL]
+    ).values(
+        "producto_id",
+        "cantidad",
+        "cantidad_recibida",
+        "compra__fecha",
+        "producto__lead_time_dias",
+    )
+    pendientes: Dict[int, List[tuple[date, Decimal]]] = {}
+    for f in filas:
+        cantidad = Decimal(str(f["cantidad"] or 0)) - Decimal(str(f["cantidad_recibida"] or 0))
+        if cantidad <= 0:
+            continue
+        llegada = f["compra__fecha"] + timedelta(days=f["producto__lead_time_dias"] or 0)
+        pendientes.setdefault(f["producto_id"], []).append((max(llegada, hoy), cantidad))
+    return pendientes
+
+
+def _bases(hoy: date) -> _Bases:
+    """Demanda diaria y entradas pendientes por producto, en tres consultas."""
+    demanda = demanda_diaria_ventas(end=hoy)
+    for pid, valor in demanda_diaria_insumos(end=hoy).items():
+        demanda[pid] = demanda.get(pid, Decimal("0")) + valor
+    return demanda, entradas_pendientes(hoy)
+
+
+def calcular_proyeccion(
+    horizon_days: int = 14,
+    hoy: Optional[date] = None,
+    bases: Optional[_Bases] = None,
+) -> Dict[str, Any]:
+    """Proyecta el inventario diario de todo el catálogo.
+
+    Para cada producto: stock actual más entradas pendientes menos la demanda
+    pronosticada, día a día durante ``horizon_days``. Se resuelve con cuatro
+    consultas sin importar el tamaño del catálogo; con ``bases`` (ver
+    ``_bases``) sólo se lee el stock.
+    """
+    hoy = hoy or date.today()
+    demanda, pendientes = bases if bases is not None else _bases(hoy)
+
+    productos = Producto.objects.filter(activo=True).values(
+        "id",
+        "nombre",
+        "tipo",
+        "proveedor_id",
+        "stock_actual",
+        "stock_minimo",
+        "stock_seguridad",
+        "nivel_reorden",
+        "lead_time_dias",
+        "unidad_empaque",
+        "costo",
+    )
+    resultado: List[Dict[str, Any]] = []
+    for prod in productos:
+        stock = Decimal(str(prod["stock_actual"] or 0))
+        diaria = demanda.get(prod["id"], Decimal("0"))
+        llegadas = sorted(pendientes.get(prod["id"], []))
+        en_camino = sum((c for _, c in llegadas), Decimal("0"))
+
+        dias: List[Dict[str, Any]] = []
+        recibido = Decimal("0")
+        idx = 0
+        quiebre = None
+        for d in range(1, horizon_days + 1):
+            fecha = hoy + timedelta(days=d)
+            entradas = Decimal("0")
+            while idx < len(llegadas) and llegadas[idx][0] <= fecha:
+                entradas += llegadas[idx][1]
+                idx += 1
+            recibido += entradas
+            proyectado = stock + recibido - diaria * d
+            if quiebre is None and proyectado < 0:
+                quiebre = fecha.isoformat()
+            dias.append(
+                {
+                    "fecha": fecha.isoformat(),
+                    "entradas": float(entradas),
+                    "demanda": float(diaria.quantize(_QUANT, ROUND_HALF_UP)),
+                    "proyectado": float(proyectado.quantize(_QUANT, ROUND_HALF_UP)),
+                }
+            )
+
+        resultado.append(
+            {
+                **prod,
+                "producto": prod["id"],
+                "stock_actual": float(stock),
+                "en_camino": float(en_camino),
+                "demanda_diaria": float(diaria.quantize(_QUANT, ROUND_HALF_UP)),
+                "dia_quiebre": quiebre,
+                "dias": dias,
+                "_demanda_diaria": diaria,
+            }
+        )
+
+    return {
+        "fecha": hoy.isoformat(),
+        "horizonte": horizon_days,
+        "productos": resultado,
+    }
+
+
+def _cache_key(hoy: date) -> str:
+    version = cache.get_or_set(_CACHE_VERSION_KEY, 1, None)
+    return f"proyeccion_inventario:{version}:{hoy.isoformat()}"
+
+
+def obtener_proyeccion(horizon_days: int = 14, refrescar: bool = False) -> Dict[str, Any]:
+    """Devuelve la proyección del día.
+
+    La demanda y las entradas pendientes se guardan en caché por día; el
+    stock se lee siempre, así ventas, producción y ajustes se reflejan sin
+    tener que invalidar nada.
+    """
+    hoy = date.today()
+    key = _cache_key(hoy)
+    bases = None if refrescar else cache.get(key)
+    if bases is None:
+        bases = _bases(hoy)
+        cache.set(key, bases, _CACHE_TIMEOUT)
+    return calcular_proyeccion(horizon_days, hoy, bases)
+
+
+def invalidar_proyeccion() -> None:
+    """Descarta la demanda y las entradas en caché (p. ej. al crear o recibir compras)."""
+    try:
+        cache.incr(_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(_CACHE_VERSION_KEY, 1, None)
+
+
+def serializar_proyeccion(data: Dict[str, Any], producto: Optional[int] = None) -> Dict[str, Any]:
+    """Prepara la proyección para la API omitiendo los campos internos."""
+    campos = (
+        "producto",
+        "nombre",
+        "tipo",
+        "stock_actual",
+        "en_camino",
+        "demanda_diaria",
+        "dia_quiebre",
+        "dias",
+    )
+    productos = [
+        {campo: p[campo] for campo in campos}
+        for p in data["productos"]
+        if producto is None or p["producto"] == producto
+    ]
+    return {"fecha": data["fecha"], "horizonte": data["horizonte"], "productos": productos}
+
+
+__all__ = [
+    "demanda_diaria_insumos",
+    "demanda_diaria_ventas",
+    "entradas_pendientes",
+    "calcular_proyeccion",
+    "obtener_proyeccion",
+    "invalidar_proyeccion",
+    "serializar_proyeccion",
+]
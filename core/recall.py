@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import csv
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.db import close_old_connections, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import DetallesVenta, LoteMateriaPrima, SimulacionRetiro, UsoLoteMateriaPrima
+from .renderers import FastJSONRenderer
+
+
+_RETENCION = timedelta(days=1)
+_ABANDONO = timedelta(minutes=10)
+_EJECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="retiro")
+
+
+def simular_retiro(
+    lotes: Optional[Iterable[str]] = None,
+    proveedor: Optional[int] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+) -> Dict[str, Any]:
+    """Impacto de retirar lotes de materia prima.
+
+    Los lotes se eligen por código o por proveedor y rango de recepción.
+    Devuelve los lotes finales afectados con su stock a poner en cuarentena,
+    lo vendido a cada cliente y la exposición de costo (unidades vendidas y
+    en stock por el costo unitario del lote). Son dos consultas agrupadas
+    sin importar cuántos lotes intervienen.
+    """
+    materias = LoteMateriaPrima.objects.all()
+    if lotes is not None:
+        materias = materias.filter(codigo__in=list(lotes))
+    if proveedor is not None:
+        materias = materias.filter(producto__proveedor_id=proveedor)
+    if desde is not None:
+        materias = materias.filter(fecha_recepcion__gte=desde)
+    if hasta is not None:
+        materias = materias.filter(fecha_recepcion__lte=hasta)
+
+    finales: Dict[int, Dict[str, Any]] = {}
+    codigos_materia = set()
+    for uso in (
+        UsoLoteMateriaPrima.objects.filter(lote_materia_prima__in=materias)
+        .values(
+            "lote_materia_prima__codigo",
+            "lote_producto_final_id",
+            "lote_producto_final__codigo",
+            "lote_producto_final__producto__nombre",
+            "lote_producto_final__producto__costo",
+            "lote_producto_final__fecha_produccion",
+            "lote_producto_final__cantidad_producida",
+            "lote_producto_final__cantidad_devuelta",
+            "lote_producto_final__cantidad_descartada",
+            "lote_producto_final__costo_unitario",
+        )
+        .order_by()
+    ):
+        codigos_materia.add(uso["lote_materia_prima__codigo"])
+        final = finales.setdefault(
+            uso["lote_producto_final_id"],
+            {
+                "lote_final": uso["lote_producto_final__codigo"],
+                "producto": uso["lote_producto_final__producto__nombre"],
+                "fecha_produccion": uso["lote_producto_final__fecha_produccion"],
+                "producido": uso["lote_producto_final__cantidad_producida"],
+                "descartado": uso["lote_producto_final__cantidad_descartada"] or Decimal("0"),
+                "recuperado": uso["lote_producto_final__cantidad_devuelta"] or Decimal("0"),
+                "costo_unitario": uso["lote_producto_final__costo_unitario"]
+                or uso["lote_producto_final__producto__costo"]
+                or Decimal("0"),
+                "lotes_materia_prima": [],
+                "vendido": Decimal("0"),
+            },
+        )
+        final["lotes_materia_prima"].append(uso["lote_materia_prima__codigo"])
+
+    clientes: Dict[Any, Dict[str, Any]] = {}
+    for fila in (
+        DetallesVenta.objects.filter(lote_final_id__in=list(finales))
+        .values(
+            "lote_final_id",
+            "venta__cliente_id",
+            "venta__cliente__nombre",
+            "venta__cliente__contacto",
+            "venta__cliente__email",
+        )
+        .annotate(cantidad=Sum("cantidad"))
+        .order_by()
+    ):
+        final = finales[fila["lote_final_id"]]
+        final["vendido"] += fila["cantidad"] or 0
+        cliente = clientes.setdefault(
+            fila["venta__cliente_id"],
+            {
+                "cliente": fila["venta__cliente_id"],
+                "nombre": fila["venta__cliente__nombre"] or "Consumidor final",
+                "contacto": fila["venta__cliente__contacto"],
+                "email": fila["venta__cliente__email"],
+                "cantidad": Decimal("0"),
+                "exposicion": Decimal("0"),
+                "lotes_finales": [],
+            },
+        )
+        cliente["cantidad"] += fila["cantidad"] or 0
+        cliente["exposicion"] += (fila["cantidad"] or 0) * final["costo_unitario"]
+        cliente["lotes_finales"].append(final["lote_final"])
+
+    lotes_finales: List[Dict[str, Any]] = []
+    cuarentena = Decimal("0")
+    exposicion = Decimal("0")
+    for final in finales.values():
+        en_stock = max(
+            final["producido"] - final["vendido"] - final["descartado"] + final["recuperado"],
+            Decimal("0"),
+        )
+        costo = (final["vendido"] + en_stock) * final["costo_unitario"]
+        cuarentena += en_stock
+        exposicion += costo
+        lotes_finales.append(
+            {
+                "lote_final": final["lote_final"],
+                "producto": final["producto"],
+                "fecha_produccion": final["fecha_produccion"],
+                "lotes_materia_prima": sorted(set(final["lotes_materia_prima"])),
+                "vendido": final["vendido"],
+                "en_stock": en_stock,
+                "costo_unitario": final["costo_unitario"],
+                "exposicion": costo,
+            }
+        )
+
+    return {
+        "lotes_materia_prima": sorted(codigos_materia),
+        "lotes_finales": sorted(lotes_finales, key=lambda f: f["lote_final"]),
+        "clientes": sorted(clientes.values(), key=lambda c: c["cantidad"], reverse=True),
+        "totales": {
+            "lotes_finales": len(lotes_finales),
+            "clientes": len([c for c in clientes if c is not None]),
+            "vendido": sum((f["vendido"] for f in lotes_finales), Decimal("0")),
+            "cuarentena": cuarentena,
+            "exposicion": exposicion,
+        },
+    }
+
+
+def _reclamar(simulacion_id, vencidas_antes=None) -> bool:
+    """Marca la simulación en curso si nadie más la tomó."""
+    pendiente = Q(estado=SimulacionRetiro.ESTADO_PENDIENTE)
+    if vencidas_antes is not None:
+        pendiente |= Q(estado=SimulacionRetiro.ESTADO_EN_CURSO, actualizada__lt=vencidas_antes)
+    return bool(
+        SimulacionRetiro.objects.filter(pendiente, id=simulacion_id).update(
+            estado=SimulacionRetiro.ESTADO_EN_CURSO, actualizada=timezone.now()
+        )
+    )
+
+
+def _ejecutar(simulacion_id, vencidas_antes=None) -> None:
+    if not _reclamar(simulacion_id, vencidas_antes):
+        return
+    simulacion = SimulacionRetiro.objects.get(id=simulacion_id)
+    parametros = {
+        clave: date.fromisoformat(valor) if clave in ("desde", "hasta") and valor else valor
+        for clave, valor in simulacion.parametros.items()
+    }
+    try:
+        # Mismos tipos que la respuesta sincrónica (``Decimal`` como número).
+        simulacion.resultado = json.loads(FastJSONRenderer().render(simular_retiro(**parametros)))
+        simulacion.estado = SimulacionRetiro.ESTADO_LISTO
+    except Exception as exc:  # pragma: no cover - se informa al consultar
+        simulacion.estado = SimulacionRetiro.ESTADO_ERROR
+        simulacion.error = str(exc)
+    simulacion.save(update_fields=["estado", "resultado", "error", "actualizada"])
+
+
+def _ejecutar_en_hilo(simulacion_id) -> None:
+    close_old_connections()
+    try:
+        _ejecutar(simulacion_id)
+    finally:
+        close_old_connections()
+
+
+def lanzar_simulacion(**parametros) -> str:
+    """Ejecuta ``simular_retiro`` en segundo plano y devuelve el id a consultar."""
+    simulacion = SimulacionRetiro.objects.create(parametros=parametros)
+    transaction.on_commit(lambda: _EJECUTOR.submit(_ejecutar_en_hilo, simulacion.id))
+    return simulacion.id.hex
+
+
+def estado_simulacion(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado y, si terminó, resultado de una simulación en segundo plano."""
+    try:
+        simulacion = SimulacionRetiro.objects.get(id=uuid.UUID(job_id))
+    except (ValueError, SimulacionRetiro.DoesNotExist):
+        return None
+    estado: Dict[str, Any] = {"estado": simulacion.estado}
+    if simulacion.estado == SimulacionRetiro.ESTADO_EN_CURSO:
+        estado["estado"] = SimulacionRetiro.ESTADO_PENDIENTE
+    elif simulacion.estado == SimulacionRetiro.ESTADO_LISTO:
+        estado["resultado"] = simulacion.resultado
+    elif simulacion.estado == SimulacionRetiro.ESTADO_ERROR:
+        estado["error"] = simulacion.error
+    return estado
+
+
+def procesar_simulaciones(limite: int = 10) -> int:
+    """Ejecuta simulaciones pendientes o abandonadas y purga las viejas.
+
+    Retoma las que quedaron pendientes o en curso por más de
+    ``_ABANDONO`` (p. ej. porque se reinició el proceso web que las lanzó) y
+    borra las terminadas hace más de ``_RETENCION``. Devuelve cuántas
+    ejecutó.
+    """
+    ahora = timezone.now()
+    SimulacionRetiro.objects.filter(
+        estado__in=[SimulacionRetiro.ESTADO_LISTO, SimulacionRetiro.ESTADO_ERROR],
+        actualizada__lt=ahora - _RETENCION,
+    ).delete()
+    vencidas_antes = ahora - _ABANDONO
+    ids = list(
+        SimulacionRetiro.objects.filter(
+            Q(estado=SimulacionRetiro.ESTADO_PENDIENTE)
+            | Q(estado=SimulacionRetiro.ESTADO_EN_CURSO, actualizada__lt=vencidas_antes)
+        )
+        .order_by("creada")
+        .values_list("id", flat=True)[:limite]
+    )
+    for simulacion_id in ids:
+        _ejecutar(simulacion_id, vencidas_antes)
+    return len(ids)
+
+
+class _Eco:
+    """Objeto tipo archivo que devuelve lo escrito, para ``csv.writer``."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def filas_csv(resultado: Dict[str, Any]) -> Iterator[str]:
+    """Reporte CSV de la simulación, línea por línea para streaming."""
+    writer = csv.writer(_Eco())
+    yield writer.writerow(
+        ["seccion", "lote_final", "producto", "cliente", "contacto", "cantidad", "en_stock", "exposicion"]
+    )
+    for f in resultado["lotes_finales"]:
+        yield writer.writerow(
+            ["lote", f["lote_final"], f["producto"], "", "", f["vendido"], f["en_stock"], f["exposicion"]]
+        )
+    for c in resultado["clientes"]:
+        yield writer.writerow(
+            [
+                "cliente",
+                " ".join(c["lotes_finales"]),
+                "",
+                c["nombre"],
+                c["contacto"] or "",
+                c["cantidad"],
+                "",
+                c["exposicion"],
+            ]
+        )
+    t = resultado["totales"]
+    yield writer.writerow(
+        ["total", t["lotes_finales"], "", t["clientes"], "", t["vendido"], t["cuarentena"], t["exposicion"]]
+    )
+
+
+__all__ = [
+    "simular_retiro",
+    "lanzar_simulacion",
+    "estado_simulacion",
+    "procesar_simulaciones",
+    "filas_csv",
+]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+
+from .models import Compra, DetalleCompra, LoteMateriaPrima, MovimientoInventario, Producto
+from .models.helpers import normalize_date
+from .projection import invalidar_proyeccion
+
+
+_QUANT = Decimal("0.01")
+_LARGO_CODIGO_LOTE = LoteMateriaPrima._meta.get_field("codigo").max_length
+
+
+def _q(value: Any) -> Decimal:
+    return Decimal(str(value)).quantize(_QUANT, ROUND_HALF_UP)
+
+
+@transaction.atomic
+def recibir_compra(
+    compra: Compra,
+    lineas: Optional[List[Dict[str, Any]]] = None,
+    usuario=None,
+) -> Dict[str, Any]:
+    """Registra la recepción total o parcial de una ``Compra``.
+
+    ``lineas`` es una lista de ``{"detalle": id, "cantidad": x}`` con campos
+    opcionales ``lote`` y ``fecha_vencimiento``; si se omite se recibe todo lo
+    pendiente. El stock se ajusta con ``Producto.objects.ajustar_stock`` y los
+    movimientos y lotes se insertan en bloque, por lo que el número de
+    consultas no depende de la cantidad de líneas. Un código de lote repetido
+    o ya existente se rechaza con ``ValueError`` antes de escribir nada.
+    """
+    detalles = {
+        d.id: d
+        for d in DetalleCompra.objects.select_for_update()
+        .filter(compra=compra)
+        .select_related("producto")
+        .only(
+            "id",
+            "cantidad",
+            "cantidad_recibida",
+            "producto__id",
+            "producto__control_por_lote",
+            "producto__tipo",
+            "producto__vida_util_dias",
+        )
+    }
+    if lineas is None:
+        lineas = [
+            {"detalle": d.id, "cantidad": d.cantidad_pendiente}
+            for d in detalles.values()
+        ]
+
+    hoy = date.today()
+    sello = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    deltas: Dict[int, Decimal] = {}
+    actualizados: List[DetalleCompra] = []
+    movimientos: List[MovimientoInventario] = []
+    lotes: List[LoteMateriaPrima] = []
+    for linea in lineas:
+        det = detalles.get(int(linea["detalle"]))
+        if det is None:
+            raise ValueError(f"La línea {linea['detalle']} no pertenece a la compra")
+        cantidad = _q(linea["cantidad"])
+        if cantidad < 0:
+            raise ValueError("La cantidad recibida no puede ser negativa")
+        if cantidad > det.cantidad_pendiente:
+            raise ValueError(
+                f"Se reciben {cantidad} pero solo quedan {det.cantidad_pendiente} pendientes"
+            )
+        if len(str(linea.get("lote") or "")) > _LARGO_CODIGO_LOTE:
+            raise ValueError(
+                f"El código de lote admite hasta {_LARGO_CODIGO_LOTE} caracteres"
+            )
+        if cantidad == 0:
+            continue
+
+        det.cantidad_recibida += cantidad
+        actualizados.append(det)
+        deltas[det.producto_id] = deltas.get(det.producto_id, Decimal("0")) + cantidad
+        movimientos.append(
+            MovimientoInventario(
+                producto_id=det.producto_id,
+                tipo="entrada",
+                cantidad=cantidad,
+                motivo="Recepción de compra",
+                usuario=usuario,
+                operacion_tipo=MovimientoInventario.OPERACION_COMPRA,
+                compra=compra,
+            )
+        )
+        producto = det.producto
+        if producto.control_por_lote and (producto.tipo or "").startswith("ingred"):
+            vencimiento = linea.get("fecha_vencimiento")
+            if vencimiento:
+                vencimiento = normalize_date(vencimiento, "fecha_vencimiento")
+            else:
+                vencimiento = hoy + timedelta(days=producto.vida_util_dias or 0)
+            lotes.append(
+                LoteMateriaPrima(
+                    codigo=linea.get("lote") or f"OC{compra.pk}-{det.id}-{sello}",
+                    producto_id=det.producto_id,
+                    fecha_recepcion=hoy,
+                    fecha_vencimiento=vencimiento,
+                    cantidad_inicial=cantidad,
+                )
+            )
+
+    if lotes:
+        codigos = [lote.codigo for lote in lotes]
+        repetidos = {c for c in codigos if codigos.count(c) > 1}
+        repetidos.update(
+            LoteMateriaPrima.objects.filter(codigo__in=codigos).values_list("codigo", flat=True)
+        )
+        if repetidos:
+            raise ValueError(f"Códigos de lote ya usados: {', '.join(sorted(repetidos))}")
+
+    if deltas:
+        Producto.objects.ajustar_stock(deltas)
+        DetalleCompra.objects.bulk_update(actualizados, ["cantidad_recibida"])
+        MovimientoInventario.objects.bulk_create(movimientos)
+        if lotes:
+            LoteMateriaPrima.objects.bulk_create(lotes)
+        invalidar_proyeccion()
+
+    completa = all(d.cantidad_pendiente == 0 for d in detalles.values())
+    if completa:
+        estado = Compra.ESTADO_RECIBIDO
+    elif any(d.cantidad_recibida > 0 for d in detalles.values()):
+        estado = Compra.ESTADO_PARCIAL
+    else:
+        estado = compra.estado
+    if estado != compra.estado:
+        compra.estado = estado
+        compra.save(update_fields=["estado"])
+
+    return {
+        "id": compra.id,
+        "estado": compra.estado,
+        "lineas": [
+            {
+                "detalle": d.id,
+                "producto": d.producto_id,
+                "cantidad": float(d.cantidad),
+                "cantidad_recibida": float(d.cantidad_recibida),
+            }
+            for d in detalles.values()
+        ],
+        "lotes": [lote.codigo for lote in lotes],
+    }
+
+
+__all__ = ["recibir_compra"]
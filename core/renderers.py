@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:  # pragma: no cover - depende del entorno
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Tipos que orjson no conoce: ``Decimal`` a float y el resto como DRF."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` que usa orjson cuando está instalado.
+
+    Serializa ``date``/``datetime`` de forma nativa (UTC como ``Z``, igual que
+    DRF) y ``Decimal`` como número. Si orjson no está disponible o se pide
+    indentación se usa el renderer estándar de DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+__all__ = ["FastJSONRenderer"]
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal, ROUND_CEILING, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional
+
+from django.contrib.contenttypes.models import ContentType
+
+from .models import AuditLog, Compra, DetalleCompra
+from .projection import obtener_proyeccion
+
+
+_QUANT = Decimal("0.01")
+
+
+def redondear_a_empaque(cantidad: Decimal, unidad_empaque: int) -> Decimal:
+    """Redondea ``cantidad`` hacia arriba al múltiplo de ``unidad_empaque``."""
+    empaque = Decimal(max(unidad_empaque or 1, 1))
+    paquetes = (cantidad / empaque).to_integral_value(rounding=ROUND_CEILING)
+    return paquetes * empaque
+
+
+def calcular_reorden(
+    producto: Dict[str, Any],
+    demanda_diaria: Decimal,
+    horizon_days: int = 7,
+    en_camino: Decimal = Decimal("0"),
+) -> Optional[Dict[str, Any]]:
+    """Aplica una política (s, S) a un insumo.
+
+    ``producto`` es una fila de ``values()`` con los campos de reposición. El
+    punto de reorden ``s`` cubre la demanda durante el ``lead_time_dias`` más el
+    stock de seguridad (nunca por debajo de ``stock_minimo`` ni de
+    ``nivel_reorden``). El nivel objetivo ``S`` añade la demanda del horizonte.
+    La posición de inventario incluye lo ``en_camino`` de compras pendientes.
+    Devuelve ``None`` si no hace falta pedir.
+    """
+    stock = Decimal(str(producto["stock_actual"] or 0)) + en_camino
+    lead_time = Decimal(producto["lead_time_dias"] or 0)
+    punto_reorden = max(
+        Decimal(str(producto["stock_minimo"] or 0)),
+        Decimal(str(producto["nivel_reorden"] or 0)),
+        Decimal(str(producto["stock_seguridad"] or 0)) + demanda_diaria * lead_time,
+    )
+    demanda_horizonte = demanda_diaria * Decimal(horizon_days)
+    if stock >= punto_reorden and stock >= demanda_horizonte:
+        return None
+
+    nivel_objetivo = punto_reorden + demanda_horizonte
+    faltante = nivel_objetivo - stock
+    if faltante <= 0:
+        return None
+    cantidad = redondear_a_empaque(faltante, producto["unidad_empaque"])
+    return {
+        "producto": producto["id"],
+        "nombre": producto["nombre"],
+        "proveedor": producto["proveedor_id"],
+        "cantidad": float(cantidad),
+        "unidad_empaque": producto["unidad_empaque"],
+        "punto_reorden": float(punto_reorden.quantize(_QUANT, ROUND_HALF_UP)),
+        "nivel_objetivo": float(nivel_objetivo.quantize(_QUANT, ROUND_HALF_UP)),
+        "demanda_diaria": float(demanda_diaria.quantize(_QUANT, ROUND_HALF_UP)),
+        "en_camino": float(en_camino),
+        "costo": float(producto["costo"] or 0),
+    }
+
+
+def sugerencias_reorden(horizon_days: int = 7, refrescar: bool = False) -> List[Dict[str, Any]]:
+    """Calcula sugerencias de compra para todo el catálogo de insumos.
+
+    Reutiliza la proyección de inventario del día (demanda y compras en camino)
+    en lugar de volver a consultarla; ``refrescar`` fuerza un cálculo nuevo.
+    """
+    proyeccion = obtener_proyeccion(horizon_days, refrescar=refrescar)
+    sugerencias: List[Dict[str, Any]] = []
+    for prod in proyeccion["productos"]:
+        if not (prod["tipo"] or "").startswith("ingred"):
+            continue
+        sugerencia = calcular_reorden(
+            prod,
+            prod["_demanda_diaria"],
+            horizon_days,
+            Decimal(str(prod["en_camino"])),
+        )
+        if sugerencia:
+            sugerencias.append(sugerencia)
+    return sugerencias
+
+
+def crear_ordenes_compra(
+    sugerencias: List[Dict[str, Any]],
+    fecha: Optional[date] = None,
+) -> List[int]:
+    """Crea una ``Compra`` pendiente por proveedor usando inserciones masivas.
+
+    No dispara las señales de ``Compra``; quien llama es responsable de
+    actualizar el balance del periodo una sola vez.
+    """
+    fecha = fecha or date.today()
+    by_prov: Dict[int, List[Dict[str, Any]]] = {}
+    for s in sugerencias:
+        if s["proveedor"] is None:
+            continue
+        by_prov.setdefault(s["proveedor"], []).append(s)
+    if not by_prov:
+        return []
+
+    compras: List[Compra] = []
+    lineas: List[List[tuple[int, Decimal, Decimal]]] = []
+    for prov_id, items in by_prov.items():
+        detalle = []
+        total = Decimal("0")
+        for item in items:
+            cantidad = Decimal(str(item["cantidad"])).quantize(_QUANT, ROUND_HALF_UP)
+            precio = Decimal(str(item["costo"])).quantize(_QUANT, ROUND_HALF_UP)
+            detalle.append((item["producto"], cantidad, precio))
+            total += cantidad * precio
+        compras.append(
+            Compra(
+                proveedor_id=prov_id,
+                fecha=fecha,
+                total=total.quantize(_QUANT, ROUND_HALF_UP),
+                estado=Compra.ESTADO_PENDIENTE,
+            )
+        )
+        lineas.append(detalle)
+
+    compras = Compra.objects.bulk_create(compras)
+    DetalleCompra.objects.bulk_create(
+        [
+            DetalleCompra(
+                compra=compra,
+                producto_id=producto_id,
+                cantidad=cantidad,
+                precio_unitario=precio,
+            )
+            for compra, detalle in zip(compras, lineas)
+            for producto_id, cantidad, precio in detalle
+        ]
+    )
+    tipo = ContentType.objects.get_for_model(Compra)
+    AuditLog.objects.bulk_create(
+        [
+            AuditLog(accion="creada", tipo_contenido=tipo, objeto_id=compra.pk)
+            for compra in compras
+        ]
+    )
+    return [compra.pk for compra in compras]
+
+
+__all__ = [
+    "redondear_a_empaque",
+    "calcular_reorden",
+    "sugerencias_reorden",
+    "crear_ordenes_compra",
+]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Optional, Set
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import DetallesVenta, DevolucionProducto
+
+
+_UMBRAL_ALERTA = 5.0
+_CACHE_VERSION_KEY = "tasas_devolucion:version"
+_CACHE_TIMEOUT = 60 * 60
+
+
+def _tasa(devueltas, vendidas) -> float:
+    return float(devueltas) / float(vendidas) * 100 if vendidas else 0.0
+
+
+def calcular_tasas(start: date, end: date, producto: Optional[int] = None) -> Dict[str, Any]:
+    """Tasas de devolución por producto, lote, proveedor y responsable.
+
+    Son dos consultas agrupadas sobre ``[start, end]``: las ventas por
+    producto y lote, y las devoluciones por producto, lote y responsable. Ambas se
+    cruzan en memoria, por lo que el costo depende de la cantidad de claves
+    distintas y no de las filas de devolución. ``producto`` limita el
+    detalle por lote a ese producto.
+    """
+    vendidas: Dict[int, Any] = {}
+    vendidas_lote: Dict[Any, Any] = {}
+    vendidas_prov: Dict[Optional[int], Any] = {}
+    for v in (
+        DetallesVenta.objects.filter(venta__fecha__range=[start, end])
+        .values("producto", "producto__proveedor", "lote_final")
+        .annotate(total=Sum("cantidad"))
+        .order_by()
+    ):
+        vendidas[v["producto"]] = vendidas.get(v["producto"], 0) + v["total"]
+        vendidas_lote[(v["producto"], v["lote_final"])] = v["total"]
+        prov = v["producto__proveedor"]
+        vendidas_prov[prov] = vendidas_prov.get(prov, 0) + v["total"]
+
+    filas = (
+        DevolucionProducto.objects.filter(fecha__range=[start, end])
+        .values(
+            "producto",
+            "producto__nombre",
+            "producto__proveedor",
+            "producto__proveedor__nombre",
+            "lote_final",
+            "lote_final__codigo",
+            "responsable",
+            "responsable__username",
+        )
+        .annotate(total=Sum("cantidad"))
+        .order_by()
+    )
+
+    productos: Dict[int, Dict[str, Any]] = {}
+    lotes: Dict[Any, Dict[str, Any]] = {}
+    proveedores: Dict[Optional[int], Dict[str, Any]] = {}
+    responsables: Dict[int, Dict[str, Any]] = {}
+    productos_resp: Dict[int, Set[int]] = {}
+    for f in filas:
+        pid = f["producto"]
+        prod = productos.setdefault(
+            pid, {"producto": pid, "nombre": f["producto__nombre"], "devueltas": 0}
+        )
+        prod["devueltas"] += f["total"]
+
+        if producto is None or pid == producto:
+            lote = lotes.setdefault(
+                (pid, f["lote_final"]),
+                {"producto": pid, "lote_final": f["lote_final__codigo"], "devueltas": 0},
+            )
+            lote["devueltas"] += f["total"]
+
+        prov = f["producto__proveedor"]
+        proveedor = proveedores.setdefault(
+            prov, {"proveedor": prov, "nombre": f["producto__proveedor__nombre"], "devueltas": 0}
+        )
+        proveedor["devueltas"] += f["total"]
+
+        rid = f["responsable"]
+        resp = responsables.setdefault(
+            rid, {"responsable": rid, "nombre": f["responsable__username"], "devueltas": 0}
+        )
+        resp["devueltas"] += f["total"]
+        productos_resp.setdefault(rid, set()).add(pid)
+
+    for prod in productos.values():
+        prod["vendidas"] = vendidas.get(prod["producto"], 0)
+    for clave, lote in lotes.items():
+        lote["vendidas"] = vendidas_lote.get(clave, 0)
+    for proveedor in proveedores.values():
+        proveedor["vendidas"] = vendidas_prov.get(proveedor["proveedor"], 0)
+    for rid, resp in responsables.items():
+        resp["vendidas"] = sum(vendidas.get(pid, 0) for pid in productos_resp[rid])
+
+    def _filas(grupo):
+        salida = []
+        for item in grupo.values():
+            tasa = _tasa(item["devueltas"], item["vendidas"])
+            salida.append(
+                {
+                    **item,
+                    "devueltas": float(item["devueltas"]),
+                    "vendidas": float(item["vendidas"]),
+                    "tasa": tasa,
+                    "alerta": tasa > _UMBRAL_ALERTA,
+                }
+            )
+        return sorted(salida, key=lambda x: x["tasa"], reverse=True)
+
+    return {
+        "desde": start.isoformat(),
+        "hasta": end.isoformat(),
+        "por_producto": _filas(productos),
+        "por_lote": _filas(lotes),
+        "por_proveedor": _filas(proveedores),
+        "por_responsable": _filas(responsables),
+    }
+
+
+def obtener_tasas(start: date, end: date, producto: Optional[int] = None) -> Dict[str, Any]:
+    """``calcular_tasas`` en caché por ventana de fechas."""
+    version = cache.get_or_set(_CACHE_VERSION_KEY, 1, None)
+    key = f"tasas_devolucion:{version}:{start.isoformat()}:{end.isoformat()}:{producto or ''}"
+    data = cache.get(key)
+    if data is None:
+        data = calcular_tasas(start, end, producto)
+        cache.set(key, data, _CACHE_TIMEOUT)
+    return data
+
+
+def invalidar_tasas() -> None:
+    """Descarta las tasas en caché (al registrar devoluciones o ventas)."""
+    try:
+        cache.incr(_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(_CACHE_VERSION_KEY, 1, None)
+
+
+__all__ = ["calcular_tasas", "obtener_tasas", "invalidar_tasas"]
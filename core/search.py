@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Producto
+from .models.helpers import normalizar_texto
+
+
+_CAMPOS = ("id", "codigo", "codigo_barras", "nombre", "precio", "stock_actual", "tipo")
+
+
+def buscar_por_codigo(codigo: str) -> List[Dict[str, Any]]:
+    """Búsqueda exacta por ``codigo_barras`` o ``codigo`` usando sus índices."""
+    codigo = (codigo or "").strip()
+    if not codigo:
+        return []
+    return list(
+        Producto.objects.filter(Q(codigo_barras=codigo) | Q(codigo=codigo))
+        .values(*_CAMPOS)[:5]
+    )
+
+
+def buscar_productos(q: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Busca productos por nombre, código, código de barras o descripción.
+
+    Un código exacto (lo que envía un lector en el punto de venta) se resuelve
+    con una consulta indexada y se devuelve solo. Si no, cada término debe
+    aparecer en la columna normalizada ``busqueda``; el orden premia el
+    prefijo del texto completo, luego el prefijo de palabra y por último
+    cualquier coincidencia.
+    """
+    exactos = buscar_por_codigo(q)
+    if exactos:
+        return [{**p, "rank": 0} for p in exactos]
+
+    normal = normalizar_texto(q)
+    terminos = normal.split()
+    if not terminos:
+        return []
+
+    filtro = Q()
+    for termino in terminos:
+        filtro &= Q(busqueda__contains=termino)
+    primero = terminos[0]
+    qs = (
+        Producto.objects.filter(filtro, activo=True)
+        .annotate(
+            rank=Case(
+                When(busqueda__startswith=normal, then=Value(1)),
+                When(busqueda__startswith=primero, then=Value(2)),
+                When(busqueda__contains=f" {primero}", then=Value(3)),
+                default=Value(4),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("rank", "nombre")
+        .values(*_CAMPOS, "rank")
+    )
+    return list(qs[:limit])
+
+
+__all__ = ["buscar_por_codigo", "buscar_productos"]
@@ -1,19 +1,19 @@
 import logging
 from typing import Any
-from rest_framework import serializers
+from rest_framework import serializers, status
 from rest_framework.exceptions import PermissionDenied
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.core.exceptions import ValidationError
 from django.db import transaction, OperationalError
-from django.db.models import F
 from .utils import (
     consumir_ingrediente_fifo,
     vender_producto_final_fifo,
     crear_factura_para_venta,
     actualizar_balance_por_venta,
 )
+from .contention import bloquear_productos
 from .models import (
     Producto,
     UnidadMedida,
@@ -34,6 +34,7 @@ from .models import (
     LoteMateriaPrima,
     AuditLog,
     Proveedor,
+    StockInsuficiente,
 )
 
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -446,6 +447,24 @@ class ProductoSerializer(serializers.ModelSerializer):
         return margen < 0.15
 
 
+class InventarioOcupado(serializers.ValidationError):
+    """Otro proceso tiene bloqueado el inventario; la venta puede reintentarse.
+
+    Si persiste tras los reintentos del servidor se responde 503 con
+    ``Retry-After`` para que el cliente espere antes de volver a enviar.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    wait = 1
+
+    def __init__(self):
+        super().__init__(
+            {
+                "detalles": "Otra operación está usando el inventario en este momento. Intenta nuevamente en unos segundos."
+            }
+        )
+
+
 class DetallesVentaSerializer(serializers.Serializer):
     """Detalle simple para crear ventas en paralelo sin validar existencia."""
 
@@ -480,15 +499,15 @@ class VentaCreateSerializer(serializers.ModelSerializer):
             with transaction.atomic():
                 total = 0
                 locked_items = []
+                try:
+                    productos = bloquear_productos(det["producto"] for det in detalles_data)
+                except OperationalError:
+                    raise InventarioOcupado()
                 for det in detalles_data:
-                    prod_id = det["producto"]
-                    try:
-                        producto = Producto.objects.select_for_update(nowait=True).get(id=prod_id)
-                    except OperationalError:
+                    producto = productos.get(det["producto"])
+                    if producto is None:
                         raise serializers.ValidationError(
-                            {
-                                "detalles": "Otra operación está usando el inventario en este momento. Intenta nuevamente en unos segundos."
-                            }
+                            {"detalles": f"El producto {det['producto']} no existe."}
                         )
                     if producto.tipo.startswith("ingred"):
                         raise serializers.ValidationError(
@@ -530,11 +549,7 @@ class VentaCreateSerializer(serializers.ModelSerializer):
                 try:
                     venta = Venta.objects.create(usuario=usuario, total=0, **validated_data)
                 except OperationalError:
-                    raise serializers.ValidationError(
-                        {
-                            "detalles": "Otra operación está usando el inventario en este momento. Intenta nuevamente en unos segundos."
-                        }
-                    )
+                    raise InventarioOcupado()
                 for item in locked_items:
                     producto = item["producto"]
                     cantidad = item["cantidad"]
@@ -575,16 +590,13 @@ class VentaCreateSerializer(serializers.ModelSerializer):
                         )
                     total += cantidad * precio
                     try:
-                        updated = Producto.objects.filter(
-                            id=producto.id,
-                            stock_actual__gte=cantidad,
-                        ).update(stock_actual=F("stock_actual") - cantidad)
-                    except OperationalError:
-                        raise serializers.ValidationError(
-                            {
-                                "detalles": "Otra operación está usando el inventario en este momento. Intenta nuevamente en unos segundos."
-                            }
+                        updated = Producto.objects.ajustar_stock(
+                            {producto.id: -cantidad}, exigir_disponible=True
                         )
+                    except StockInsuficiente:
+                        updated = 0
+                    except OperationalError:
+                        raise InventarioOcupado()
                     if not updated:
                         raise serializers.ValidationError(
                             {
@@ -607,21 +619,22 @@ class VentaCreateSerializer(serializers.ModelSerializer):
                             venta=venta,
                         )
                     except OperationalError:
-                        raise serializers.ValidationError(
-                            {
-                                "detalles": "Otra operación está usando el inventario en este momento. Intenta nuevamente en unos segundos."
-                            }
-                        )
+                        raise InventarioOcupado()
                     
                 venta.total = total
                 venta.save()
-                # Generar factura y actualizar balance del mes
-                crear_factura_para_venta(venta)
                 actualizar_balance_por_venta(venta)
+                # El PDF de la factura se genera al confirmar, para no retener
+                # los bloqueos mientras se renderiza; si falla, la descarga
+                # de ``/factura/`` lo vuelve a generar.
+                transaction.on_commit(lambda: crear_factura_para_venta(venta), robust=True)
 
             return venta
         except serializers.ValidationError:
             raise
+        except OperationalError:
+            # Bloqueo de la base (p. ej. SQLite ocupado): la venta se puede reintentar.
+            raise InventarioOcupado()
         except Exception:
             logging.exception(
                 "Unexpected error while creating sale",
@@ -904,6 +917,7 @@ class AuditLogSerializer(serializers.ModelSerializer):
             "tipo_contenido",
             "objeto_id",
             "objeto_repr",
+            "cambios",
         ]
 
     def get_objeto_repr(self, obj):
@@ -950,6 +964,6 @@ class AjusteInventarioSerializer(serializers.Serializer):
             operacion_tipo=MovimientoInventario.OPERACION_AJUSTE,
             ajuste=ajuste,
         )
+        Producto.objects.fijar_stock({producto.id: cantidad_nueva})
         producto.stock_actual = cantidad_nueva
-        producto.save(update_fields=["stock_actual"])
         return ajuste
\ No newline at end of file
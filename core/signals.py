@@ -1,20 +1,51 @@
+from functools import partial
+
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
-from .models import AuditLog, Producto, Compra, Venta, Transaccion, GastoRecurrente
-from .utils import actualizar_balance_para_periodo, calcular_balance_mensual
+from .models import (
+    AuditLog,
+    Balance,
+    Producto,
+    Compra,
+    DetalleCompra,
+    DetallesVenta,
+    DevolucionProducto,
+    Venta,
+    Transaccion,
+    GastoRecurrente,
+)
+from .catalog import invalidar_catalogo
+from .customers import actualizar_resumen_cliente
+from .evolution import invalidar_evolucion
+from .projection import invalidar_proyeccion
+from .returns import invalidar_tasas
+from .utils import actualizar_balance_para_periodo, calcular_balance_mensual, invalidar_perdidas
+
+
+def _cambios(instance, action):
+    """Diferencias de campos para actualizaciones de modelos con seguimiento."""
+    if not action.startswith("actualizad") or not hasattr(instance, "cambios"):
+        return None
+    return instance.cambios() or None
 
 
 @receiver(post_save, sender=Producto)
 @receiver(post_delete, sender=Producto)
 def log_producto_change(sender, instance, **kwargs):
     action = "creado" if kwargs.get("created") else ("eliminado" if kwargs.get("signal") == post_delete else "actualizado")
+    cambios = _cambios(instance, action)
     AuditLog.objects.create(
         usuario=getattr(instance, "usuario", None),
         accion=action,
         tipo_contenido=ContentType.objects.get_for_model(instance),
         objeto_id=instance.pk,
+        cambios=cambios,
     )
+    invalidar_catalogo()
+    if cambios and "costo" in cambios:
+        invalidar_perdidas()
 
 
 @receiver(post_save, sender=Compra)
@@ -26,11 +57,38 @@ def log_compra_change(sender, instance, **kwargs):
         accion=action,
         tipo_contenido=ContentType.objects.get_for_model(instance),
         objeto_id=instance.pk,
+        cambios=_cambios(instance, action),
     )
+    invalidar_proyeccion()
     if instance.fecha:
         calcular_y_actualizar_balance(instance.fecha.month, instance.fecha.year)
 
 
+@receiver(post_save, sender=DetalleCompra)
+@receiver(post_delete, sender=DetalleCompra)
+def invalidar_proyeccion_detalle_compra(sender, instance, **kwargs):
+    invalidar_proyeccion()
+
+
+@receiver(post_save, sender=DevolucionProducto)
+@receiver(post_delete, sender=DevolucionProducto)
+def invalidar_perdidas_devolucion(sender, instance, **kwargs):
+    invalidar_perdidas()
+    invalidar_tasas()
+
+
+@receiver(post_save, sender=DetallesVenta)
+@receiver(post_delete, sender=DetallesVenta)
+def invalidar_tasas_detalle_venta(sender, instance, **kwargs):
+    invalidar_tasas()
+
+
+@receiver(post_save, sender=Balance)
+def invalidar_evolucion_balance(sender, instance, **kwargs):
+    if instance.cerrado:
+        invalidar_evolucion()
+
+
 @receiver(post_save, sender=Venta)
 @receiver(post_delete, sender=Venta)
 def log_venta_change(sender, instance, **kwargs):
@@ -43,6 +101,8 @@ def log_venta_change(sender, instance, **kwargs):
     )
     if instance.fecha:
         calcular_y_actualizar_balance(instance.fecha.month, instance.fecha.year)
+    if instance.cliente_id:
+        transaction.on_commit(partial(actualizar_resumen_cliente, instance.cliente_id))
 
 
 @receiver(post_save, sender=Transaccion)
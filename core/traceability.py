@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List
+
+from django.db.models import Q
+
+from .models import DetallesVenta, LoteMateriaPrima, LoteProductoFinal, UsoLoteMateriaPrima
+
+
+def _ventas_por_lote(lotes_finales: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Líneas de venta de cada lote final, con su cliente, en una consulta."""
+    ventas: Dict[int, List[Dict[str, Any]]] = {}
+    for d in DetallesVenta.objects.filter(lote_final_id__in=list(lotes_finales)).values(
+        "lote_final_id",
+        "venta_id",
+        "venta__fecha",
+        "venta__cliente_id",
+        "venta__cliente__nombre",
+        "venta__cliente__contacto",
+        "venta__cliente__email",
+        "cantidad",
+    ):
+        ventas.setdefault(d["lote_final_id"], []).append(d)
+    return ventas
+
+
+def trazar_adelante(codigos: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Sigue lotes de materia prima hasta los lotes finales y los clientes.
+
+    El grafo tiene dos saltos fijos (``UsoLoteMateriaPrima`` y
+    ``DetallesVenta.lote_final``), así que se resuelve con tres consultas
+    para cualquier cantidad de lotes. Devuelve un dict por código de lote.
+    """
+    lotes = {
+        lote["id"]: lote
+        for lote in LoteMateriaPrima.objects.filter(codigo__in=list(codigos)).values(
+            "id", "codigo", "producto__nombre", "producto__proveedor__nombre", "fecha_recepcion"
+        )
+    }
+    usos = list(
+        UsoLoteMateriaPrima.objects.filter(lote_materia_prima_id__in=list(lotes)).values(
+            "lote_materia_prima_id",
+            "fecha",
+            "cantidad",
+            "lote_producto_final_id",
+            "lote_producto_final__codigo",
+            "lote_producto_final__producto__nombre",
+            "lote_producto_final__fecha_produccion",
+            "lote_producto_final__cantidad_producida",
+            "lote_producto_final__cantidad_devuelta",
+            "lote_producto_final__cantidad_descartada",
+        )
+    )
+    ventas = _ventas_por_lote({u["lote_producto_final_id"] for u in usos})
+
+    resultado: Dict[str, Dict[str, Any]] = {
+        lote["codigo"]: {
+            "lote": lote["codigo"],
+            "producto": lote["producto__nombre"],
+            "proveedor": lote["producto__proveedor__nombre"],
+            "fecha_recepcion": lote["fecha_recepcion"],
+            "usos": [],
+            "clientes": {},
+        }
+        for lote in lotes.values()
+    }
+    for uso in usos:
+        traza = resultado[lotes[uso["lote_materia_prima_id"]]["codigo"]]
+        lineas = ventas.get(uso["lote_producto_final_id"], [])
+        vendidos = sum((d["cantidad"] for d in lineas), Decimal("0"))
+        devueltos = uso["lote_producto_final__cantidad_descartada"] or 0
+        recuperados = uso["lote_producto_final__cantidad_devuelta"] or 0
+        traza["usos"].append(
+            {
+                "lote_final": uso["lote_producto_final__codigo"],
+                "producto_final": uso["lote_producto_final__producto__nombre"],
+                "fecha_produccion": uso["lote_producto_final__fecha_produccion"],
+                "fecha_uso": uso["fecha"],
+                "cantidad_utilizada": uso["cantidad"],
+                "vendidos": vendidos,
+                "devueltos": devueltos,
+                "recuperados": recuperados,
+                "en_stock": uso["lote_producto_final__cantidad_producida"]
+                - vendidos
+                - devueltos
+                + recuperados,
+            }
+        )
+        for d in lineas:
+            if d["venta__cliente_id"] is None:
+                continue
+            cliente = traza["clientes"].setdefault(
+                d["venta__cliente_id"],
+                {
+                    "cliente": d["venta__cliente_id"],
+                    "nombre": d["venta__cliente__nombre"],
+                    "contacto": d["venta__cliente__contacto"],
+                    "email": d["venta__cliente__email"],
+                    "ventas": set(),
+                    "cantidad": Decimal("0"),
+                },
+            )
+            cliente["ventas"].add(d["venta_id"])
+            cliente["cantidad"] += d["cantidad"]
+
+    for traza in resultado.values():
+        traza["clientes"] = [
+            {**c, "ventas": sorted(c["ventas"])} for c in traza["clientes"].values()
+        ]
+    return resultado
+
+
+def trazar_atras(venta_id: int) -> List[Dict[str, Any]]:
+    """Lotes de materia prima (y su proveedor) que alimentaron una venta.
+
+    Las líneas sin ``lote_final`` se resuelven por el código guardado en
+    ``lote``. Son tres consultas sin importar el tamaño de la venta.
+    """
+    lineas = list(
+        DetallesVenta.objects.filter(venta_id=venta_id).values(
+            "id", "producto__nombre", "cantidad", "lote_final_id", "lote"
+        )
+    )
+    codigos = {d["lote"] for d in lineas if d["lote_final_id"] is None and d["lote"]}
+    ids = {d["lote_final_id"] for d in lineas if d["lote_final_id"] is not None}
+    finales = {
+        f["id"]: f
+        for f in LoteProductoFinal.objects.filter(Q(id__in=ids) | Q(codigo__in=codigos)).values(
+            "id", "codigo"
+        )
+    }
+    por_codigo = {f["codigo"]: f["id"] for f in finales.values()}
+
+    materias: Dict[int, List[Dict[str, Any]]] = {}
+    for uso in UsoLoteMateriaPrima.objects.filter(lote_producto_final_id__in=list(finales)).values(
+        "lote_producto_final_id",
+        "cantidad",
+        "lote_materia_prima__codigo",
+        "lote_materia_prima__producto__nombre",
+        "lote_materia_prima__producto__proveedor_id",
+        "lote_materia_prima__producto__proveedor__nombre",
+        "lote_materia_prima__fecha_recepcion",
+        "lote_materia_prima__fecha_vencimiento",
+    ):
+        materias.setdefault(uso["lote_producto_final_id"], []).append(
+            {
+                "lote": uso["lote_materia_prima__codigo"],
+                "producto": uso["lote_materia_prima__producto__nombre"],
+                "proveedor": uso["lote_materia_prima__producto__proveedor_id"],
+                "proveedor_nombre": uso["lote_materia_prima__producto__proveedor__nombre"],
+                "fecha_recepcion": uso["lote_materia_prima__fecha_recepcion"],
+                "fecha_vencimiento": uso["lote_materia_prima__fecha_vencimiento"],
+                "cantidad_utilizada": uso["cantidad"],
+            }
+        )
+
+    resultado = []
+    for d in lineas:
+        final_id = d["lote_final_id"] or por_codigo.get(d["lote"])
+        resultado.append(
+            {
+                "detalle": d["id"],
+                "producto": d["producto__nombre"],
+                "cantidad": d["cantidad"],
+                "lote_final": finales[final_id]["codigo"] if final_id in finales else None,
+                "materias_primas": materias.get(final_id, []),
+            }
+        )
+    return resultado
+
+
+__all__ = ["trazar_adelante", "trazar_atras"]
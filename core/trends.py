@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from .models import (
+    Balance,
+    DetallesVenta,
+    DevolucionProducto,
+    HechoMensual,
+    HistorialPrecio,
+    MovimientoInventario,
+    PeriodoArchivado,
+    PeriodoCubo,
+    Producto,
+    ResumenMovimientoMensual,
+    ResumenPrecioMensual,
+    SaldoInventario,
+)
+
+
+_DEC = DecimalField(max_digits=14, decimal_places=2)
+_CAMPOS = ("entradas", "salidas", "saldo", "ingresos", "perdida", "costo_total", "registros_costo")
+
+
+def _siguiente_mes(periodo: date) -> date:
+    return (periodo.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _flujo(qs):
+    return qs.values("producto_id").annotate(
+        e=Sum(Case(When(tipo="entrada", then=F("cantidad")), default=0, output_field=_DEC)),
+        s=Sum(Case(When(tipo="salida", then=F("cantidad")), default=0, output_field=_DEC)),
+    )
+
+
+def _sumar(hechos: Dict[Optional[int], Dict[str, Any]], filas, campos: Dict[str, str]) -> None:
+    for f in filas:
+        hecho = hechos.setdefault(f["producto_id"], {})
+        for destino, origen in campos.items():
+            hecho[destino] = hecho.get(destino, 0) + (f[origen] or 0)
+
+
+def construir_mes(periodo: date) -> int:
+    """Reconstruye las filas de ``HechoMensual`` del mes ``periodo``.
+
+    El flujo sale de los resúmenes archivados si el mes está archivado y, si
+    no, de ``SaldoInventario`` para los días cerrados y de los movimientos
+    para los demás.
+    Ventas, pérdidas por merma y costos de ingredientes se agrupan por
+    producto en SQL; son unas ocho consultas por mes sin importar el volumen.
+    Devuelve las filas guardadas.
+    """
+    periodo = periodo.replace(day=1)
+    fin = _siguiente_mes(periodo)
+    hechos: Dict[Optional[int], Dict[str, Any]] = {}
+    flujo = {"entradas": "e", "salidas": "s"}
+
+    movimientos = MovimientoInventario.objects.filter(fecha__date__gte=periodo, fecha__date__lt=fin)
+    saldos = SaldoInventario.objects.filter(fecha__gte=periodo, fecha__lt=fin)
+    if PeriodoArchivado.objects.filter(
+        tabla=PeriodoArchivado.TABLA_MOVIMIENTOS, periodo=periodo
+    ).exists():
+        _sumar(
+            hechos,
+            ResumenMovimientoMensual.objects.filter(periodo=periodo)
+            .values("producto_id")
+            .annotate(e=Sum("entradas"), s=Sum("salidas")),
+            flujo,
+        )
+        _sumar(hechos, _flujo(movimientos), flujo)
+    else:
+        # Los días cerrados salen de sus saldos; el resto (p. ej. hoy, que el
+        # cierre nocturno todavía no procesó) de los movimientos.
+        cerrados = set(saldos.values_list("fecha", flat=True).distinct())
+        _sumar(
+            hechos,
+            saldos.values("producto_id").annotate(e=Sum("entradas"), s=Sum("salidas")),
+            flujo,
+        )
+        _sumar(hechos, _flujo(movimientos.exclude(fecha__date__in=cerrados)), flujo)
+
+    ultimo = saldos.aggregate(m=Max("fecha"))["m"]
+    if ultimo is not None:
+        for pid, cantidad in saldos.filter(fecha=ultimo).values_list("producto_id", "cantidad"):
+            hechos.setdefault(pid, {})["saldo"] = cantidad
+
+    _sumar(
+        hechos,
+        DetallesVenta.objects.filter(venta__fecha__gte=periodo, venta__fecha__lt=fin)
+        .values("producto_id")
+        .annotate(t=Sum(F("cantidad") * F("precio_unitario"), output_field=_DEC)),
+        {"ingresos": "t"},
+    )
+    _sumar(
+        hechos,
+        DevolucionProducto.objects.filter(
+            clasificacion=DevolucionProducto.CLASIFICACION_MERMA,
+            fecha__gte=periodo,
+            fecha__lt=fin,
+        )
+        .values("producto_id")
+        .annotate(
+            t=Sum(
+                F("cantidad")
+                * Coalesce(F("producto__costo"), Value(Decimal("0")))
+                * Case(When(sustitucion=True, then=Value(2)), default=Value(1)),
+                output_field=_DEC,
+            )
+        ),
+        {"perdida": "t"},
+    )
+    precios = {"costo_total": "t", "registros_costo": "n"}
+    _sumar(
+        hechos,
+        HistorialPrecio.objects.filter(
+            fecha__date__gte=periodo, fecha__date__lt=fin, producto__tipo__startswith="ingred"
+        )
+        .values("producto_id")
+        .annotate(t=Sum("costo"), n=Count("id")),
+        precios,
+    )
+    _sumar(
+        hechos,
+        ResumenPrecioMensual.objects.filter(periodo=periodo, producto__tipo__startswith="ingred")
+        .values("producto_id")
+        .annotate(t=Sum("costo_total"), n=Sum("registros")),
+        precios,
+    )
+
+    categorias = dict(
+        Producto.objects.filter(id__in=[pid for pid in hechos if pid is not None]).values_list(
+            "id", "categoria_id"
+        )
+    )
+    cerrado = Balance.objects.filter(anio=periodo.year, mes=periodo.month, cerrado=True).exists()
+    with transaction.atomic():
+        # La fila de ``PeriodoCubo`` serializa dos reconstrucciones del mismo mes.
+        PeriodoCubo.objects.get_or_create(periodo=periodo, defaults={"actualizado": now()})
+        PeriodoCubo.objects.select_for_update().get(periodo=periodo)
+        HechoMensual.objects.filter(periodo=periodo).delete()
+        HechoMensual.objects.bulk_create(
+            [
+                HechoMensual(
+                    periodo=periodo,
+                    producto_id=pid,
+                    categoria_id=categorias.get(pid),
+                    **valores,
+                )
+                for pid, valores in hechos.items()
+            ]
+        )
+        PeriodoCubo.objects.filter(periodo=periodo).update(cerrado=cerrado, actualizado=now())
+    return len(hechos)
+
+
+def actualizar_cubo(anio: int, refrescar: bool = False) -> List[date]:
+    """Asegura que los meses transcurridos de ``anio`` estén en el cubo.
+
+    Los meses cuyo ``Balance`` está cerrado se construyen una última vez y
+    quedan congelados. El resto (en la práctica, el mes en curso) se
+    reconstruye cuando su versión supera ``TRENDS_CUBE_TTL`` segundos.
+    ``refrescar`` fuerza la reconstrucción de todos. Lo ejecuta el comando
+    ``construir_cubo``; las vistas sólo leen. Devuelve los meses
+    reconstruidos.
+    """
+    hoy = date.today()
+    estados = {p.periodo: p for p in PeriodoCubo.objects.filter(periodo__year=anio)}
+    cerrados = set(
+        Balance.objects.filter(anio=anio, cerrado=True).values_list("mes", flat=True)
+    )
+    vigente = now() - timedelta(seconds=settings.TRENDS_CUBE_TTL)
+    construidos: List[date] = []
+    for mes in range(1, 13):
+        periodo = date(anio, mes, 1)
+        if periodo > hoy:
+            break
+        estado = estados.get(periodo)
+        if estado is not None and not refrescar:
+            if estado.cerrado:
+                continue
+            if mes not in cerrados and estado.actualizado >= vigente:
+                continue
+        construir_mes(periodo)
+        construidos.append(periodo)
+    return construidos
+
+
+def hechos_del_anio(anio: int):
+    """Filas del cubo para ``anio`` con los nombres necesarios para reportar.
+
+    Sólo lee: los meses que ``construir_cubo`` todavía no procesó no aparecen.
+    """
+    return (
+        HechoMensual.objects.filter(periodo__gte=date(anio, 1, 1), periodo__lt=date(anio + 1, 1, 1))
+        .values(
+            "periodo",
+            "producto__nombre",
+            "producto__tipo",
+            "categoria__nombre_categoria",
+            *_CAMPOS,
+        )
+        .order_by("periodo", "producto__nombre")
+    )
+
+
+__all__ = ["construir_mes", "actualizar_cubo", "hechos_del_anio"]
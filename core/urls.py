@@ -17,6 +17,8 @@ from .api_views import (
     CompraViewSet,
     VentaFacturaView,
     VentaFacturaEmailView,
+    FacturaExportView,
+    ContentionMetricsView,
     TransaccionViewSet,
     GastoRecurrenteViewSet,
     DevolucionViewSet,
@@ -26,6 +28,7 @@ from .api_views import (
     BusinessEvolutionView,
     PriceHistoryView,
     ClienteHistoryView,
+    ClienteRFMView,
     MarginImpactView,
     ProfitabilityRankingView,
     FinancialSummaryView,
@@ -35,7 +38,11 @@ from .api_views import (
     ProductionPlanView,
     RegistroTurnoViewSet,
     TraceabilityView,
+    VentaTraceabilityView,
+    RecallSimulationView,
+    RecallStatusView,
     ReorderSuggestionView,
+    ProjectedInventoryView,
     AuditLogViewSet,
     LoginAPIView,
     ProveedorViewSet,
@@ -95,6 +102,8 @@ urlpatterns = [
     path('api/ventas/', VentaListCreateView.as_view(), name='ventas_api'),
     path('api/ventas/<int:venta_id>/factura/', VentaFacturaView.as_view(), name='venta_factura_api'),
     path('api/ventas/<int:venta_id>/factura/enviar/', VentaFacturaEmailView.as_view(), name='venta_factura_email_api'),
+    path('api/facturas/exportar/', FacturaExportView.as_view(), name='factura_export_api'),
+    path('api/contencion/', ContentionMetricsView.as_view(), name='contention_metrics_api'),
     path('api/dashboard/', DashboardStatsView.as_view(), name='dashboard_api'),
     path('api/flujo-caja/', FlujoCajaReportView.as_view(), name='flujo_caja_api'),
     path('api/business-evolution/', BusinessEvolutionView.as_view(), name='business_evolution_api'),
@@ -109,6 +118,7 @@ urlpatterns = [
     path('api/categorias/', CategoriaListView.as_view(), name='categorias_api'),
     path('api/unidades/', UnidadMedidaListView.as_view(), name='unidades_api'),
     path('api/clientes/', ClienteListView.as_view(), name='clientes_api'),
+    path('api/clientes/rfm/', ClienteRFMView.as_view(), name='clientes_rfm_api'),
     path('api/clientes/<int:pk>/', ClienteDetailView.as_view(), name='cliente_detail_api'),
     path('api/clientes/<int:pk>/historial/', ClienteHistoryView.as_view(), name='cliente_historial_api'),
     path('api/empleados/', EmployeeListCreateView.as_view(), name='employees_api'),
@@ -116,11 +126,15 @@ urlpatterns = [
     path('api/inventory-activity/', InventoryActivityView.as_view(), name='inventory_activity_api'),
     path('api/production-plan/', ProductionPlanView.as_view(), name='production_plan_api'),
     path('api/reorder/', ReorderSuggestionView.as_view(), name='reorder_api'),
+    path('api/proyeccion-inventario/', ProjectedInventoryView.as_view(), name='proyeccion_inventario_api'),
     path('api/ajuste-inventario/', AjusteInventarioView.as_view(), name='ajuste_inventario_api'),
     path('api/compras/<int:pk>/recibir/', CompraReceptionView.as_view(), name='compra_recepcion_api'),
     path('api/ventas/<int:pk>/', VentaDetailView.as_view(), name='venta_detail_api'),
     path('api/ventas/<int:pk>/devolucion/', VentaReturnView.as_view(), name='venta_devolucion_api'),
     path('api/me/', CurrentUserView.as_view(), name='current_user_api'),
+    path('api/trazabilidad/venta/<int:pk>/', VentaTraceabilityView.as_view(), name='venta_traceability_api'),
+    path('api/retiros/simular/', RecallSimulationView.as_view(), name='recall_simulation_api'),
+    path('api/retiros/<str:job_id>/', RecallStatusView.as_view(), name='recall_status_api'),
     path('api/trazabilidad/<str:codigo>/', TraceabilityView.as_view(), name='traceability_api'),
     path('password_reset/',
          auth_views.PasswordResetView.as_view(
@@ -8,9 +8,10 @@ from typing import Optional, Dict, Any, List
 from io import BytesIO
 
 from django.db import transaction
-from django.db.models import Sum, F
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
 from django.contrib.auth import get_user_model
-from django.core.mail import EmailMessage
+from django.core.cache import cache
 from django.conf import settings
 from django.core.files.base import ContentFile
 from reportlab.pdfgen import canvas
@@ -24,14 +25,20 @@ from .models import (
     GastoRecurrente,
     Producto,
     Compra,
-    DetalleCompra,
     MovimientoInventario,
     MonthlyReport,
     LoteMateriaPrima,
     LoteProductoFinal,
     Balance,
+    CorreoSaliente,
 )
+from .allocation import obtener_estrategia
+from .dispatch import destino_configurado, encolar_ordenes
+from .invoices import datos_facturas, renderizar_factura
+from .outbox import encolar_correo
 from .analytics import purchase_recommendations
+from .projection import invalidar_proyeccion
+from .reorder import crear_ordenes_compra, sugerencias_reorden
 
 
 @dataclass(frozen=True)
@@ -229,16 +236,19 @@ def generar_transacciones_recurrentes(
 
 
 def consumir_ingrediente_fifo(
-    producto: Producto, cantidad: Decimal
+    producto: Producto, cantidad: Decimal, estrategia: Optional[str] = None
 ) -> List[tuple[Optional["LoteMateriaPrima"], Decimal, Decimal]]:
-    """Consume materia prima aplicando rotación FIFO.
+    """Consume materia prima aplicando la rotación configurada (FIFO o FEFO).
 
-    Se busca el stock disponible en los ``LoteMateriaPrima`` según la fecha de
-    recepción y se descuenta hasta cubrir ``cantidad``.
+    Se busca el stock disponible en los ``LoteMateriaPrima`` en el orden de la
+    estrategia (recepción o vencimiento) y se descuenta hasta cubrir
+    ``cantidad``.
 
     Args:
         producto: Ingrediente a consumir.
         cantidad: Cantidad que se desea descontar.
+        estrategia: Nombre de la estrategia; por defecto
+            ``LOT_ALLOCATION_STRATEGY``.
 
     Returns:
         Lista de tuplas ``(lote, usado, costo)`` con el origen del consumo y el
@@ -256,7 +266,7 @@ def consumir_ingrediente_fifo(
             LoteMateriaPrima.objects.filter(
                 producto=producto_lock, fecha_agotado__isnull=True
             )
-            .order_by("fecha_recepcion")
+            .order_by(*obtener_estrategia(estrategia).orden_materia_prima)
             .select_for_update()
         )
         if not lotes.exists():
@@ -264,8 +274,8 @@ def consumir_ingrediente_fifo(
             disponible = producto_lock.stock_actual
             if disponible < cantidad:
                 raise ValueError("No hay suficiente materia prima disponible")
+            Producto.objects.ajustar_stock({producto_lock.pk: -cantidad})
             producto_lock.stock_actual = disponible - cantidad
-            producto_lock.save(update_fields=["stock_actual"])
             costo = (producto_lock.costo or Decimal("0")) * cantidad
             consumos.append((None, cantidad, costo))
             return consumos
@@ -293,14 +303,14 @@ def consumir_ingrediente_fifo(
             )["disponible"]
             or Decimal("0")
         )
+        Producto.objects.fijar_stock({producto_lock.pk: nuevo_stock})
         producto_lock.stock_actual = nuevo_stock
-        producto_lock.save(update_fields=["stock_actual"])
     return consumos
 
 def vender_producto_final_fifo(
-    producto: Producto, cantidad: Decimal
+    producto: Producto, cantidad: Decimal, estrategia: Optional[str] = None
 ) -> List[tuple["LoteProductoFinal", Decimal, Decimal]]:
-    """Consume stock de productos finales aplicando FIFO por lote.
+    """Consume stock de productos finales por lote (FIFO o FEFO).
 
     Devuelve una lista con los lotes utilizados y la cantidad tomada de cada uno.
     """
@@ -310,7 +320,7 @@ def vender_producto_final_fifo(
     restante = cantidad
     lotes = (
         LoteProductoFinal.objects.filter(producto=producto)
-        .order_by("fecha_produccion", "id")
+        .order_by(*obtener_estrategia(estrategia).orden_producto_final)
         .select_for_update()
     )
 
@@ -343,35 +353,102 @@ def vender_producto_final_fifo(
     return consumos
 
 
-def calcular_perdidas_devolucion(
+_PERDIDAS_VERSION_KEY = "perdidas_devolucion:version"
+_PERDIDAS_TIMEOUT = 60 * 60 * 24
+
+
+def _perdidas_agrupadas(
     start: Optional[date] = None,
     end: Optional[date] = None,
-) -> Dict[str, Any]:
-    """Calcular pérdidas económicas por devoluciones."""
-    qs = DevolucionProducto.objects.select_related("producto").filter(
+) -> List[Dict[str, Any]]:
+    """Pérdida por merma agrupada por mes, motivo y tipo en una sola consulta.
+
+    La pérdida es ``cantidad * costo`` del producto, el doble si hubo
+    sustitución.
+    """
+    qs = DevolucionProducto.objects.filter(
         clasificacion=DevolucionProducto.CLASIFICACION_MERMA
     )
     if start:
         qs = qs.filter(fecha__gte=start)
     if end:
         qs = qs.filter(fecha__lte=end)
+    perdida = Sum(
+        F("cantidad")
+        * Coalesce(F("producto__costo"), Value(Decimal("0")))
+        * Case(When(sustitucion=True, then=Value(2)), default=Value(1)),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    filas = (
+        qs.annotate(mes=TruncMonth("fecha"))
+        .values("mes", "motivo", "producto__tipo")
+        .annotate(loss=perdida)
+        .order_by()
+    )
+    return [
+        {
+            "mes": f["mes"],
+            "motivo": f["motivo"],
+            "tipo": f["producto__tipo"],
+            "loss": f["loss"] or Decimal("0"),
+        }
+        for f in filas
+    ]
+
+
+def _perdidas_mes(periodo: date) -> List[Dict[str, Any]]:
+    """Filas de ``_perdidas_agrupadas`` de un mes completo, en caché."""
+    version = cache.get_or_set(_PERDIDAS_VERSION_KEY, 1, None)
+    key = f"perdidas_devolucion:{version}:{periodo:%Y-%m}"
+    filas = cache.get(key)
+    if filas is None:
+        fin = periodo.replace(day=monthrange(periodo.year, periodo.month)[1])
+        filas = _perdidas_agrupadas(periodo, fin)
+        cache.set(key, filas, _PERDIDAS_TIMEOUT)
+    return filas
+
+
+def invalidar_perdidas() -> None:
+    """Descarta las pérdidas mensuales en caché (al guardar devoluciones)."""
+    try:
+        cache.incr(_PERDIDAS_VERSION_KEY)
+    except ValueError:
+        cache.set(_PERDIDAS_VERSION_KEY, 1, None)
+
+
+def calcular_perdidas_devolucion(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Dict[str, Any]:
+    """Calcular pérdidas económicas por devoluciones.
+
+    Con un rango cerrado, los meses completos se leen de la caché mensual y
+    solo los meses parciales de los extremos se consultan directamente.
+    """
+    if start is None or end is None:
+        filas = _perdidas_agrupadas(start, end)
+    else:
+        filas = []
+        periodo = start.replace(day=1)
+        while periodo <= end:
+            fin = periodo.replace(day=monthrange(periodo.year, periodo.month)[1])
+            if periodo >= start and fin <= end:
+                filas += _perdidas_mes(periodo)
+            else:
+                filas += _perdidas_agrupadas(max(start, periodo), min(end, fin))
+            periodo = fin + timedelta(days=1)
 
     by_month: Dict[date, Decimal] = {}
     by_cause: Dict[str, Decimal] = {}
     by_type: Dict[str, Decimal] = {}
 
     total_loss = Decimal("0")
-    for d in qs:
-        unit_cost = d.producto.costo or Decimal("0")
-        loss = d.cantidad * unit_cost
-        if d.sustitucion:
-            loss += d.cantidad * unit_cost
+    for f in filas:
+        loss = f["loss"]
         total_loss += loss
-        month_key = d.fecha.replace(day=1)
-        by_month[month_key] = by_month.get(month_key, Decimal("0")) + loss
-        by_cause[d.motivo] = by_cause.get(d.motivo, Decimal("0")) + loss
-        tipo = d.producto.tipo
-        by_type[tipo] = by_type.get(tipo, Decimal("0")) + loss
+        by_month[f["mes"]] = by_month.get(f["mes"], Decimal("0")) + loss
+        by_cause[f["motivo"]] = by_cause.get(f["motivo"], Decimal("0")) + loss
+        by_type[f["tipo"]] = by_type.get(f["tipo"], Decimal("0")) + loss
 
     sales_qs = Venta.objects.all()
     if start:
@@ -482,69 +559,9 @@ def generate_monthly_report_pdf(data: Dict[str, Any], notes: str = "") -> bytes:
     return pdf
 
 
-def _draw_invoice_header(p: canvas.Canvas, venta: Venta, y: int) -> int:
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(200, y, "Factura de venta")
-    y -= 25
-    p.setFont("Helvetica", 12)
-    p.drawString(50, y, f"Factura: F-{venta.id:06d}")
-    y -= 18
-    p.drawString(50, y, f"Fecha: {venta.fecha}")
-    y -= 18
-    cliente = venta.cliente.nombre if venta.cliente else "Consumidor final"
-    p.drawString(50, y, f"Cliente: {cliente}")
-    y -= 18
-    if venta.cliente and venta.cliente.email:
-        p.drawString(50, y, f"Email: {venta.cliente.email}")
-        y -= 18
-    p.drawString(50, y, f"Vendedor: {venta.usuario}")
-    y -= 30
-    return y
-
-
 def generar_factura_pdf(venta: Venta) -> bytes:
     """Construye un PDF simple de factura con detalle de productos."""
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y = height - 50
-
-    y = _draw_invoice_header(p, venta, y)
-
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y, "Detalle")
-    y -= 20
-    p.setFont("Helvetica", 11)
-    p.drawString(50, y, "Producto")
-    p.drawString(260, y, "Cantidad")
-    p.drawString(340, y, "Precio")
-    p.drawString(430, y, "Subtotal")
-    y -= 15
-    p.line(50, y, width - 50, y)
-    y -= 15
-
-    for det in venta.detallesventa_set.all():
-        p.drawString(50, y, det.producto.nombre[:30])
-        p.drawRightString(310, y, f"{det.cantidad}")
-        p.drawRightString(400, y, f"${det.precio_unitario}")
-        p.drawRightString(500, y, f"${det.cantidad * det.precio_unitario}")
-        y -= 15
-        if y < 80:
-            p.showPage()
-            y = _draw_invoice_header(p, venta, height - 80)
-            p.setFont("Helvetica", 11)
-
-    y -= 10
-    p.line(350, y, width - 50, y)
-    y -= 20
-    p.setFont("Helvetica-Bold", 12)
-    p.drawRightString(500, y, f"Total: ${venta.total}")
-
-    p.showPage()
-    p.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
+    return renderizar_factura(datos_facturas([venta.id])[venta.id])
 
 
 def crear_factura_para_venta(venta: Venta) -> FacturaVenta:
@@ -558,22 +575,29 @@ def crear_factura_para_venta(venta: Venta) -> FacturaVenta:
     return factura
 
 
-def enviar_factura_por_correo(factura: FacturaVenta, correo: str) -> None:
-    """Envía la factura generada al correo indicado."""
-    subject = f"Factura {factura.numero}"
-    message = "Adjuntamos la factura de tu compra. Gracias por tu preferencia."
-    email = EmailMessage(subject=subject, body=message, to=[correo])
-    factura.pdf.open("rb")
-    try:
-        email.attach(factura.pdf.name.split('/')[-1], factura.pdf.read(), "application/pdf")
-        email.send()
-        factura.marcar_enviado(correo)
-    finally:
-        factura.pdf.close()
+def enviar_factura_por_correo(factura: FacturaVenta, correo: str) -> CorreoSaliente:
+    """Encola la factura para enviarla al correo indicado.
+
+    El envío lo hace el worker del outbox (``procesar_outbox``), que marca la
+    factura como enviada cuando el correo sale.
+    """
+    return encolar_correo(
+        f"Factura {factura.numero}",
+        "Adjuntamos la factura de tu compra. Gracias por tu preferencia.",
+        [correo],
+        adjuntos=[
+            {
+                "nombre": factura.pdf.name.split("/")[-1],
+                "tipo": "application/pdf",
+                "ruta": factura.pdf.name,
+            }
+        ],
+        factura=factura,
+    )
 
 
-def send_monthly_report(year: int, month: int) -> None:
-    """Compila, genera y envía el reporte mensual por correo."""
+def send_monthly_report(year: int, month: int) -> Optional[CorreoSaliente]:
+    """Compila y genera el reporte mensual y lo encola para los superusuarios."""
     metrics = compile_monthly_metrics(year, month)
     report, _ = MonthlyReport.objects.get_or_create(mes=month, anio=year)
     pdf = generate_monthly_report_pdf(metrics, report.notas or "")
@@ -584,10 +608,19 @@ def send_monthly_report(year: int, month: int) -> None:
         user_model.objects.filter(is_superuser=True).values_list("email", flat=True)
     )
     if not recipients:
-        return
-    email = EmailMessage(subject=subject, body=message, to=recipients)
-    email.attach(f"reporte_{month:02d}_{year}.pdf", pdf, "application/pdf")
-    email.send()
+        return None
+    return encolar_correo(
+        subject,
+        message,
+        recipients,
+        adjuntos=[
+            {
+                "nombre": f"reporte_{month:02d}_{year}.pdf",
+                "tipo": "application/pdf",
+                "contenido": pdf,
+            }
+        ],
+    )
 
 
 def lotes_por_vencer(dias: int = 7) -> List[LoteMateriaPrima]:
@@ -596,83 +629,36 @@ def lotes_por_vencer(dias: int = 7) -> List[LoteMateriaPrima]:
     return list(
         LoteMateriaPrima.objects.filter(
             fecha_vencimiento__lte=limite, fecha_agotado__isnull=True
-        )
+        ).select_related("producto")
     )
 
 
-def enviar_alertas_vencimiento(dias: int = 7) -> None:
-    """Envía alertas por correo de los lotes próximos a vencer."""
-    lotes = lotes_por_vencer(dias)
-    if not lotes:
-        return
-    lines = [
-        f"{lote.codigo} - {lote.producto.nombre} vence {lote.fecha_vencimiento}"
-        for lote in lotes
-    ]
-    mensaje = "\n".join(lines)
-    subject = "Lotes próximos a vencer"
-    user_model = get_user_model()
-    recipients = list(
-        user_model.objects.filter(is_superuser=True).values_list("email", flat=True)
-    )
-    if recipients:
-        email = EmailMessage(subject=subject, body=mensaje, to=recipients)
-        email.send()
-
-
-def detectar_faltantes(horizon_days: int = 7) -> List[Dict[str, Any]]:
-    """Devuelve sugerencias de compra para insumos con bajo stock."""
-    proyeccion = purchase_recommendations(horizon_days=horizon_days)
-    rec_map = {p["producto"]: p["cantidad"] for p in proyeccion}
-    sugerencias: List[Dict[str, Any]] = []
-    for prod in Producto.objects.filter(tipo__startswith="ingred"):
-        demanda = rec_map.get(prod.id, 0.0)
-        if (
-            float(prod.stock_actual) < float(prod.stock_minimo)
-            or float(prod.stock_actual) < demanda
-        ):
-            qty = max(float(prod.stock_minimo), demanda) - float(prod.stock_actual)
-            sugerencias.append(
-                {
-                    "producto": prod.id,
-                    "nombre": prod.nombre,
-                    "proveedor": prod.proveedor_id,
-                    "cantidad": round(qty, 2),
-                }
-            )
-    return sugerencias
+def detectar_faltantes(horizon_days: int = 7, refrescar: bool = False) -> List[Dict[str, Any]]:
+    """Devuelve sugerencias de compra para insumos con bajo stock.
+
+    Considera ``lead_time_dias``, ``stock_seguridad``, ``nivel_reorden``, las
+    compras pendientes en camino y redondea cada cantidad a ``unidad_empaque``.
+    """
+    return sugerencias_reorden(horizon_days, refrescar=refrescar)
 
 
 def auto_reordenar(confirmar: bool = False, horizon_days: int = 7) -> List[int]:
-    """Genera órdenes de compra si hay faltantes y ``confirmar`` es True."""
-    sugerencias = detectar_faltantes(horizon_days)
+    """Genera órdenes de compra si hay faltantes y ``confirmar`` es True.
+
+    Si hay un proveedor configurado, las órdenes creadas quedan encoladas
+    para el comando ``despachar_ordenes``; la petición no espera al proveedor.
+    """
+    sugerencias = detectar_faltantes(horizon_days, refrescar=confirmar)
     if not confirmar or not sugerencias:
         return []
 
     hoy = date.today()
-    compras_creadas = []
-    by_prov: Dict[int, List[Dict[str, Any]]] = {}
-    for s in sugerencias:
-        prov = s["proveedor"]
-        if prov is None:
-            continue
-        by_prov.setdefault(prov, []).append(s)
-
-    for prov_id, items in by_prov.items():
-        compra = Compra.objects.create(proveedor_id=prov_id, fecha=hoy, total=0)
-        total = Decimal("0")
-        for item in items:
-            prod = Producto.objects.get(id=item["producto"])
-            precio = prod.costo or Decimal("0")
-            cantidad = Decimal(str(item["cantidad"]))
-            DetalleCompra.objects.create(
-                compra=compra,
-                producto=prod,
-                cantidad=cantidad,
-                precio_unitario=precio,
-            )
-            total += cantidad * precio
-        compra.total = total
-        compra.save()
-        compras_creadas.append(compra.id)
-    return compras_creadas
\ No newline at end of file
+    with transaction.atomic():
+        compras_creadas = crear_ordenes_compra(sugerencias, hoy)
+        if compras_creadas:
+            actualizar_balance_para_periodo(hoy.month, hoy.year)
+            if destino_configurado():
+                encolar_ordenes(compras_creadas)
+    if compras_creadas:
+        invalidar_proyeccion()
+    return compras_creadas
@@ -319,21 +319,11 @@ class CompraCreateView(CreateView):
                     producto_cantidades[producto.id] += cantidad
                     total += cantidad * precio
 
-                productos = {
-                    p.id: p
-                    for p in Producto.objects.select_for_update().filter(
-                        id__in=producto_cantidades.keys()
-                    )
-                }
-
                 self.object.total = total
                 self.object.save()
                 formset.save()
 
-                for prod_id, cantidad_total in producto_cantidades.items():
-                    producto = productos[prod_id]
-                    producto.stock_actual += cantidad_total
-                    producto.save()
+                Producto.objects.ajustar_stock(producto_cantidades)
 
                 for _, producto, cantidad, _ in detalle_data:
                     MovimientoInventario.objects.create(
@@ -731,11 +721,7 @@ class MovimientoManualCreateView(CreateView):
                 form.add_error('cantidad', 'Stock insuficiente para este producto')
                 return self.form_invalid(form)
             response = super().form_valid(form)
-            if tipo == 'entrada':
-                prod.stock_actual += cant
-            else:
-                prod.stock_actual -= cant
-            prod.save(update_fields=["stock_actual"])
+            Producto.objects.ajustar_stock({prod.pk: cant if tipo == 'entrada' else -cant})
         messages.success(self.request, "Movimiento registrado correctamente.")
         return response
     
@@ -1,44 +1,18 @@
-import os
 from typing import Dict, Any
 import requests
-from django.core.mail import EmailMessage
-from core.models.inventario import Compra, DetalleCompra
+from core.dispatch import despachar_ordenes
+from core.models import EnvioOrdenCompra
+from core.models.inventario import Compra
 
 
 def enviar_orden_compra(compra: Compra) -> Dict[str, Any]:
-    """Envía la orden de compra por API o correo electrónico."""
-    items = [
-        {
-            "producto": d.producto.nombre,
-            "cantidad": float(d.cantidad),
-            "precio_unitario": float(d.precio_unitario),
-        }
-        for d in DetalleCompra.objects.filter(compra=compra).select_related("producto")
-    ]
-    data = {
-        "id": compra.id,
-        "fecha": compra.fecha.isoformat(),
-        "proveedor": compra.proveedor.nombre,
-        "items": items,
-        "total": float(compra.total),
-    }
+    """Envía la orden de compra por API o correo electrónico.
 
-    api_url = os.getenv("SUPPLIER_API_URL")
-    if api_url:
-        headers = {}
-        token = os.getenv("SUPPLIER_API_TOKEN")
-        if token:
-            headers["Authorization"] = f"Bearer {token}"
-        resp = requests.post(api_url, json=data, headers=headers, timeout=10)
-        resp.raise_for_status()
-        return resp.json()
-
-    email = os.getenv("SUPPLIER_EMAIL")
-    if not email:
-        raise ValueError("No supplier endpoint configured")
-
-    lines = [f"{i['producto']}: {i['cantidad']} x {i['precio_unitario']}" for i in items]
-    body = "\n".join(lines) + f"\nTotal: {data['total']}"
-    msg = EmailMessage(subject=f"Orden de compra {compra.id}", body=body, to=[email])
-    msg.send()
-    return {"status": "sent"}
\ No newline at end of file
+    Usa el servicio de despacho, por lo que reenviar una orden ya enviada
+    devuelve la respuesta guardada sin volver a llamar al proveedor.
+    """
+    respuesta = despachar_ordenes([compra.id])[compra.id]
+    envio = EnvioOrdenCompra.objects.get(compra=compra)
+    if envio.estado == EnvioOrdenCompra.ESTADO_FALLIDO:
+        raise requests.RequestException(envio.ultimo_error)
+    return respuesta
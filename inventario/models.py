@@ -8,6 +8,7 @@ from core.models.inventario import (
     DetalleCompra,
     ComposicionProducto,
     MovimientoInventario,
+    SaldoInventario,
     AjusteInventario,
     LoteMateriaPrima,
     LoteProductoFinal,
@@ -37,6 +38,7 @@ __all__ = [
     "ComposicionProducto",
     "FamiliaProducto",
     "MovimientoInventario",
+    "SaldoInventario",
     "AjusteInventario",
     "DevolucionProducto",
     "LoteMateriaPrima",
@@ -1,8 +1,8 @@
+from core.alerts import enviar_alertas_vencimiento
 from core.utils import (
     consumir_ingrediente_fifo,
     calcular_perdidas_devolucion,
     lotes_por_vencer,
-    enviar_alertas_vencimiento,
     detectar_faltantes,
     auto_reordenar,
     vender_producto_final_fifo,
@@ -1,3 +1,4 @@
+import { useRef } from "react";
 import { useMutation } from "@tanstack/react-query";
 import { ensureCSRFToken, getCSRFToken } from "@/utils/csrf";
 import { apiFetch } from "../utils/api";
@@ -21,18 +22,27 @@ export interface SaleCreated {
 }
 
 export function useCreateSale() {
+  // Reenviar la misma venta (p. ej. tras un timeout) reutiliza la clave para
+  // que el servidor no la registre dos veces.
+  const pending = useRef<{ body: string; key: string } | null>(null);
+
   return useMutation<SaleCreated, Error, CreateSale>({
     mutationFn: async (sale: CreateSale) => {
       await ensureCSRFToken();
 
+      const body = JSON.stringify(sale);
+      if (pending.current?.body !== body) {
+        pending.current = { body, key: crypto.randomUUID() };
+      }
       const res = await apiFetch("/api/ventas/", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
           "X-CSRFToken": getCSRFToken(),
+          "Idempotency-Key": pending.current.key,
         },
         credentials: "include",
-        body: JSON.stringify(sale),
+        body,
       });
       if (res.status === 403) {
         throw new Error(
@@ -42,6 +52,7 @@ export function useCreateSale() {
       if (!res.ok) {
         throw new Error("Error al registrar la venta. Inténtalo de nuevo más tarde.");
       }
+      pending.current = null;
       const data = await res.json();
       return {
         id: data.id,
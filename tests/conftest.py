@@ -49,4 +49,14 @@ def default_units(db):
         ("Botella", "botella"),
     ]
     for nombre, ab in units:
-        UnidadMedida.objects.get_or_create(abreviatura=ab, defaults={"nombre": nombre})
\ No newline at end of file
+        UnidadMedida.objects.get_or_create(abreviatura=ab, defaults={"nombre": nombre})
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Avoid leaking cached projections between tests."""
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
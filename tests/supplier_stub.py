@@ -0,0 +1,79 @@
+"""Servidor HTTP local que simula la API de un proveedor en los tests."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubProveedor:
+    """API de proveedor en ``127.0.0.1`` con un puerto libre.
+
+    Registra cada POST, responde lo mismo a una ``Idempotency-Key`` repetida,
+    puede demorar cada respuesta y fallar con 503 las primeras ``fallos``
+    peticiones. ``concurrencia_max`` es el máximo de peticiones simultáneas.
+    """
+
+    def __init__(self, demora: float = 0, fallos: int = 0):
+        self.demora = demora
+        self.fallos = fallos
+        self.peticiones = []
+        self.ordenes = {}
+        self.concurrencia_max = 0
+        self._activas = 0
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_port}/ordenes"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                clave = self.headers.get("Idempotency-Key")
+                with stub._lock:
+                    stub._activas += 1
+                    stub.concurrencia_max = max(stub.concurrencia_max, stub._activas)
+                    stub.peticiones.append((clave, cuerpo))
+                    fallar = stub.fallos > 0
+                    if fallar:
+                        stub.fallos -= 1
+                time.sleep(stub.demora)
+                with stub._lock:
+                    stub._activas -= 1
+                    if not fallar:
+                        respuesta = stub.ordenes.setdefault(
+                            clave, {"pedido": f"PED-{len(stub.ordenes) + 1}", "compra": cuerpo["id"]}
+                        )
+                if fallar:
+                    self._responder(503, {"error": "no disponible"})
+                else:
+                    self._responder(201, respuesta)
+
+            def _responder(self, estado, datos):
+                cuerpo = json.dumps(datos).encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
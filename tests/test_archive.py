@@ -0,0 +1,129 @@
+import gzip
+import tempfile
+from datetime import date, datetime
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User, Group
+from django.utils import timezone as tz
+from rest_framework.test import APIClient
+from inventario.models import (
+    Categoria,
+    Producto,
+    MovimientoInventario,
+    HistorialPrecio,
+    UnidadMedida,
+    FamiliaProducto,
+)
+from core.models import PeriodoArchivado, ResumenMovimientoMensual
+from core import archive
+from core.archive import _ruta, archivar, filas_periodo
+from core.trends import actualizar_cubo
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(ARCHIVE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Insumos", defaults={"familia": fam_ing}
+        )
+        self.prod = Producto.objects.create(
+            codigo="I1",
+            nombre="Harina",
+            tipo="ingrediente",
+            precio=0,
+            costo=1,
+            stock_actual=10,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="kg"),
+            categoria=cat,
+        )
+        for tipo, cantidad, dia in [("entrada", 5, 3), ("salida", 2, 20)]:
+            mov = MovimientoInventario.objects.create(
+                producto=self.prod, tipo=tipo, cantidad=cantidad, motivo="test"
+            )
+            mov.fecha = tz.make_aware(datetime(2024, 1, dia))
+            mov.save(update_fields=["fecha"])
+        precio = HistorialPrecio.objects.create(producto=self.prod, precio=0, costo=2)
+        precio.fecha = tz.make_aware(datetime(2024, 1, 10))
+        precio.save(update_fields=["fecha"])
+        MovimientoInventario.objects.create(
+            producto=self.prod, tipo="entrada", cantidad=1, motivo="reciente"
+        )
+
+    def test_archives_old_months_and_reads_through(self):
+        resultado = archivar(horizon_days=30, hoy=date(2024, 3, 15))
+        self.assertEqual(resultado["movimientos"], 2)
+        self.assertEqual(resultado["precios"], 1)
+        self.assertEqual(MovimientoInventario.objects.filter(fecha__year=2024).count(), 0)
+        self.assertTrue(
+            PeriodoArchivado.objects.filter(tabla="movimientos", periodo=date(2024, 1, 1)).exists()
+        )
+        resumen = ResumenMovimientoMensual.objects.get(producto=self.prod)
+        self.assertEqual(float(resumen.entradas), 5.0)
+        self.assertEqual(float(resumen.salidas), 2.0)
+
+        filas = list(filas_periodo("movimientos", date(2024, 1, 1), date(2024, 2, 1)))
+        self.assertEqual(sorted(f["tipo"] for f in filas), ["entrada", "salida"])
+
+        admin_group, _ = Group.objects.get_or_create(name="admin")
+        user = User.objects.create_user(username="admin", password="pass")
+        user.groups.add(admin_group)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        actualizar_cubo(2024)
+        data = client.get("/api/monthly-trends/?year=2024").json()
+        self.assertEqual(data["stock"][0]["neto"], 3.0)
+        self.assertEqual(data["prices"][0]["precio_promedio"], 2.0)
+
+        # El mes archivado primero y luego el registro en línea del alta.
+        historial = client.get(f"/api/price-history/?producto={self.prod.id}").json()
+        self.assertEqual([h["costo"] for h in historial], [2.0, 1.0])
+        self.assertTrue(historial[0]["fecha"].startswith("2024-01-10"))
+
+    def test_failed_delete_does_not_duplicate_archive(self):
+        with mock.patch(
+            "core.archive.PeriodoArchivado.objects.get_or_create", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            archivar(horizon_days=30, hoy=date(2024, 3, 15))
+        self.assertEqual(MovimientoInventario.objects.filter(fecha__year=2024).count(), 2)
+
+        archivar(horizon_days=30, hoy=date(2024, 3, 15))
+        with gzip.open(_ruta("movimientos", date(2024, 1, 1)), "rt") as fh:
+            self.assertEqual(len(fh.readlines()), 2)
+        registro = PeriodoArchivado.objects.get(tabla="movimientos", periodo=date(2024, 1, 1))
+        self.assertEqual(registro.filas, 2)
+
+    def test_latest_price_stays_online_and_history_reads_own_months(self):
+        otro = Producto.objects.create(
+            codigo="I2",
+            nombre="Sal",
+            tipo="ingrediente",
+            precio=0,
+            costo=3,
+            stock_actual=1,
+            stock_minimo=0,
+            unidad_media=self.prod.unidad_media,
+            categoria=self.prod.categoria,
+        )
+        # El alta de Sal (costo 3) queda como último precio, de febrero.
+        HistorialPrecio.objects.filter(producto=otro).update(fecha=tz.make_aware(datetime(2024, 2, 5)))
+        previo = HistorialPrecio.objects.create(producto=otro, precio=0, costo=4)
+        previo.fecha = tz.make_aware(datetime(2024, 2, 1))
+        previo.save(update_fields=["fecha"])
+
+        archivar(horizon_days=30, hoy=date(2024, 4, 15))
+        self.assertEqual(
+            list(HistorialPrecio.objects.filter(producto=otro).values_list("costo", flat=True)), [3]
+        )
+
+        with mock.patch.object(archive, "leer_archivo", wraps=archive.leer_archivo) as leer:
+            costos = [f["costo"] for f in filas_periodo("precios", producto_id=self.prod.id)]
+        self.assertEqual([float(c) for c in costos], [2.0, 1.0])
+        self.assertEqual([c.args[1] for c in leer.call_args_list], [date(2024, 1, 1)])
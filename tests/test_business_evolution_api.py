@@ -5,6 +5,9 @@ from inventario.models import Categoria, Producto, Cliente, Venta, DetallesVenta
 from finanzas.models import Transaccion
 from datetime import date
 
+from core.customers import actualizar_resumen_cliente
+from core.models import ResumenCliente
+
 class BusinessEvolutionAPITest(TestCase):
     def setUp(self):
         admin_group, _ = Group.objects.get_or_create(name="admin")
@@ -41,4 +44,29 @@ class BusinessEvolutionAPITest(TestCase):
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
         # 2 meses reales + 3er con projection
-        self.assertTrue(any(item.get("projected") for item in data))
\ No newline at end of file
+        self.assertTrue(any(item.get("projected") for item in data))
+
+    def test_new_clients_from_summary(self):
+        self.assertFalse(ResumenCliente.objects.exists())
+        for cliente in Cliente.objects.all():
+            actualizar_resumen_cliente(cliente.id)
+        data = self.client.get("/api/business-evolution/?period=month").json()
+        reales = [item for item in data if not item.get("projected")]
+        self.assertEqual([item["new_clients"] for item in reales], [1, 1])
+
+    def test_projection_has_interval_and_is_cached(self):
+        data = self.client.get("/api/business-evolution/?period=month").json()
+        proyectados = [item for item in data if item.get("projected")]
+        self.assertEqual(proyectados[0]["period"], "2024-03-01")
+        self.assertLessEqual(proyectados[0]["lower"], proyectados[0]["net_income"])
+        self.assertGreaterEqual(proyectados[0]["upper"], proyectados[0]["net_income"])
+        with self.assertNumQueries(1):
+            self.client.get("/api/business-evolution/?period=month")
+
+    def test_category_filter_counts_distinct_sales(self):
+        venta = Venta.objects.filter(fecha=date(2024, 1, 1)).get()
+        DetallesVenta.objects.create(venta=venta, producto=venta.detallesventa_set.get().producto, cantidad=1, precio_unitario=2)
+        categoria = Categoria.objects.get(nombre_categoria="General")
+        data = self.client.get(f"/api/business-evolution/?period=month&category={categoria.id}").json()
+        self.assertEqual(data[0]["sales"], 1)
+        self.assertEqual(data[0]["new_clients"], 1)
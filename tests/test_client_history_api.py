@@ -10,6 +10,9 @@ from inventario.models import (
     UnidadMedida,
     FamiliaProducto,
 )
+from core.models import ResumenCliente
+
+
 class ClienteHistoryAPITest(TestCase):
     def setUp(self):
         ventas_group, _ = Group.objects.get_or_create(name="ventas")
@@ -50,4 +53,34 @@ class ClienteHistoryAPITest(TestCase):
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
         self.assertEqual(len(data["ventas"]), 1)
-        self.assertEqual(data["total_gastado"], 10.0)
\ No newline at end of file
+        self.assertEqual(data["total_gastado"], 10.0)
+
+    def test_summary_updates_on_commit_and_paginates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for dia in range(2, 5):
+                Venta.objects.create(
+                    fecha=f"2024-02-0{dia}", total=5, usuario=self.user, cliente=self.cliente
+                )
+        resumen = ResumenCliente.objects.get(cliente=self.cliente)
+        self.assertEqual(resumen.ventas, 4)
+        self.assertEqual(float(resumen.total_gastado), 25.0)
+        self.assertEqual(resumen.primera_compra.isoformat(), "2024-01-01")
+
+        data = self.client.get(f"/api/clientes/{self.cliente.id}/historial/?page_size=2").json()
+        self.assertEqual(len(data["ventas"]), 2)
+        self.assertEqual(data["count"], 4)
+        self.assertIsNotNone(data["next"])
+        self.assertEqual(data["ultima_compra"], "2024-02-04")
+        self.assertEqual(data["productos_frecuentes"][0]["producto"], "Prod")
+
+    def test_rfm_segments_all_clients(self):
+        admin_group, _ = Group.objects.get_or_create(name="admin")
+        self.user.groups.add(admin_group)
+        otro = Cliente.objects.create(nombre="Ana", contacto="456")
+        for dia in range(1, 6):
+            Venta.objects.create(fecha=f"2024-03-0{dia}", total=50, usuario=self.user, cliente=otro)
+        data = self.client.get("/api/clientes/rfm/").json()
+        por_cliente = {c["nombre"]: c for c in data}
+        self.assertEqual(por_cliente["Ana"]["frecuencia"], 5)
+        self.assertGreater(por_cliente["Ana"]["r"], por_cliente["Juan"]["r"])
+        self.assertGreater(por_cliente["Ana"]["m"], por_cliente["Juan"]["m"])
@@ -0,0 +1,122 @@
+from datetime import date
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from inventario.models import (
+    Categoria,
+    Producto,
+    Proveedor,
+    Compra,
+    DetalleCompra,
+    LoteMateriaPrima,
+    MovimientoInventario,
+    UnidadMedida,
+    FamiliaProducto,
+)
+
+
+class CompraRecepcionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        self.cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Insumos", defaults={"familia": fam_ing}
+        )
+        self.unidad = UnidadMedida.objects.get(abreviatura="kg")
+        self.prov = Proveedor.objects.create(nombre="Prov", contacto="c", direccion="d")
+        self.compra = Compra.objects.create(
+            proveedor=self.prov, fecha=date.today(), total=0, estado=Compra.ESTADO_PENDIENTE
+        )
+
+    def _linea(self, codigo, cantidad, **kwargs):
+        prod = Producto.objects.create(
+            codigo=codigo,
+            nombre=f"Insumo {codigo}",
+            tipo="ingrediente",
+            precio=0,
+            costo=1,
+            stock_actual=0,
+            stock_minimo=0,
+            unidad_media=self.unidad,
+            categoria=self.cat,
+            proveedor=self.prov,
+            **kwargs,
+        )
+        return DetalleCompra.objects.create(
+            compra=self.compra, producto=prod, cantidad=cantidad, precio_unitario=1
+        )
+
+    def _recibir(self, lineas=None):
+        body = {"lineas": lineas} if lineas is not None else {}
+        return self.client.post(
+            f"/api/compras/{self.compra.id}/recibir/", body, format="json"
+        )
+
+    def test_partial_then_complete_receipt_creates_lots(self):
+        harina = self._linea("H1", 10, control_por_lote=True, vida_util_dias=30)
+        sal = self._linea("S1", 4)
+
+        resp = self._recibir(
+            [{"detalle": harina.id, "cantidad": 6, "lote": "L-001"}]
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["estado"], Compra.ESTADO_PARCIAL)
+        harina.producto.refresh_from_db()
+        self.assertEqual(float(harina.producto.stock_actual), 6.0)
+        lote = LoteMateriaPrima.objects.get(codigo="L-001")
+        self.assertEqual(float(lote.cantidad_inicial), 6.0)
+        self.assertEqual((lote.fecha_vencimiento - date.today()).days, 30)
+
+        resp = self._recibir([{"detalle": harina.id, "cantidad": 5}])
+        self.assertEqual(resp.status_code, 400)
+
+        resp = self._recibir()
+        self.assertEqual(resp.json()["estado"], Compra.ESTADO_RECIBIDO)
+        harina.producto.refresh_from_db()
+        sal.producto.refresh_from_db()
+        self.assertEqual(float(harina.producto.stock_actual), 10.0)
+        self.assertEqual(float(sal.producto.stock_actual), 4.0)
+        self.assertEqual(LoteMateriaPrima.objects.filter(producto=harina.producto).count(), 2)
+        self.assertEqual(MovimientoInventario.objects.filter(compra=self.compra).count(), 3)
+
+    def test_duplicate_lot_code_is_rejected(self):
+        harina = self._linea("H1", 10, control_por_lote=True, vida_util_dias=30)
+        self.assertEqual(
+            self._recibir([{"detalle": harina.id, "cantidad": 2, "lote": "L-001"}]).status_code,
+            200,
+        )
+
+        resp = self._recibir([{"detalle": harina.id, "cantidad": 2, "lote": "L-001"}])
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("L-001", resp.json()["detail"])
+        resp = self._recibir(
+            [
+                {"detalle": harina.id, "cantidad": 1, "lote": "L-002"},
+                {"detalle": harina.id, "cantidad": 1, "lote": "L-002"},
+            ]
+        )
+        self.assertEqual(resp.status_code, 400)
+        resp = self._recibir([{"detalle": harina.id, "cantidad": 1, "lote": "L" * 51}])
+        self.assertEqual(resp.status_code, 400)
+        harina.producto.refresh_from_db()
+        self.assertEqual(float(harina.producto.stock_actual), 2.0)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        for i in range(3):
+            self._linea(f"A{i}", 2)
+        otra = Compra.objects.create(
+            proveedor=self.prov, fecha=date.today(), total=0, estado=Compra.ESTADO_PENDIENTE
+        )
+        with CaptureQueriesContext(connection) as small:
+            self._recibir()
+        self.compra = otra
+        for i in range(30):
+            self._linea(f"B{i}", 2)
+        with CaptureQueriesContext(connection) as large:
+            resp = self._recibir()
+        self.assertEqual(resp.json()["estado"], Compra.ESTADO_RECIBIDO)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
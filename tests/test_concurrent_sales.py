@@ -1,4 +1,4 @@
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from django.contrib.auth.models import User
 from rest_framework.test import APIRequestFactory
 from django.db import close_old_connections
@@ -6,12 +6,19 @@ from rest_framework import serializers
 import threading
 from inventario.models import Categoria, Producto, UnidadMedida, FamiliaProducto
 from inventario.serializers import VentaCreateSerializer
+from core.contention import con_reintentos, metricas_contencion
+from core.serializers import InventarioOcupado
 
 class ConcurrentSaleTest(TransactionTestCase):
     def setUp(self):
-        fam_emp = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        # TransactionTestCase vacía las tablas entre tests, incluidos los datos de migraciones.
+        fam_emp, _ = FamiliaProducto.objects.get_or_create(
+            clave=FamiliaProducto.Clave.EMPANADAS, defaults={"nombre": "Empanadas"}
+        )
         cat = Categoria.objects.create(nombre_categoria="Cat", familia=fam_emp)
-        unidad = UnidadMedida.objects.get(abreviatura="u")
+        unidad = UnidadMedida.objects.filter(abreviatura="u").first() or UnidadMedida.objects.create(
+            nombre="Unidad", abreviatura="u"
+        )
         self.producto = Producto.objects.create(
             codigo="CS1",
             nombre="Prod",
@@ -24,7 +31,7 @@ class ConcurrentSaleTest(TransactionTestCase):
         )
         self.user = User.objects.create_user(username="u", password="p")
 
-    def _make_sale(self, cantidad, results, key):
+    def _make_sale(self, cantidad, results, key, reintentar=False):
         close_old_connections()
         factory = APIRequestFactory()
         request = factory.post("/ventas/")
@@ -39,7 +46,10 @@ class ConcurrentSaleTest(TransactionTestCase):
         serializer = VentaCreateSerializer(data=data, context={"request": request})
         serializer.is_valid(raise_exception=True)
         try:
-            serializer.save()
+            if reintentar:
+                con_reintentos(serializer.save, (InventarioOcupado,))
+            else:
+                serializer.save()
             results[key] = "ok"
         except Exception as e:
             results[key] = e
@@ -53,4 +63,22 @@ class ConcurrentSaleTest(TransactionTestCase):
         self.assertIn("ok", results.values())
         self.assertTrue(
             any(isinstance(v, serializers.ValidationError) for v in results.values())
-        )
\ No newline at end of file
+        )
+
+    @override_settings(SALE_LOCK_RETRIES=30, SALE_LOCK_BACKOFF_MAX=0.2)
+    def test_hot_product_sales_wait_instead_of_failing(self):
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=20, stock_minimo=0)
+        results = {}
+        threads = [
+            threading.Thread(target=self._make_sale, args=(1, results, i, True)) for i in range(6)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(list(results.values()), ["ok"] * 6)
+        self.producto.refresh_from_db()
+        self.assertEqual(float(self.producto.stock_actual), 14.0)
+        metricas = metricas_contencion()
+        self.assertEqual(metricas["total"]["abortos"], 0)
+        self.assertTrue(all(f["producto"] == self.producto.id for f in metricas["productos"]))
@@ -1,3 +1,5 @@
+from datetime import date
+
 from django.test import TestCase
 from django.contrib.auth.models import User, Group
 from rest_framework.test import APIClient
@@ -11,6 +13,9 @@ from inventario.models import (
     UnidadMedida,
     FamiliaProducto,
 )
+from core.utils import calcular_perdidas_devolucion
+
+
 class DevolucionLossesAPITest(TestCase):
     def setUp(self):
         admin_group, _ = Group.objects.get_or_create(name="admin")
@@ -58,4 +63,33 @@ class DevolucionLossesAPITest(TestCase):
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
         self.assertAlmostEqual(data["total_loss"], 2.0)
-        self.assertAlmostEqual(data["impact_percent"], 10.0)
\ No newline at end of file
+        self.assertAlmostEqual(data["impact_percent"], 10.0)
+
+    def test_monthly_cache_invalidated_on_save(self):
+        DevolucionProducto.objects.create(
+            fecha="2024-01-02",
+            lote_final=self.lote_final,
+            producto=self.prod,
+            motivo="Quemada",
+            cantidad=2,
+            responsable=self.user,
+            sustitucion=True,
+        )
+        data = calcular_perdidas_devolucion(date(2024, 1, 1), date(2024, 1, 31))
+        self.assertAlmostEqual(data["total_loss"], 4.0)
+        self.assertEqual(data["by_month"], {"2024-01-01": 4.0})
+        self.assertEqual(data["by_type"], {"empanada": 4.0})
+        with self.assertNumQueries(1):
+            calcular_perdidas_devolucion(date(2024, 1, 1), date(2024, 1, 31))
+
+        DevolucionProducto.objects.create(
+            fecha="2024-01-03",
+            lote_final=self.lote_final,
+            producto=self.prod,
+            motivo="Rota",
+            cantidad=1,
+            responsable=self.user,
+        )
+        data = calcular_perdidas_devolucion(date(2024, 1, 1), date(2024, 1, 31))
+        self.assertAlmostEqual(data["total_loss"], 5.0)
+        self.assertEqual(data["by_cause"], {"Quemada": 4.0, "Rota": 1.0})
@@ -0,0 +1,57 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from inventario.models import (
+    Categoria,
+    Producto,
+    HistorialPrecio,
+    UnidadMedida,
+    FamiliaProducto,
+)
+from core.models import AuditLog
+
+
+class DirtyTrackingTest(TestCase):
+    def setUp(self):
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Insumos", defaults={"familia": fam_ing}
+        )
+        Producto.objects.create(
+            codigo="I1",
+            nombre="Harina",
+            tipo="ingrediente",
+            precio=1,
+            costo=1,
+            stock_actual=10,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="kg"),
+            categoria=cat,
+        )
+
+    def test_price_history_without_extra_select(self):
+        prod = Producto.objects.get(codigo="I1")
+        self.assertFalse(prod.has_changed("precio"))
+        prod.stock_minimo = 2
+        with CaptureQueriesContext(connection) as ctx:
+            prod.save()
+        selects_producto = [
+            q for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and 'FROM "core_producto"' in q["sql"]
+            and '"core_producto"."precio"' in q["sql"]
+        ]
+        self.assertEqual(selects_producto, [])
+        self.assertEqual(HistorialPrecio.objects.filter(producto=prod).count(), 1)
+
+        prod.costo = 3
+        self.assertTrue(prod.has_changed("costo"))
+        prod.save()
+        self.assertEqual(HistorialPrecio.objects.filter(producto=prod).count(), 2)
+        self.assertFalse(prod.has_changed("costo"))
+
+    def test_audit_log_records_field_diffs(self):
+        prod = Producto.objects.get(codigo="I1")
+        prod.precio = 2
+        prod.save()
+        log = AuditLog.objects.filter(objeto_id=prod.pk, accion="actualizado").latest("fecha")
+        self.assertEqual(log.cambios, {"precio": ["1.00", "2.00"]})
@@ -0,0 +1,101 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from inventario.models import (
+    Categoria,
+    FamiliaProducto,
+    LoteMateriaPrima,
+    Producto,
+    UnidadMedida,
+)
+from core.alerts import generar_alertas_vencimiento
+from core.models import AlertaVencimiento, CorreoSaliente
+from core.outbox import encolar_correo, procesar_outbox
+
+
+class ExpirationAlertsTest(TestCase):
+    def setUp(self):
+        self.hoy = datetime.date.today()
+        fam = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        cat, _ = Categoria.objects.get_or_create(nombre_categoria="Insumos", defaults={"familia": fam})
+        ing = Producto.objects.create(
+            codigo="ING1",
+            nombre="Harina",
+            tipo="ingrediente",
+            precio=0,
+            costo=0,
+            stock_actual=0,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="kg"),
+            categoria=cat,
+        )
+        for codigo, dias in (("L1", 2), ("L2", 5), ("L3", 30)):
+            LoteMateriaPrima.objects.create(
+                codigo=codigo,
+                producto=ing,
+                fecha_recepcion=self.hoy,
+                fecha_vencimiento=self.hoy + datetime.timedelta(days=dias),
+                cantidad_inicial=5,
+            )
+        User.objects.create_superuser("admin", "admin@example.com", "x")
+        compras = User.objects.create_user("compras", "compras@example.com", "x")
+        compras.groups.add(Group.objects.get_or_create(name="compras")[0])
+        produccion = User.objects.create_user("prod", "prod@example.com", "x")
+        produccion.groups.add(Group.objects.get_or_create(name="produccion")[0])
+
+    def test_un_resumen_por_destinatario_sin_repetir(self):
+        resultado = generar_alertas_vencimiento(7, self.hoy)
+        self.assertEqual(resultado, {"alertas": 2, "correos": 2})
+        destinatarios = sorted(c.destinatarios[0] for c in CorreoSaliente.objects.all())
+        self.assertEqual(destinatarios, ["admin@example.com", "compras@example.com"])
+
+        procesar_outbox()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn("L1", mail.outbox[0].body)
+        self.assertIn("L2", mail.outbox[0].body)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(generar_alertas_vencimiento(7, self.hoy)["alertas"], 0)
+
+    def test_realerta_al_vencer(self):
+        generar_alertas_vencimiento(7, self.hoy)
+        resultado = generar_alertas_vencimiento(7, self.hoy + datetime.timedelta(days=2))
+        self.assertEqual(resultado["alertas"], 1)
+        alerta = AlertaVencimiento.objects.get(nivel=AlertaVencimiento.NIVEL_VENCIDO)
+        self.assertEqual(alerta.lote_materia_prima.codigo, "L1")
+
+
+class OutboxRetryTest(TestCase):
+    @override_settings(OUTBOX_MAX_INTENTOS=2)
+    def test_reintenta_con_backoff_y_marca_fallido(self):
+        correo = encolar_correo("Prueba", "Cuerpo", ["a@example.com"])
+        ahora = timezone.now()
+        with mock.patch("core.outbox.EmailMessage.send", side_effect=OSError("smtp caído")):
+            self.assertEqual(procesar_outbox(ahora=ahora)["reintentos"], 1)
+            correo.refresh_from_db()
+            self.assertEqual(correo.proximo_intento, ahora + datetime.timedelta(minutes=1))
+            # Antes de que venza la espera no se vuelve a intentar.
+            self.assertEqual(procesar_outbox(ahora=ahora)["reintentos"], 0)
+            self.assertEqual(procesar_outbox(ahora=correo.proximo_intento)["fallidos"], 1)
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, CorreoSaliente.ESTADO_FALLIDO)
+        self.assertEqual(correo.ultimo_error, "smtp caído")
+
+    def test_servidor_caido_reprograma_el_lote(self):
+        correos = [encolar_correo(f"Prueba {i}", "Cuerpo", ["a@example.com"]) for i in range(2)]
+        ahora = timezone.now()
+        conexion = mock.Mock()
+        conexion.open.side_effect = ConnectionRefusedError("sin smtp")
+        with mock.patch("core.outbox.get_connection", return_value=conexion):
+            resultado = procesar_outbox(ahora=ahora)
+        self.assertEqual(resultado, {"enviados": 0, "reintentos": 2, "fallidos": 0})
+        for correo in correos:
+            correo.refresh_from_db()
+            self.assertEqual(correo.intentos, 1)
+            self.assertEqual(correo.proximo_intento, ahora + datetime.timedelta(minutes=1))
+        self.assertEqual(procesar_outbox(ahora=ahora)["reintentos"], 0)
@@ -0,0 +1,24 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTest(TestCase):
+    def test_matches_drf_output(self):
+        data = {
+            "period": date(2024, 1, 1),
+            "creado": datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc),
+            "total": Decimal("10.50"),
+            "filas": [{"neto": 1.5, "nombre": "Jamón"}],
+        }
+        rapido = FastJSONRenderer().render(data, "application/json")
+        estandar = JSONRenderer().render(data, "application/json")
+        self.assertEqual(json.loads(rapido), json.loads(estandar))
+        self.assertEqual(json.loads(rapido)["creado"], "2024-01-01T12:30:00Z")
+
+    def test_indent_falls_back_to_drf(self):
+        salida = FastJSONRenderer().render({"a": 1}, "application/json; indent=4")
+        self.assertIn(b"\n    ", salida)
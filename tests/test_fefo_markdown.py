@@ -0,0 +1,108 @@
+import datetime
+import importlib
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.contrib.auth.models import Group, User
+
+from inventario.models import (
+    Categoria,
+    FamiliaProducto,
+    LoteMateriaPrima,
+    LoteProductoFinal,
+    Producto,
+    UnidadMedida,
+)
+from inventario.utils import consumir_ingrediente_fifo
+from core.allocation import aplicar_descuentos, descuentos_vigentes
+
+
+class FEFOAllocationTest(TestCase):
+    def setUp(self):
+        hoy = datetime.date.today()
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        fam_emp = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        cat_ing, _ = Categoria.objects.get_or_create(nombre_categoria="Insumos", defaults={"familia": fam_ing})
+        cat_emp, _ = Categoria.objects.get_or_create(nombre_categoria="Empanadas", defaults={"familia": fam_emp})
+        self.ing = Producto.objects.create(
+            codigo="ING1",
+            nombre="Queso",
+            tipo="ingrediente",
+            precio=0,
+            costo=0,
+            stock_actual=0,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="kg"),
+            categoria=cat_ing,
+        )
+        # El lote más antiguo vence después que el más nuevo.
+        LoteMateriaPrima.objects.create(
+            codigo="Q1",
+            producto=self.ing,
+            fecha_recepcion=hoy - datetime.timedelta(days=5),
+            fecha_vencimiento=hoy + datetime.timedelta(days=20),
+            cantidad_inicial=5,
+        )
+        LoteMateriaPrima.objects.create(
+            codigo="Q2",
+            producto=self.ing,
+            fecha_recepcion=hoy - datetime.timedelta(days=1),
+            fecha_vencimiento=hoy + datetime.timedelta(days=2),
+            cantidad_inicial=5,
+        )
+        self.emp = Producto.objects.create(
+            codigo="E1",
+            nombre="Empanada",
+            tipo="empanada",
+            precio=10,
+            costo=4,
+            stock_actual=20,
+            stock_minimo=0,
+            vida_util_dias=2,
+            unidad_media=UnidadMedida.objects.get(abreviatura="u"),
+            categoria=cat_emp,
+        )
+        LoteProductoFinal.objects.create(
+            codigo="F1", producto=self.emp, fecha_produccion=hoy - datetime.timedelta(days=1), cantidad_producida=10
+        )
+        LoteProductoFinal.objects.create(
+            codigo="F2", producto=self.emp, fecha_produccion=hoy, cantidad_producida=10
+        )
+
+    def test_fefo_consumes_earliest_expiry_first(self):
+        consumir_ingrediente_fifo(self.ing, 3)
+        self.assertEqual(float(LoteMateriaPrima.objects.get(codigo="Q2").cantidad_usada), 3)
+
+    @override_settings(LOT_ALLOCATION_STRATEGY="fifo")
+    def test_fifo_strategy_still_available(self):
+        consumir_ingrediente_fifo(self.ing, 3)
+        self.assertEqual(float(LoteMateriaPrima.objects.get(codigo="Q1").cantidad_usada), 3)
+
+    def test_legacy_lots_get_expiry_backfilled(self):
+        LoteProductoFinal.objects.update(fecha_vencimiento=None)
+        migracion = importlib.import_module("core.migrations.0061_backfill_vencimiento_lotes")
+        migracion.completar_vencimientos(apps, None)
+        self.assertEqual(
+            LoteProductoFinal.objects.get(codigo="F2").fecha_vencimiento,
+            datetime.date.today() + datetime.timedelta(days=2),
+        )
+
+    def test_markdown_job_feeds_compact_catalog(self):
+        self.assertEqual(
+            LoteProductoFinal.objects.get(codigo="F1").fecha_vencimiento,
+            datetime.date.today() + datetime.timedelta(days=1),
+        )
+        with self.assertNumQueries(3):
+            self.assertEqual(aplicar_descuentos(), 2)
+        self.assertEqual(float(LoteProductoFinal.objects.get(codigo="F1").descuento), 0.3)
+        self.assertEqual(float(descuentos_vigentes()[self.emp.id]), 0.3)
+
+        admin_group, _ = Group.objects.get_or_create(name="admin")
+        user = User.objects.create_user(username="admin", password="pass")
+        user.groups.add(admin_group)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        fila = next(p for p in client.get("/api/productos/compact/").json() if p["id"] == self.emp.id)
+        self.assertEqual(fila["descuento"], 0.3)
+        self.assertEqual(fila["precio_oferta"], 7.0)
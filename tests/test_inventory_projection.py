@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User, Group
+from rest_framework.test import APIClient
+from inventario.models import (
+    Categoria,
+    Producto,
+    Proveedor,
+    Compra,
+    DetalleCompra,
+    UnidadMedida,
+    FamiliaProducto,
+)
+from inventario.utils import detectar_faltantes
+
+
+class InventoryProjectionTest(TestCase):
+    def setUp(self):
+        compras_group, _ = Group.objects.get_or_create(name="compras")
+        self.user = User.objects.create_user(username="compras", password="pass")
+        self.user.groups.add(compras_group)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Insumos", defaults={"familia": fam_ing}
+        )
+        self.prov = Proveedor.objects.create(nombre="Prov", contacto="c", direccion="d")
+        self.prod = Producto.objects.create(
+            codigo="I1",
+            nombre="Harina",
+            tipo="ingrediente",
+            precio=0,
+            costo=1,
+            stock_actual=0,
+            stock_minimo=5,
+            lead_time_dias=2,
+            unidad_media=UnidadMedida.objects.get(abreviatura="kg"),
+            categoria=cat,
+            proveedor=self.prov,
+        )
+
+    def _pedido_pendiente(self, cantidad):
+        compra = Compra.objects.create(
+            proveedor=self.prov,
+            fecha=date.today(),
+            total=cantidad,
+            estado=Compra.ESTADO_PENDIENTE,
+        )
+        DetalleCompra.objects.create(
+            compra=compra, producto=self.prod, cantidad=cantidad, precio_unitario=1
+        )
+        return compra
+
+    def test_pending_purchase_is_projected_and_netted(self):
+        self.assertEqual(len(detectar_faltantes()), 1)
+        self._pedido_pendiente(5)
+        self.assertEqual(detectar_faltantes(), [])
+
+        resp = self.client.get(
+            "/api/proyeccion-inventario/", {"horizon": 3, "producto": self.prod.id}
+        )
+        self.assertEqual(resp.status_code, 200)
+        fila = resp.json()["productos"][0]
+        self.assertEqual(fila["en_camino"], 5.0)
+        llegada = (date.today() + timedelta(days=2)).isoformat()
+        dias = {d["fecha"]: d for d in fila["dias"]}
+        self.assertEqual(dias[llegada]["entradas"], 5.0)
+        self.assertEqual(fila["dias"][0]["proyectado"], 0.0)
+        self.assertEqual(fila["dias"][-1]["proyectado"], 5.0)
+
+    def test_projection_is_cached_per_day(self):
+        detectar_faltantes()
+        # La demanda y las entradas salen de caché; sólo se lee el stock.
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(detectar_faltantes()), 1)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        Producto.objects.ajustar_stock({self.prod.id: 10})
+        self.assertEqual(detectar_faltantes(), [])
+
+    def test_horizon_is_validated_and_bounded(self):
+        url = "/api/proyeccion-inventario/"
+        self.assertEqual(self.client.get(url, {"horizon": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"producto": "x"}).status_code, 400)
+        fila = self.client.get(url, {"horizon": 100000}).json()["productos"][0]
+        self.assertLessEqual(len(fila["dias"]), 91)
@@ -0,0 +1,61 @@
+import tempfile
+
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from inventario.models import (
+    Categoria,
+    Cliente,
+    DetallesVenta,
+    FamiliaProducto,
+    Producto,
+    UnidadMedida,
+    Venta,
+)
+from core.models import CorreoSaliente
+from core.outbox import procesar_outbox
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class InvoiceEmailOutboxTest(TestCase):
+    def setUp(self):
+        ventas_group, _ = Group.objects.get_or_create(name="ventas")
+        self.user = User.objects.create_user(username="u", password="p")
+        self.user.groups.add(ventas_group)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        fam = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        cat, _ = Categoria.objects.get_or_create(nombre_categoria="General", defaults={"familia": fam})
+        prod = Producto.objects.create(
+            codigo="P1",
+            nombre="Prod",
+            tipo="empanada",
+            precio=2,
+            costo=1,
+            stock_actual=10,
+            stock_minimo=1,
+            unidad_media=UnidadMedida.objects.get(abreviatura="u"),
+            categoria=cat,
+        )
+        cliente = Cliente.objects.create(nombre="Juan", contacto="123", email="juan@example.com")
+        self.venta = Venta.objects.create(fecha="2024-01-01", total=2, usuario=self.user, cliente=cliente)
+        DetallesVenta.objects.create(venta=self.venta, producto=prod, cantidad=1, precio_unitario=2)
+
+    def test_api_encola_y_worker_marca_enviada(self):
+        resp = self.client.post(f"/api/ventas/{self.venta.id}/factura/enviar/", {}, format="json")
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(len(mail.outbox), 0)
+        correo = CorreoSaliente.objects.get(pk=resp.json()["envio"])
+        self.assertFalse(correo.factura.enviado)
+
+        self.assertEqual(procesar_outbox()["enviados"], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        nombre, contenido, tipo = mail.outbox[0].attachments[0]
+        self.assertEqual(tipo, "application/pdf")
+        self.assertTrue(contenido.startswith(b"%PDF"))
+        factura = self.venta.factura
+        factura.refresh_from_db()
+        self.assertTrue(factura.enviado)
+        self.assertEqual(factura.enviado_a, "juan@example.com")
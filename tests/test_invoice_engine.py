@@ -0,0 +1,115 @@
+import io
+import tempfile
+import zipfile
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.http import FileResponse
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from inventario.models import (
+    Categoria,
+    Cliente,
+    DetallesVenta,
+    FamiliaProducto,
+    Producto,
+    UnidadMedida,
+    Venta,
+)
+from core.invoices import datos_facturas, renderizar_factura, renderizar_facturas, zip_facturas
+from core.models import FacturaVenta
+from core.utils import crear_factura_para_venta
+
+
+class InvoiceEngineTest(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=tempfile.mkdtemp()))
+        user = User.objects.create_user(username="vendedor", password="p")
+        fam = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        cat, _ = Categoria.objects.get_or_create(nombre_categoria="General", defaults={"familia": fam})
+        prod = Producto.objects.create(
+            codigo="P1",
+            nombre="Empanada",
+            tipo="empanada",
+            precio=2,
+            costo=1,
+            stock_actual=100,
+            stock_minimo=1,
+            unidad_media=UnidadMedida.objects.get(abreviatura="u"),
+            categoria=cat,
+        )
+        cliente = Cliente.objects.create(nombre="Juan", contacto="1", email="juan@example.com")
+        self.ventas = []
+        for i in range(3):
+            venta = Venta.objects.create(fecha=date(2024, 1, 31), total=4, usuario=user, cliente=cliente)
+            # Suficientes líneas para forzar un salto de página.
+            for _ in range(50 if i == 0 else 2):
+                DetallesVenta.objects.create(venta=venta, producto=prod, cantidad=2, precio_unitario=2)
+            self.ventas.append(venta)
+        Venta.objects.create(fecha=date(2024, 2, 1), total=0, usuario=user)
+
+    def test_datos_en_dos_consultas(self):
+        with self.assertNumQueries(2):
+            datos = datos_facturas([v.id for v in self.ventas])
+        self.assertEqual(len(datos[self.ventas[0].id]["lineas"]), 50)
+        self.assertEqual(datos[self.ventas[1].id]["usuario__username"], "vendedor")
+        pdf = renderizar_factura(datos[self.ventas[0].id])
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertIn(b"/Count 2", pdf)
+
+    def test_lote_del_dia_con_procesos(self):
+        self.assertEqual(renderizar_facturas(date(2024, 1, 31), procesos=2), 3)
+        self.assertEqual(FacturaVenta.objects.count(), 3)
+        # Sin ``reescribir`` no se vuelven a generar.
+        self.assertEqual(renderizar_facturas(date(2024, 1, 31)), 0)
+
+        factura = FacturaVenta.objects.get(venta=self.ventas[0])
+        nombre = factura.pdf.name
+        self.assertEqual(renderizar_facturas(date(2024, 1, 31), reescribir=True), 3)
+        factura.refresh_from_db()
+        self.assertEqual(factura.pdf.name, nombre)
+        self.assertEqual(factura.numero, f"F-{self.ventas[0].id:06d}")
+
+    def test_exportar_zip_y_descarga_individual(self):
+        renderizar_facturas(date(2024, 1, 31))
+        FacturaVenta.objects.get(venta=self.ventas[2]).delete()
+        user = User.objects.get(username="vendedor")
+        user.groups.add(Group.objects.get_or_create(name="finanzas")[0])
+        user.groups.add(Group.objects.get_or_create(name="ventas")[0])
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        resp = client.get("/api/facturas/exportar/?desde=2024-01-01&hasta=2024-01-31")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        with zipfile.ZipFile(io.BytesIO(b"".join(resp.streaming_content))) as archivo:
+            nombres = sorted(archivo.namelist())
+            self.assertEqual(nombres, sorted(f"F-{v.id:06d}.pdf" for v in self.ventas))
+            self.assertTrue(all(archivo.read(n).startswith(b"%PDF") for n in nombres))
+        # La factura faltante quedó guardada.
+        self.assertTrue(FacturaVenta.objects.filter(venta=self.ventas[2]).exists())
+
+        resp = client.get(f"/api/ventas/{self.ventas[0].id}/factura/")
+        self.assertIsInstance(resp, FileResponse)
+        self.assertTrue(b"".join(resp.streaming_content).startswith(b"%PDF"))
+        self.assertEqual(client.get("/api/facturas/exportar/").status_code, 400)
+
+    def test_zip_tolera_factura_creada_en_paralelo(self):
+        otra = self.ventas[1]
+
+        def renderizar(datos):
+            # Una descarga individual crea la factura mientras se arma el ZIP.
+            if datos["id"] == otra.id:
+                crear_factura_para_venta(Venta.objects.get(pk=otra.id))
+            return renderizar_factura(datos)
+
+        with mock.patch("core.invoices.renderizar_factura", side_effect=renderizar):
+            partes = zip_facturas(date(2024, 1, 31), date(2024, 1, 31))
+        # Las facturas quedan guardadas antes de empezar a transmitir.
+        self.assertEqual(FacturaVenta.objects.count(), 3)
+        nombre = FacturaVenta.objects.get(venta=otra).pdf.name
+        with zipfile.ZipFile(io.BytesIO(b"".join(partes))) as archivo:
+            self.assertEqual(len(archivo.namelist()), 3)
+        self.assertEqual(FacturaVenta.objects.get(venta=otra).pdf.name, nombre)
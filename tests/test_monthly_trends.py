@@ -1,3 +1,6 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth.models import User, Group
 from rest_framework.test import APIClient
@@ -81,6 +84,7 @@ class MonthlyTrendsAPITest(TestCase):
         HistorialPrecio.objects.create(producto=self.ing, precio=0, costo=1.5, fecha="2024-01-03")
 
     def test_endpoint_returns_data(self):
+        call_command("construir_cubo", "--anio", "2024", stdout=StringIO())
         resp = self.client.get("/api/monthly-trends/?year=2024")
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
@@ -1,9 +1,12 @@
 import os
+from django.core import mail
 from django.test import TestCase
 from unittest.mock import patch
 from inventario.models import Categoria, Producto, Proveedor, UnidadMedida, FamiliaProducto
 from core.models.inventario import Compra, DetalleCompra
 from finanzas.services import enviar_orden_compra
+from core.outbox import procesar_outbox
+from supplier_stub import StubProveedor
 
 
 class PurchaseOrderServiceTest(TestCase):
@@ -28,17 +31,19 @@ class PurchaseOrderServiceTest(TestCase):
         self.compra = Compra.objects.create(proveedor=self.prov, fecha=date(2024, 1, 1), total=5)
         DetalleCompra.objects.create(compra=self.compra, producto=self.prod, cantidad=5, precio_unitario=1)
 
-    @patch("finanzas.services.requests.post")
-    def test_envio_por_api(self, mock_post):
-        mock_post.return_value.status_code = 200
-        mock_post.return_value.json.return_value = {"ok": True}
-        with patch.dict(os.environ, {"SUPPLIER_API_URL": "http://api.test/orders", "SUPPLIER_API_TOKEN": "t"}):
-            resp = enviar_orden_compra(self.compra)
-        mock_post.assert_called_once()
-        self.assertEqual(resp, {"ok": True})
+    def test_envio_por_api(self):
+        with StubProveedor() as stub:
+            with patch.dict(os.environ, {"SUPPLIER_API_URL": stub.url, "SUPPLIER_API_TOKEN": "t"}):
+                resp = enviar_orden_compra(self.compra)
+        self.assertEqual(len(stub.peticiones), 1)
+        self.assertEqual(resp, {"pedido": "PED-1", "compra": self.compra.id})
 
-    @patch("finanzas.services.EmailMessage.send")
-    def test_envio_por_correo(self, mock_send):
+    def test_envio_por_correo(self):
         with patch.dict(os.environ, {"SUPPLIER_EMAIL": "prov@test.com"}, clear=True):
+            resp = enviar_orden_compra(self.compra)
+            # Reintentar no duplica la orden en el outbox.
             enviar_orden_compra(self.compra)
-        mock_send.assert_called_once()
\ No newline at end of file
+        self.assertEqual(resp["status"], "queued")
+        procesar_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["prov@test.com"])
\ No newline at end of file
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from inventario.models import Categoria, Producto, UnidadMedida, FamiliaProducto
+
+
+class ProductCompactListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        fam = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.BEBIDAS)
+        cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Bebidas", defaults={"familia": fam}
+        )
+        self.prod = Producto.objects.create(
+            codigo="B1",
+            nombre="Agua",
+            tipo="bebida",
+            precio=1,
+            costo=0.5,
+            stock_actual=10,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="botella"),
+            categoria=cat,
+        )
+
+    def test_compact_snapshot_is_cached_and_etagged(self):
+        resp = self.client.get("/api/productos/compact/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp.json(),
+            [
+                {
+                    "id": self.prod.id,
+                    "codigo": "B1",
+                    "nombre": "Agua",
+                    "precio": 1.0,
+                    "stock_actual": 10.0,
+                    "unidad": "botella",
+                    "tipo": "bebida",
+                }
+            ],
+        )
+        etag = resp["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/productos/compact/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertFalse(any("core_producto" in q["sql"] for q in ctx.captured_queries))
+
+    def test_stock_change_invalidates_snapshot(self):
+        etag = self.client.get("/api/productos/compact/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Producto.objects.ajustar_stock({self.prod.id: -3})
+            # Hasta el commit se sigue sirviendo la versión anterior.
+            resp = self.client.get("/api/productos/compact/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, 304)
+        self.assertEqual(len(callbacks), 1)
+        resp = self.client.get("/api/productos/compact/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()[0]["stock_actual"], 7.0)
+        self.assertNotEqual(resp["ETag"], etag)
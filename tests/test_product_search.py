@@ -0,0 +1,64 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from inventario.models import Categoria, Producto, UnidadMedida, FamiliaProducto
+
+
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        fam = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Empanadas", defaults={"familia": fam}
+        )
+        unidad = UnidadMedida.objects.get(abreviatura="u")
+        for codigo, nombre, barras in [
+            ("E1", "Empanada de Jamón", "7790001"),
+            ("E2", "Jamón y queso especial", ""),
+            ("E3", "Empanada árabe", ""),
+        ]:
+            Producto.objects.create(
+                codigo=codigo,
+                nombre=nombre,
+                tipo="empanada",
+                precio=2,
+                costo=1,
+                stock_actual=10,
+                stock_minimo=0,
+                unidad_media=unidad,
+                categoria=cat,
+                codigo_barras=barras,
+            )
+
+    def test_accent_folded_ranked_prefix_search(self):
+        resp = self.client.get("/api/productos/search/", {"q": "jamon"})
+        self.assertEqual(resp.status_code, 200)
+        nombres = [r["nombre"] for r in resp.json()]
+        self.assertEqual(nombres, ["Jamón y queso especial", "Empanada de Jamón"])
+
+        resp = self.client.get("/api/productos/search/", {"q": "EMP ara"})
+        self.assertEqual([r["codigo"] for r in resp.json()], ["E3"])
+
+        resp = self.client.get("/api/productos/", {"search": "árabe"})
+        self.assertEqual(resp.json()["count"], 1)
+
+    def test_barcode_lookup_is_single_indexed_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/productos/search/", {"q": "7790001"})
+        data = resp.json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["codigo"], "E1")
+        self.assertEqual(data[0]["rank"], 0)
+        lookups = [q for q in ctx.captured_queries if "core_producto" in q["sql"]]
+        self.assertEqual(len(lookups), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM core_producto WHERE codigo_barras = %s",
+                ["7790001"],
+            )
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        self.assertIn("INDEX", plan.upper())
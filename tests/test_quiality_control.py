@@ -84,7 +84,9 @@ class DevolucionRateAPITest(TestCase):
             cantidad_producida=10,
         )
         venta = Venta.objects.create(fecha="2024-01-01", total=10, usuario=self.user)
-        DetallesVenta.objects.create(venta=venta, producto=self.prod, cantidad=10, precio_unitario=1)
+        DetallesVenta.objects.create(
+            venta=venta, producto=self.prod, cantidad=10, precio_unitario=1, lote_final=self.lote_final
+        )
         DevolucionProducto.objects.create(
             fecha="2024-01-02",
             lote_final=self.lote_final,
@@ -98,4 +100,45 @@ class DevolucionRateAPITest(TestCase):
         resp = self.client.get("/api/devoluciones/rates/?month=1&year=2024")
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
-        self.assertTrue(data["por_producto"][0]["alerta"]) 
\ No newline at end of file
+        self.assertTrue(data["por_producto"][0]["alerta"]) 
+
+    def test_rates_by_window_and_lot(self):
+        lote2 = LoteProductoFinal.objects.create(
+            codigo="L2",
+            producto=self.prod,
+            fecha_produccion="2024-01-03",
+            cantidad_producida=10,
+        )
+        venta = Venta.objects.create(fecha="2024-01-03", total=5, usuario=self.user)
+        DetallesVenta.objects.create(
+            venta=venta, producto=self.prod, cantidad=5, precio_unitario=1, lote_final=lote2
+        )
+        DevolucionProducto.objects.create(
+            fecha="2024-01-03",
+            lote_final=lote2,
+            producto=self.prod,
+            motivo="Fría",
+            cantidad=1,
+            responsable=self.user,
+        )
+        resp = self.client.get("/api/devoluciones/rates/?start=2024-01-01&end=2024-01-15")
+        data = resp.json()
+        self.assertEqual(len(data["por_producto"]), 1)
+        self.assertAlmostEqual(data["por_producto"][0]["tasa"], 2 / 15 * 100)
+        tasas_lote = {l["lote_final"]: l["tasa"] for l in data["por_lote"]}
+        self.assertEqual(tasas_lote, {"L2": 20.0, "L1": 10.0})
+        self.assertAlmostEqual(data["por_responsable"][0]["tasa"], 2 / 15 * 100)
+
+        with self.assertNumQueries(1):
+            self.client.get("/api/devoluciones/rates/?start=2024-01-01&end=2024-01-15")
+
+        DevolucionProducto.objects.create(
+            fecha="2024-01-04",
+            lote_final=lote2,
+            producto=self.prod,
+            motivo="Fría",
+            cantidad=1,
+            responsable=self.user,
+        )
+        data = self.client.get("/api/devoluciones/rates/?start=2024-01-01&end=2024-01-15").json()
+        self.assertAlmostEqual(data["por_producto"][0]["tasa"], 20.0)
@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from inventario.models import (
+    Categoria,
+    Cliente,
+    DetallesVenta,
+    FamiliaProducto,
+    LoteMateriaPrima,
+    LoteProductoFinal,
+    Producto,
+    Proveedor,
+    UnidadMedida,
+    UsoLoteMateriaPrima,
+    Venta,
+)
+
+
+class RecallSimulationTest(TestCase):
+    def setUp(self):
+        admin_group, _ = Group.objects.get_or_create(name="admin")
+        self.user = User.objects.create_user(username="admin", password="pass")
+        self.user.groups.add(admin_group)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        fam_emp = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        cat_ing, _ = Categoria.objects.get_or_create(nombre_categoria="Insumos", defaults={"familia": fam_ing})
+        cat_emp, _ = Categoria.objects.get_or_create(nombre_categoria="Empanadas", defaults={"familia": fam_emp})
+        self.proveedor = Proveedor.objects.create(nombre="Molino")
+        harina = Producto.objects.create(
+            codigo="ING1",
+            nombre="Harina",
+            tipo="ingrediente",
+            precio=0,
+            costo=0,
+            stock_actual=100,
+            stock_minimo=1,
+            unidad_media=UnidadMedida.objects.get(abreviatura="kg"),
+            categoria=cat_ing,
+            proveedor=self.proveedor,
+        )
+        empanada = Producto.objects.create(
+            codigo="E1",
+            nombre="Empanada",
+            tipo="empanada",
+            precio=2,
+            costo=1,
+            stock_actual=20,
+            stock_minimo=1,
+            unidad_media=UnidadMedida.objects.get(abreviatura="u"),
+            categoria=cat_emp,
+        )
+        lote = LoteMateriaPrima.objects.create(
+            codigo="H1", producto=harina, fecha_recepcion="2024-01-01", cantidad_inicial=10
+        )
+        for codigo in ("F1", "F2"):
+            final = LoteProductoFinal.objects.create(
+                codigo=codigo, producto=empanada, fecha_produccion="2024-01-02", cantidad_producida=10
+            )
+            UsoLoteMateriaPrima.objects.create(
+                lote_materia_prima=lote, lote_producto_final=final, fecha="2024-01-02", cantidad=5
+            )
+        self.cliente = Cliente.objects.create(nombre="Ana", contacto="123")
+        venta = Venta.objects.create(fecha="2024-01-03", total=8, usuario=self.user, cliente=self.cliente)
+        DetallesVenta.objects.create(
+            venta=venta,
+            producto=empanada,
+            cantidad=4,
+            precio_unitario=2,
+            lote_final=LoteProductoFinal.objects.get(codigo="F1"),
+        )
+
+    def test_simulation_by_supplier_and_csv(self):
+        payload = {"proveedor": self.proveedor.id, "desde": "2024-01-01", "hasta": "2024-01-31"}
+        data = self.client.post("/api/retiros/simular/", payload, format="json").json()
+        self.assertEqual(data["lotes_materia_prima"], ["H1"])
+        self.assertEqual(data["totales"]["lotes_finales"], 2)
+        self.assertEqual(data["totales"]["cuarentena"], 16.0)
+        self.assertEqual(data["totales"]["exposicion"], 20.0)
+        self.assertEqual(data["clientes"][0]["nombre"], "Ana")
+        self.assertEqual(data["clientes"][0]["cantidad"], 4.0)
+
+        resp = self.client.post(
+            "/api/retiros/simular/?formato=csv", {"lotes": ["H1"]}, format="json"
+        )
+        self.assertEqual(resp["Content-Type"], "text/csv")
+        contenido = b"".join(resp.streaming_content).decode()
+        self.assertIn("cliente,F1,,Ana", contenido)
+
+    def test_requires_lots_or_supplier(self):
+        self.assertEqual(self.client.post("/api/retiros/simular/", {}, format="json").status_code, 400)
+        self.assertEqual(self.client.get("/api/retiros/desconocido/").status_code, 404)
+        resp = self.client.post("/api/retiros/simular/", {"lotes": "H1"}, format="json")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_async_false_in_form_runs_inline(self):
+        resp = self.client.post("/api/retiros/simular/", {"lotes": ["H1"], "async": "false"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["totales"]["cuarentena"], 16.0)
+
+    def test_async_job_survives_in_database(self):
+        # Sin ejecutar ``on_commit`` la simulación queda pendiente, como si el
+        # proceso que la lanzó se hubiera reiniciado.
+        with self.captureOnCommitCallbacks(execute=False):
+            resp = self.client.post(
+                "/api/retiros/simular/", {"lotes": ["H1"], "async": True}, format="json"
+            )
+        self.assertEqual(resp.status_code, 202)
+        url = f"/api/retiros/{resp.json()['id']}/"
+        self.assertEqual(self.client.get(url).json(), {"estado": "pendiente"})
+
+        call_command("procesar_retiros", stdout=StringIO())
+        data = self.client.get(url).json()
+        self.assertEqual(data["totales"]["cuarentena"], 16.0)
+        self.assertEqual(data["clientes"][0]["nombre"], "Ana")
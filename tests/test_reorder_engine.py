@@ -0,0 +1,123 @@
+import os
+from datetime import date
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from inventario.models import (
+    Categoria,
+    Producto,
+    Proveedor,
+    Compra,
+    DetalleCompra,
+    ComposicionProducto,
+    Venta,
+    DetallesVenta,
+    UnidadMedida,
+    FamiliaProducto,
+)
+from inventario.utils import detectar_faltantes, auto_reordenar
+from core.models import CorreoSaliente, EnvioOrdenCompra
+
+
+class ReorderEngineTest(TestCase):
+    def setUp(self):
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        fam_emp = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        self.cat_ing, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Insumos", defaults={"familia": fam_ing}
+        )
+        cat_emp, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Empanadas", defaults={"familia": fam_emp}
+        )
+        self.unidad = UnidadMedida.objects.get(abreviatura="kg")
+        self.user = User.objects.create_user(username="u", password="p")
+        self.prov = Proveedor.objects.create(nombre="Prov", contacto="c", direccion="d")
+        self.harina = self._ingrediente(
+            "H1",
+            "Harina",
+            self.prov,
+            stock_actual=10,
+            stock_minimo=5,
+            stock_seguridad=4,
+            lead_time_dias=3,
+            unidad_empaque=25,
+        )
+        self.empanada = Producto.objects.create(
+            codigo="E1",
+            nombre="Empanada",
+            tipo="empanada",
+            precio=2,
+            costo=1,
+            stock_actual=100,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="u"),
+            categoria=cat_emp,
+        )
+        ComposicionProducto.objects.create(
+            producto_final=self.empanada, ingrediente=self.harina, cantidad_requerida=1
+        )
+        # 62 empanadas vendidas en 31 días -> 2 kg diarios de harina
+        venta = Venta.objects.create(fecha=date.today(), total=124, usuario=self.user)
+        DetallesVenta.objects.create(
+            venta=venta, producto=self.empanada, cantidad=62, precio_unitario=2
+        )
+
+    def _ingrediente(self, codigo, nombre, proveedor, **kwargs):
+        defaults = {"stock_actual": 0, "stock_minimo": 5}
+        defaults.update(kwargs)
+        return Producto.objects.create(
+            codigo=codigo,
+            nombre=nombre,
+            tipo="ingrediente",
+            precio=0,
+            costo=2,
+            unidad_media=self.unidad,
+            categoria=self.cat_ing,
+            proveedor=proveedor,
+            **defaults,
+        )
+
+    def test_reorder_point_and_pack_rounding(self):
+        sugerencias = {s["producto"]: s for s in detectar_faltantes(7)}
+        s = sugerencias[self.harina.id]
+        # s = 4 + 2 * 3 = 10 ; S = 10 + 2 * 7 = 24 ; faltante 14 -> 1 saco de 25
+        self.assertEqual(s["demanda_diaria"], 2.0)
+        self.assertEqual(s["punto_reorden"], 10.0)
+        self.assertEqual(s["nivel_objetivo"], 24.0)
+        self.assertEqual(s["cantidad"], 25.0)
+
+    def test_bulk_orders_grouped_by_supplier(self):
+        otro = Proveedor.objects.create(nombre="Otro", contacto="c", direccion="d")
+        self._ingrediente("S1", "Sal", self.prov)
+        self._ingrediente("A1", "Aceite", otro, unidad_empaque=4)
+
+        ids = auto_reordenar(confirmar=True)
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(DetalleCompra.objects.count(), 3)
+        compra = Compra.objects.get(proveedor=otro)
+        self.assertEqual(compra.estado, Compra.ESTADO_PENDIENTE)
+        detalle = DetalleCompra.objects.get(compra=compra)
+        self.assertEqual(float(detalle.cantidad), 8.0)
+        self.assertEqual(float(compra.total), 16.0)
+
+    def test_query_count_does_not_grow_with_catalog(self):
+        with CaptureQueriesContext(connection) as small:
+            auto_reordenar(confirmar=True)
+        Compra.objects.all().delete()
+        for i in range(10):
+            prov = Proveedor.objects.create(nombre=f"P{i}", contacto="c", direccion="d")
+            self._ingrediente(f"X{i}", f"Insumo {i}", prov)
+        with CaptureQueriesContext(connection) as large:
+            ids = auto_reordenar(confirmar=True)
+        self.assertEqual(len(ids), 11)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_orders_are_queued_for_dispatch(self):
+        with patch.dict(os.environ, {"SUPPLIER_EMAIL": "prov@example.com"}):
+            ids = auto_reordenar(confirmar=True)
+        envio = EnvioOrdenCompra.objects.get()
+        self.assertEqual(envio.compra_id, ids[0])
+        self.assertEqual(envio.estado, EnvioOrdenCompra.ESTADO_PENDIENTE)
+        self.assertFalse(CorreoSaliente.objects.exists())
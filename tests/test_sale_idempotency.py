@@ -0,0 +1,123 @@
+import itertools
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import Group, User
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from inventario.models import (
+    Categoria,
+    FamiliaProducto,
+    LoteProductoFinal,
+    Producto,
+    UnidadMedida,
+    Venta,
+)
+from core.contention import metricas_contencion
+from core.models import Balance, ClaveIdempotencia, ContadorContencion
+from core.serializers import InventarioOcupado, VentaCreateSerializer
+
+
+class SaleIdempotencyTest(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=tempfile.mkdtemp()))
+        user = User.objects.create_user(username="pos", password="p")
+        user.groups.add(Group.objects.get_or_create(name="ventas")[0])
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        fam = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        cat, _ = Categoria.objects.get_or_create(nombre_categoria="Empanadas", defaults={"familia": fam})
+        self.prod = Producto.objects.create(
+            codigo="E1",
+            nombre="Empanada",
+            tipo="empanada",
+            precio=2,
+            costo=1,
+            stock_actual=10,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="u"),
+            categoria=cat,
+        )
+        LoteProductoFinal.objects.create(
+            codigo="F1", producto=self.prod, fecha_produccion="2024-01-01", cantidad_producida=10
+        )
+        self.data = {
+            "fecha": "2024-01-02",
+            "detalles": [{"producto": self.prod.id, "cantidad": 3, "precio_unitario": 2}],
+        }
+
+    def _vender(self, clave="venta-1", data=None):
+        return self.client.post(
+            "/api/ventas/", data or self.data, format="json", HTTP_IDEMPOTENCY_KEY=clave
+        )
+
+    def test_reenvio_devuelve_la_venta_original(self):
+        primera = self._vender()
+        self.assertEqual(primera.status_code, 201)
+        segunda = self._vender()
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(segunda["Idempotent-Replayed"], "true")
+        self.assertEqual(Venta.objects.count(), 1)
+        self.prod.refresh_from_db()
+        self.assertEqual(float(self.prod.stock_actual), 7.0)
+
+        otra = dict(self.data, fecha="2024-01-03")
+        self.assertEqual(self._vender(data=otra).status_code, 422)
+
+    def test_reintenta_contencion_y_libera_la_clave(self):
+        original = VentaCreateSerializer.create
+        llamadas = []
+
+        def ocupado_una_vez(serializer, validated_data):
+            llamadas.append(1)
+            if len(llamadas) == 1:
+                raise InventarioOcupado()
+            return original(serializer, validated_data)
+
+        with patch("core.contention.time.sleep") as espera:
+            with patch.object(VentaCreateSerializer, "create", ocupado_una_vez):
+                self.assertEqual(self._vender().status_code, 201)
+            espera.assert_called_once()
+
+            with patch.object(VentaCreateSerializer, "create", side_effect=InventarioOcupado()):
+                resp = self._vender("venta-2")
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp["Retry-After"], "1")
+        self.assertFalse(ClaveIdempotencia.objects.filter(clave="venta-2").exists())
+
+    @override_settings(SALE_LOCK_RETRIES=3)
+    def test_timeout_de_bloqueo_se_reintenta(self):
+        with patch("core.contention.time.sleep") as espera, patch(
+            "core.contention.Producto.objects.select_for_update",
+            side_effect=OperationalError("canceling statement due to lock timeout"),
+        ):
+            resp = self._vender()
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(espera.call_count, 2)
+        metricas = metricas_contencion()
+        self.assertEqual(metricas["total"]["timeouts"], 3)
+        self.assertEqual(metricas["total"]["abortos"], 1)
+        self.assertEqual(Venta.objects.count(), 0)
+
+    def test_solo_se_registran_las_esperas(self):
+        self.assertEqual(self._vender().status_code, 201)
+        self.assertFalse(ContadorContencion.objects.exists())
+
+        # Cada lectura del reloj avanza 50 ms: la toma del bloqueo esperó.
+        with patch("core.contention.time.perf_counter", side_effect=itertools.count(0, 0.05)):
+            self.assertEqual(self._vender("venta-2").status_code, 201)
+        fila = metricas_contencion()["productos"][0]
+        self.assertEqual((fila["bloqueos"], fila["espera_ms"]), (1, 50))
+
+    def test_balance_se_actualiza_con_la_venta(self):
+        self.assertEqual(self._vender().status_code, 201)
+        self.assertEqual(Balance.objects.get(mes=1, anio=2024).total_ingresos, 6)
+
+        with patch("core.serializers.actualizar_balance_por_venta", side_effect=RuntimeError):
+            self.assertEqual(self._vender("venta-2").status_code, 400)
+        self.assertEqual(Venta.objects.count(), 1)
+        self.prod.refresh_from_db()
+        self.assertEqual(float(self.prod.stock_actual), 7.0)
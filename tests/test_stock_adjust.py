@@ -0,0 +1,60 @@
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from inventario.models import (
+    Categoria,
+    Producto,
+    HistorialPrecio,
+    UnidadMedida,
+    FamiliaProducto,
+)
+from core.models import StockInsuficiente
+
+
+class AjustarStockTest(TestCase):
+    def setUp(self):
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Insumos", defaults={"familia": fam_ing}
+        )
+        unidad = UnidadMedida.objects.get(abreviatura="kg")
+        self.a, self.b = [
+            Producto.objects.create(
+                codigo=f"I{i}",
+                nombre=f"Insumo {i}",
+                tipo="ingrediente",
+                precio=0,
+                costo=1,
+                stock_actual=10,
+                stock_minimo=0,
+                unidad_media=unidad,
+                categoria=cat,
+            )
+            for i in range(2)
+        ]
+
+    def test_single_update_without_price_history(self):
+        historial = HistorialPrecio.objects.count()
+        with CaptureQueriesContext(connection) as ctx:
+            Producto.objects.ajustar_stock({self.a.id: Decimal("2.5"), self.b.id: -4})
+        self.assertEqual(
+            len([q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]), 1
+        )
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual(self.a.stock_actual, Decimal("12.50"))
+        self.assertEqual(self.b.stock_actual, Decimal("6.00"))
+        self.assertEqual(HistorialPrecio.objects.count(), historial)
+
+    def test_insufficient_stock_rolls_back_everything(self):
+        with self.assertRaises(StockInsuficiente):
+            Producto.objects.ajustar_stock(
+                {self.a.id: -1, self.b.id: -11}, exigir_disponible=True
+            )
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock_actual, Decimal("10.00"))
+
+        Producto.objects.fijar_stock({self.b.id: 3})
+        self.b.refresh_from_db()
+        self.assertEqual(self.b.stock_actual, Decimal("3.00"))
@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.contrib.auth.models import User, Group
+from django.utils import timezone as tz
+from rest_framework.test import APIClient
+from inventario.models import (
+    Categoria,
+    Producto,
+    MovimientoInventario,
+    SaldoInventario,
+    UnidadMedida,
+    FamiliaProducto,
+)
+from core.ledger import cerrar_dia, stock_a_fecha, verificar_consistencia
+from core.trends import actualizar_cubo
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        fam_ing = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.INGREDIENTES)
+        cat, _ = Categoria.objects.get_or_create(
+            nombre_categoria="Insumos", defaults={"familia": fam_ing}
+        )
+        self.prod = Producto.objects.create(
+            codigo="I1",
+            nombre="Harina",
+            tipo="ingrediente",
+            precio=0,
+            costo=1,
+            stock_actual=10,
+            stock_minimo=0,
+            unidad_media=UnidadMedida.objects.get(abreviatura="kg"),
+            categoria=cat,
+        )
+        self.hoy = date.today()
+
+    def _mover(self, tipo, cantidad, dias_atras):
+        mov = MovimientoInventario.objects.create(
+            producto=self.prod, tipo=tipo, cantidad=cantidad, motivo="test"
+        )
+        mov.fecha = tz.make_aware(datetime.combine(self.hoy - timedelta(days=dias_atras), datetime.min.time()))
+        mov.save(update_fields=["fecha"])
+        delta = cantidad if tipo == "entrada" else -cantidad
+        Producto.objects.filter(pk=self.prod.pk).update(stock_actual=self.prod.stock_actual + delta)
+        self.prod.refresh_from_db()
+
+    def test_stock_as_of_date_uses_snapshot_plus_delta(self):
+        self._mover("entrada", 5, 3)  # 15
+        self._mover("salida", 4, 1)  # 11
+        self._mover("entrada", 2, 0)  # 13
+        cerrar_dia(self.hoy - timedelta(days=2))
+        saldo = SaldoInventario.objects.get(producto=self.prod)
+        self.assertEqual(saldo.cantidad, Decimal("15.00"))
+
+        self.assertEqual(stock_a_fecha(self.hoy - timedelta(days=2))[self.prod.id], Decimal("15"))
+        self.assertEqual(stock_a_fecha(self.hoy - timedelta(days=1))[self.prod.id], Decimal("11"))
+        self.assertEqual(stock_a_fecha(self.hoy)[self.prod.id], Decimal("13"))
+        # Antes del primer saldo se reconstruye desde stock_actual.
+        self.assertEqual(stock_a_fecha(self.hoy - timedelta(days=5))[self.prod.id], Decimal("10"))
+
+    def test_consistency_checker_reports_untracked_changes(self):
+        call_command("cerrar_saldos", stdout=StringIO())
+        self.assertEqual(verificar_consistencia(), [])
+        call_command("verificar_stock", stdout=StringIO())
+
+        Producto.objects.filter(pk=self.prod.pk).update(stock_actual=7)
+        diferencias = verificar_consistencia()
+        self.assertEqual(len(diferencias), 1)
+        self.assertEqual(diferencias[0]["diferencia"], -3.0)
+        with self.assertRaises(CommandError):
+            call_command("verificar_stock", stdout=StringIO())
+
+    def test_close_does_not_absorb_untracked_changes(self):
+        cerrar_dia(self.hoy - timedelta(days=1))
+        Producto.objects.filter(pk=self.prod.pk).update(stock_actual=50)
+        self.assertEqual(verificar_consistencia()[0]["diferencia"], 40.0)
+
+        cerrar_dia(self.hoy)
+        saldo = SaldoInventario.objects.get(producto=self.prod, fecha=self.hoy)
+        self.assertEqual(saldo.cantidad, Decimal("10.00"))
+        self.assertEqual(verificar_consistencia()[0]["diferencia"], 40.0)
+
+    def test_monthly_trends_reads_snapshots(self):
+        admin_group, _ = Group.objects.get_or_create(name="admin")
+        user = User.objects.create_user(username="admin", password="pass")
+        user.groups.add(admin_group)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        SaldoInventario.objects.create(
+            producto=self.prod, fecha=date(2024, 1, 31), cantidad=12, entradas=3, salidas=1
+        )
+        actualizar_cubo(2024)
+        resp = client.get("/api/monthly-trends/?year=2024")
+        fila = resp.json()["stock"][0]
+        self.assertTrue(fila["period"].startswith("2024-01"))
+        self.assertEqual(fila["neto"], 2.0)
+        self.assertEqual(fila["saldo"], 12.0)
@@ -0,0 +1,56 @@
+import os
+from datetime import date
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from inventario.models import Proveedor
+from core.dispatch import despachar_ordenes, encolar_ordenes
+from core.models import EnvioOrdenCompra
+from core.models.inventario import Compra
+from supplier_stub import StubProveedor
+
+
+@override_settings(SUPPLIER_DISPATCH_WORKERS=8)
+class SupplierDispatchTest(TestCase):
+    def setUp(self):
+        prov = Proveedor.objects.create(nombre="Prov", contacto="c", direccion="d")
+        self.ids = [
+            Compra.objects.create(proveedor=prov, fecha=date(2024, 1, 1), total=i).id
+            for i in range(50)
+        ]
+
+    def test_despacho_en_paralelo_e_idempotente(self):
+        with StubProveedor(demora=0.05) as stub:
+            with patch.dict(os.environ, {"SUPPLIER_API_URL": stub.url}):
+                resultado = despachar_ordenes(self.ids)
+                self.assertEqual(len(stub.peticiones), 50)
+                self.assertGreater(stub.concurrencia_max, 1)
+                # Un segundo despacho no vuelve a llamar al proveedor.
+                self.assertEqual(despachar_ordenes(self.ids), resultado)
+        self.assertEqual(len(stub.peticiones), 50)
+        self.assertEqual(
+            EnvioOrdenCompra.objects.filter(estado=EnvioOrdenCompra.ESTADO_ENVIADO).count(), 50
+        )
+
+    def test_reintento_conserva_clave(self):
+        with StubProveedor(fallos=2) as stub:
+            with patch.dict(os.environ, {"SUPPLIER_API_URL": stub.url}):
+                despachar_ordenes(self.ids[:1])
+        envio = EnvioOrdenCompra.objects.get(compra_id=self.ids[0])
+        self.assertEqual(envio.estado, EnvioOrdenCompra.ESTADO_ENVIADO)
+        self.assertEqual({clave for clave, _ in stub.peticiones}, {envio.clave})
+        self.assertEqual(len(stub.peticiones), 3)
+
+    def test_encolar_y_despachar_con_comando(self):
+        encolar_ordenes(self.ids[:3])
+        # Encolar de nuevo, como haría otro proceso, no choca con el OneToOne.
+        encolar_ordenes(self.ids[:3])
+        self.assertEqual(EnvioOrdenCompra.objects.count(), 3)
+        with StubProveedor(fallos=4) as stub:
+            with patch.dict(os.environ, {"SUPPLIER_API_URL": stub.url}):
+                call_command("despachar_ordenes")
+        self.assertEqual(
+            EnvioOrdenCompra.objects.filter(estado=EnvioOrdenCompra.ESTADO_ENVIADO).count(), 3
+        )
@@ -12,6 +12,7 @@ from inventario.models import (
     FamiliaProducto,
 )
 from inventario.serializers import VentaCreateSerializer
+from core.traceability import trazar_adelante
 
 
 class TraceabilityAPITest(TestCase):
@@ -127,4 +128,16 @@ class TraceabilityAPITest(TestCase):
         self.assertEqual(usos["FP1"]["en_stock"], 0)
         self.assertEqual(usos["FP2"]["vendidos"], 3)
         self.assertEqual(usos["FP2"]["devueltos"], 1)
-        self.assertEqual(usos["FP2"]["en_stock"], 6)
\ No newline at end of file
+        self.assertEqual(usos["FP2"]["en_stock"], 6)
+
+    def test_forward_and_backward_in_constant_queries(self):
+        with self.assertNumQueries(3):
+            traza = trazar_adelante(["L1"])["L1"]
+        self.assertEqual({u["lote_final"] for u in traza["usos"]}, {"FP1", "FP2"})
+
+        venta = Venta.objects.get()
+        resp = self.client.get(f"/api/trazabilidad/venta/{venta.id}/")
+        self.assertEqual(resp.status_code, 200)
+        lineas = resp.json()["lineas"]
+        self.assertEqual({l["lote_final"] for l in lineas}, {"FP1", "FP2"})
+        self.assertTrue(all(l["materias_primas"][0]["lote"] == "L1" for l in lineas))
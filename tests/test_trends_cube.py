@@ -0,0 +1,108 @@
+from datetime import date, datetime
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from django.utils import timezone as tz
+from rest_framework.test import APIClient
+
+from core.models import (
+    Balance,
+    Categoria,
+    DetallesVenta,
+    DevolucionProducto,
+    FamiliaProducto,
+    HechoMensual,
+    LoteProductoFinal,
+    MovimientoInventario,
+    PeriodoCubo,
+    Producto,
+    UnidadMedida,
+    Venta,
+)
+from core.ledger import cerrar_dia
+from core.trends import actualizar_cubo, construir_mes
+
+
+class TrendsCubeTest(TestCase):
+    def setUp(self):
+        admin_group, _ = Group.objects.get_or_create(name="admin")
+        self.user = User.objects.create_user(username="admin", password="pass")
+        self.user.groups.add(admin_group)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        fam = FamiliaProducto.objects.get(clave=FamiliaProducto.Clave.EMPANADAS)
+        cat, _ = Categoria.objects.get_or_create(nombre_categoria="Empanadas", defaults={"familia": fam})
+        self.prod = Producto.objects.create(
+            codigo="E1",
+            nombre="Empanada",
+            tipo="empanada",
+            precio=2,
+            costo=1,
+            stock_actual=10,
+            stock_minimo=1,
+            unidad_media=UnidadMedida.objects.get(abreviatura="u"),
+            categoria=cat,
+        )
+        mov = MovimientoInventario.objects.create(producto=self.prod, tipo="entrada", cantidad=5, motivo="prod")
+        mov.fecha = tz.make_aware(datetime(2024, 1, 5))
+        mov.save(update_fields=["fecha"])
+        venta = Venta.objects.create(fecha="2024-01-15", total=4, usuario=self.user)
+        DetallesVenta.objects.create(venta=venta, producto=self.prod, cantidad=2, precio_unitario=2)
+        lote = LoteProductoFinal.objects.create(
+            codigo="L1", producto=self.prod, fecha_produccion="2024-01-05", cantidad_producida=5
+        )
+        DevolucionProducto.objects.create(
+            fecha="2024-01-20",
+            lote_final=lote,
+            producto=self.prod,
+            motivo="malo",
+            cantidad=1,
+            sustitucion=True,
+            responsable=self.user,
+        )
+
+    def test_cube_feeds_endpoint(self):
+        self.assertEqual(self.client.get("/api/monthly-trends/?year=2024").json()["stock"], [])
+        actualizar_cubo(2024)
+        data = self.client.get("/api/monthly-trends/?year=2024").json()
+        hecho = HechoMensual.objects.get(periodo=date(2024, 1, 1), producto=self.prod)
+        self.assertEqual(float(hecho.entradas), 5.0)
+        self.assertEqual(float(hecho.ingresos), 4.0)
+        self.assertEqual(float(hecho.perdida), 2.0)
+        self.assertEqual(data["stock"][0]["neto"], 5.0)
+        self.assertEqual(data["sales"], [{"period": "2024-01-01", "categoria": "Empanadas", "total": 4.0}])
+        self.assertEqual(data["losses"], [{"period": "2024-01-01", "loss": 2.0}])
+
+        # Sólo lectura: permisos y las filas del cubo.
+        with self.assertNumQueries(2):
+            self.client.get("/api/monthly-trends/?year=2024")
+
+    def test_closed_months_are_frozen(self):
+        Balance.objects.create(
+            mes=1, anio=2024, total_ingresos=0, total_egresos=0, utilidad=0, cerrado=True
+        )
+        actualizar_cubo(2024)
+        self.assertTrue(PeriodoCubo.objects.get(periodo=date(2024, 1, 1)).cerrado)
+
+        mov = MovimientoInventario.objects.create(producto=self.prod, tipo="entrada", cantidad=4, motivo="tarde")
+        mov.fecha = tz.make_aware(datetime(2024, 1, 6))
+        mov.save(update_fields=["fecha"])
+        PeriodoCubo.objects.update(actualizado=tz.make_aware(datetime(2000, 1, 1)))
+
+        self.assertNotIn(date(2024, 1, 1), actualizar_cubo(2024))
+        hecho = HechoMensual.objects.get(periodo=date(2024, 1, 1), producto=self.prod)
+        self.assertEqual(float(hecho.entradas), 5.0)
+        actualizar_cubo(2024, refrescar=True)
+        hecho = HechoMensual.objects.get(periodo=date(2024, 1, 1), producto=self.prod)
+        self.assertEqual(float(hecho.entradas), 9.0)
+
+    def test_partial_snapshots_keep_unclosed_days(self):
+        mov = MovimientoInventario.objects.create(producto=self.prod, tipo="entrada", cantidad=7, motivo="prod")
+        mov.fecha = tz.make_aware(datetime(2024, 1, 3))
+        mov.save(update_fields=["fecha"])
+        cerrar_dia(date(2024, 1, 3))
+
+        construir_mes(date(2024, 1, 1))
+        hecho = HechoMensual.objects.get(periodo=date(2024, 1, 1), producto=self.prod)
+        self.assertEqual(float(hecho.entradas), 12.0)